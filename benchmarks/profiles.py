@@ -0,0 +1,122 @@
+"""
+Simulated device profiles for the discovery benchmark.
+
+System group values and interface naming follow walks recorded from real
+devices; the interface tables are generated so that devices of any size can be
+simulated. Data is written in snmpsim's .snmprec format (OID|type|value).
+"""
+import os
+
+# snmprec value types
+INTEGER = '2'
+OCTET_STRING = '4'
+HEX_STRING = '4x'
+OBJECT_ID = '6'
+GAUGE32 = '66'
+TIMETICKS = '67'
+
+# IANA ifType values
+ETHERNET = 6
+LOOPBACK = 24
+PROP_VIRTUAL = 53
+L3_IPVLAN = 136
+
+
+def ports(name_format, count, speed, start=1):
+    return [(name_format.format(number), ETHERNET, speed) for number in range(start, start + count)]
+
+
+def slotted_ports(name_format, slots, ports_per_slot, speed):
+    return [
+        (name_format.format(slot, port), ETHERNET, speed)
+        for slot in range(1, slots + 1)
+        for port in range(1, ports_per_slot + 1)
+    ]
+
+
+PROFILES = {
+    'cisco-c2960x': {
+        'sysDescr': (
+            'Cisco IOS Software, C2960X Software (C2960X-UNIVERSALK9-M), Version 15.2(7)E4, '
+            'RELEASE SOFTWARE (fc2)'
+        ),
+        'sysObjectID': '1.3.6.1.4.1.9.1.1208',
+        'interfaces': (
+            ports('GigabitEthernet1/0/{}', 48, 1000)
+            + ports('TenGigabitEthernet1/0/{}', 4, 10000)
+            + [('Vlan1', L3_IPVLAN, 1000), ('Loopback0', LOOPBACK, 8000)]
+        ),
+    },
+    'juniper-ex4300': {
+        'sysDescr': 'Juniper Networks, Inc. ex4300-48t Ethernet Switch, kernel JUNOS 21.4R3-S4.9',
+        'sysObjectID': '1.3.6.1.4.1.2636.1.1.1.2.63',
+        'interfaces': (
+            ports('ge-0/0/{}', 48, 1000, start=0)
+            + ports('xe-0/2/{}', 4, 10000, start=0)
+            + [('me0', ETHERNET, 1000), ('lo0', LOOPBACK, 0)]
+        ),
+    },
+    'arista-7050sx3': {
+        'sysDescr': 'Arista Networks EOS version 4.28.3M running on an Arista Networks DCS-7050SX3-48YC8',
+        'sysObjectID': '1.3.6.1.4.1.30065.1.3011.7050.3741.48',
+        'interfaces': (
+            ports('Ethernet{}', 48, 25000)
+            + ports('Ethernet{}/1', 8, 100000, start=49)
+            + [('Management1', ETHERNET, 1000), ('Loopback0', LOOPBACK, 0)]
+        ),
+    },
+    # Modular chassis with 400 front-panel ports
+    'cisco-n9508': {
+        'sysDescr': (
+            'Cisco NX-OS(tm) n9000, Software (n9000-dk9), Version 9.3(10), RELEASE SOFTWARE '
+            'Copyright (c) 2002-2022 by Cisco Systems, Inc.'
+        ),
+        'sysObjectID': '1.3.6.1.4.1.9.12.3.1.3.1339',
+        'interfaces': (
+            slotted_ports('Ethernet{}/{}', 8, 50, 100000)
+            + [('mgmt0', ETHERNET, 1000), ('loopback0', LOOPBACK, 0), ('Vlan1', PROP_VIRTUAL, 0)]
+        ),
+    },
+}
+
+# sysUpTime of every simulated agent (42 days, in hundredths of a second)
+SYS_UPTIME = 42 * 86400 * 100
+
+
+def device_records(profile, name):
+    """
+    Return the (oid, type, value) records of a simulated device.
+    """
+    records = [
+        ('1.3.6.1.2.1.1.1.0', OCTET_STRING, profile['sysDescr']),
+        ('1.3.6.1.2.1.1.2.0', OBJECT_ID, profile['sysObjectID']),
+        ('1.3.6.1.2.1.1.3.0', TIMETICKS, SYS_UPTIME),
+        ('1.3.6.1.2.1.1.4.0', OCTET_STRING, 'noc@example.com'),
+        ('1.3.6.1.2.1.1.5.0', OCTET_STRING, name),
+        ('1.3.6.1.2.1.1.6.0', OCTET_STRING, 'Benchmark Lab, Rack 1'),
+        ('1.3.6.1.2.1.2.1.0', INTEGER, len(profile['interfaces'])),
+        ('1.3.6.1.2.1.31.1.5.0', TIMETICKS, 1000),
+    ]
+    base_mac = sum(ord(char) for char in name) << 16
+
+    for index, (if_name, if_type, speed) in enumerate(profile['interfaces'], start=1):
+        mac = f'{0x020000000000 + base_mac + index:012x}' if if_type == ETHERNET else ''
+        records += [
+            (f'1.3.6.1.2.1.2.2.1.2.{index}', OCTET_STRING, if_name),
+            (f'1.3.6.1.2.1.2.2.1.3.{index}', INTEGER, if_type),
+            (f'1.3.6.1.2.1.2.2.1.6.{index}', HEX_STRING if mac else OCTET_STRING, mac),
+            (f'1.3.6.1.2.1.2.2.1.7.{index}', INTEGER, 1 if index % 10 else 2),
+            (f'1.3.6.1.2.1.2.2.1.9.{index}', TIMETICKS, 1000 + index),
+            (f'1.3.6.1.2.1.31.1.1.1.1.{index}', OCTET_STRING, if_name),
+            (f'1.3.6.1.2.1.31.1.1.1.15.{index}', GAUGE32, speed),
+            (f'1.3.6.1.2.1.31.1.1.1.18.{index}', OCTET_STRING, f'uplink {index}' if index % 4 == 0 else ''),
+        ]
+
+    return sorted(records, key=lambda record: tuple(int(arc) for arc in record[0].split('.')))
+
+
+def write_snmprec(path, records):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        for oid, value_type, value in records:
+            f.write(f'{oid}|{value_type}|{value}\n')
@@ -0,0 +1,277 @@
+"""
+Discovery benchmark against simulated SNMP agents.
+
+Starts snmpsim with one agent per simulated device on loopback addresses, then
+drives DeviceDiscovery against them one IP at a time (sync) and through
+discover_many (bulk). All database changes are rolled back. Prints a summary
+and writes the results as JSON.
+
+    python benchmarks/run.py --netbox /opt/netbox/netbox --devices 40 --dead 10 --output results.json
+
+Requires snmpsim (pip install snmpsim) in NetBox's virtualenv, and Linux, where
+all of 127.0.0.0/8 is routed to the loopback interface.
+"""
+from datetime import datetime, timezone
+from profiles import PROFILES, device_records, write_snmprec
+import argparse
+import ipaddress
+import json
+import math
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+# snmpUDPDomain; snmpsim appends the index of the agent endpoint
+UDP_DOMAIN = '1.3.6.1.6.1.1'
+
+AGENT_NETWORK = ipaddress.ip_network('127.1.0.0/16')
+# Nothing listens here: every probe runs into the timeout
+DEAD_NETWORK = ipaddress.ip_network('127.2.0.0/16')
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--netbox', required=True, help="Path of NetBox's netbox/ directory (containing manage.py)")
+    parser.add_argument('--devices', type=int, default=40, help="Simulated devices, spread over all profiles")
+    parser.add_argument('--profile', action='append', choices=sorted(PROFILES), help="Limit to these profiles")
+    parser.add_argument('--dead', type=int, default=10, help="Addresses that never answer")
+    parser.add_argument('--mode', choices=['sync', 'bulk', 'both'], default='both')
+    parser.add_argument('--port', type=int, default=1161, help="UDP port of the simulated agents")
+    parser.add_argument('--timeout', type=int, help="SNMP timeout for the run, overriding the configuration")
+    parser.add_argument('--output', help="Write the JSON results to this file instead of stdout")
+    return parser.parse_args()
+
+
+def setup_django(netbox_path):
+    sys.path.insert(0, os.path.abspath(netbox_path))
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'netbox.settings')
+    import django
+    django.setup()
+
+
+def percentile(values, pct):
+    """
+    Nearest-rank percentile.
+    """
+    if not values:
+        return None
+    values = sorted(values)
+    return values[max(0, math.ceil(pct / 100 * len(values)) - 1)]
+
+
+class Simulator:
+    """
+    Runs snmpsim with one UDP endpoint (and data file) per simulated device.
+    """
+
+    def __init__(self, targets, community, port):
+        self.targets = targets
+        self.community = community
+        self.port = port
+        self.data_dir = None
+        self.process = None
+
+    def __enter__(self):
+        self.data_dir = tempfile.mkdtemp(prefix='autodiscovery-benchmark-')
+        endpoints = []
+        for index, (address, profile, name) in enumerate(self.targets):
+            # snmpsim picks the data file by community and the transport ID of the endpoint
+            path = os.path.join(self.data_dir, self.community, f'{UDP_DOMAIN}.{index}.snmprec')
+            write_snmprec(path, device_records(PROFILES[profile], name))
+            endpoints.append(f'--agent-udpv4-endpoint={address}:{self.port}')
+
+        executable = shutil.which('snmpsim-command-responder') or shutil.which('snmpsimd.py')
+        if not executable:
+            raise SystemExit("snmpsim is not installed (pip install snmpsim)")
+
+        self.process = subprocess.Popen(
+            [executable, f'--data-dir={self.data_dir}', *endpoints],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL
+        )
+        self.wait_ready()
+        return self
+
+    def wait_ready(self, deadline=60):
+        from netbox_device_autodiscovery.snmp import SNMPError, snmp_get
+
+        address = self.targets[0][0]
+        started = time.monotonic()
+        while time.monotonic() - started < deadline:
+            if self.process.poll() is not None:
+                raise SystemExit(f"snmpsim exited with status {self.process.returncode}")
+            try:
+                if snmp_get(address, self.community, {'sysName': '1.3.6.1.2.1.1.5.0'}, 1, retries=0):
+                    return
+            except SNMPError:
+                pass
+        raise SystemExit(f"snmpsim did not answer within {deadline}s")
+
+    def __exit__(self, *exc_info):
+        if self.process:
+            self.process.terminate()
+            self.process.wait()
+        if self.data_dir:
+            shutil.rmtree(self.data_dir, ignore_errors=True)
+
+
+def pdus_sent():
+    try:
+        from prometheus_client import REGISTRY
+    except ImportError:
+        return None
+    values = [
+        REGISTRY.get_sample_value('netbox_autodiscovery_snmp_pdus_total', {'operation': operation})
+        for operation in ('get', 'getnext', 'getbulk')
+    ]
+    if all(value is None for value in values):
+        return None
+    return sum(value or 0 for value in values)
+
+
+class Rollback(Exception):
+    pass
+
+
+def run_mode(mode, addresses, responding, timeout):
+    from django.db import connection, transaction
+    from django.test.utils import CaptureQueriesContext
+    from ipam.models import IPAddress
+    from netbox_device_autodiscovery.async_discovery import discover_many
+    from netbox_device_autodiscovery.cache import lookup_cache
+    from netbox_device_autodiscovery.discovery import DeviceDiscovery
+    from netbox_device_autodiscovery.models import AutoDiscoveryConfig, DiscoveryResult
+    from netbox_device_autodiscovery.utils import discovery_suppressed
+
+    # Each mode starts with cold caches
+    lookup_cache.clear()
+    AutoDiscoveryConfig.invalidate_cache()
+    report = {}
+
+    try:
+        with transaction.atomic():
+            if timeout:
+                AutoDiscoveryConfig.objects.filter(pk=AutoDiscoveryConfig.get_config().pk).update(snmp_timeout=timeout)
+                AutoDiscoveryConfig.invalidate_cache()
+
+            with discovery_suppressed():
+                ip_addresses = [IPAddress.objects.create(address=f'{address}/32') for address in addresses]
+            last_result = DiscoveryResult.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+            pdus_before = pdus_sent()
+
+            started = time.monotonic()
+            with CaptureQueriesContext(connection) as queries:
+                if mode == 'sync':
+                    devices = [DeviceDiscovery(ip_address).discover_and_create_device() for ip_address in ip_addresses]
+                else:
+                    devices = list(discover_many(ip_addresses).values())
+            elapsed = time.monotonic() - started
+
+            pdus_after = pdus_sent()
+            results = list(DiscoveryResult.objects.filter(pk__gt=last_result))
+            latencies = [result.total_duration for result in results]
+
+            report = {
+                'addresses': len(ip_addresses),
+                'responding': responding,
+                'devices': sum(1 for device in devices if device),
+                'snmp_results': sum(1 for result in results if result.protocol == DiscoveryResult.PROTOCOL_SNMP),
+                'elapsed_s': round(elapsed, 3),
+                'devices_per_s': round(len(ip_addresses) / elapsed, 2) if elapsed else None,
+                'latency_ms': {
+                    'p50': percentile(latencies, 50),
+                    'p99': percentile(latencies, 99),
+                    'max': max(latencies) if latencies else None,
+                },
+                'snmp_pdus_per_device': (
+                    round((pdus_after - pdus_before) / len(ip_addresses), 2) if pdus_before is not None else None
+                ),
+                'queries_per_device': round(len(queries) / len(ip_addresses), 2),
+            }
+            raise Rollback
+    except Rollback:
+        pass
+    finally:
+        lookup_cache.clear()
+        AutoDiscoveryConfig.invalidate_cache()
+
+    return report
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', 'HEAD'], cwd=os.path.dirname(os.path.abspath(__file__)), text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    args = parse_args()
+    setup_django(args.netbox)
+
+    from django.conf import settings
+    from netbox_device_autodiscovery.credentials import get_credentials
+    from netbox_device_autodiscovery.models import AutoDiscoveryConfig
+    from netbox_device_autodiscovery.utils import PLUGIN_NAME
+    import pysnmp
+
+    # The simulated agents listen on an unprivileged port; results are needed for the latencies
+    plugin_settings = settings.PLUGINS_CONFIG.setdefault(PLUGIN_NAME, {})
+    plugin_settings['snmp_port'] = args.port
+    plugin_settings['store_results'] = True
+
+    profiles = args.profile or sorted(PROFILES)
+    agents = list(AGENT_NETWORK.hosts())[:args.devices]
+    targets = [
+        (str(address), profiles[index % len(profiles)], f'bench-{profiles[index % len(profiles)]}-{index}')
+        for index, address in enumerate(agents)
+    ]
+    dead = [str(address) for address in list(DEAD_NETWORK.hosts())[:args.dead]]
+    # The simulated agents answer to the community of the first v1/v2c credential
+    community = next((
+        credential.community for credential in get_credentials(AutoDiscoveryConfig.get_cached_config())
+        if credential.version in (1, 2)
+    ), None)
+    if community is None:
+        raise SystemExit("The simulated agents need an SNMP v1 or v2c credential")
+
+    report = {
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'pysnmp': getattr(pysnmp, '__version__', None),
+        'profiles': {profile: sum(1 for target in targets if target[1] == profile) for profile in profiles},
+        'dead': len(dead),
+        'port': args.port,
+        'timeout': args.timeout,
+        'modes': {},
+    }
+
+    with Simulator(targets, community, args.port):
+        addresses = [target[0] for target in targets] + dead
+        for mode in (['sync', 'bulk'] if args.mode == 'both' else [args.mode]):
+            print(f"Running {mode} discovery of {len(addresses)} addresses...", file=sys.stderr)
+            report['modes'][mode] = result = run_mode(mode, addresses, len(targets), args.timeout)
+            print(
+                f"  {result['devices_per_s']} devices/s, p50 {result['latency_ms']['p50']} ms, "
+                f"p99 {result['latency_ms']['p99']} ms, {result['snmp_pdus_per_device']} PDUs/device, "
+                f"{result['queries_per_device']} queries/device",
+                file=sys.stderr
+            )
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
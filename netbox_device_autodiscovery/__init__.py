@@ -13,10 +13,80 @@ class DeviceAutoDiscoveryConfig(PluginConfig):
     default_settings = {
         'snmp_community': 'public',
         'snmp_version': 2,
+        'snmp_port': 161,
+        'credential_prefix_length': 24,
+        'credential_prefix_length_v6': 64,
         'ssh_timeout': 10,
+        'ssh_command_timeout': 30,
+        'ssh_max_sessions': 8,
+        'ssh_pool_size': 16,
+        'ssh_idle_timeout': 60,
+        'ssh_cache_size': 1024,
+        'ssh_cache_ttl': 300,
         'enable_snmp': True,
         'enable_ssh': False,
+        'discovery_mode': 'queued',
+        'job_timeout': 300,
+        'coalesce_window': 2,
+        'coalesce_batch_size': 500,
+        'identity_kinds': ['serial', 'base_mac', 'engine_id', 'sysname'],
+        'shard_prefix_length': 24,
+        'shard_prefix_length_v6': 64,
+        'rediscovery_interval': 3600,
+        'rediscovery_full_interval': 86400,
+        'rediscovery_job_timeout': 3600,
+        'rediscovery_shards': 1,
+        'store_results': True,
+        'result_retention_days': 30,
+        'result_prune_batch_size': 1000,
+        'metrics_enabled': True,
+        'snmp_max_repetitions': 25,
+        'bulk_batch_size': 500,
+        'lookup_cache_size': 1024,
+        'lookup_cache_ttl': 300,
+        'config_cache_ttl': 60,
+        'config_cache_shared': False,
+        'negative_cache_enabled': True,
+        'negative_backoff_base': 300,
+        'negative_backoff_max': 86400,
+        'negative_cache_ttl': 604800,
+        'prefilter_enabled': False,
+        'prefilter_methods': ['snmp', 'tcp', 'icmp'],
+        'prefilter_timeout': 1,
+        'prefilter_tcp_ports': [22, 443],
+        'prefilter_timeout_factor': 4,
+        'dns_timeout': 2,
+        'dns_cache_size': 4096,
+        'dns_cache_ttl': 3600,
+        'dns_negative_ttl': 300,
+        'dns_concurrency': 50,
+        'vendor_databases': [],
+        'iana_enterprise_numbers': None,
+        'bulk_concurrency': 100,
+        'scheduler_enabled': True,
+        'scheduler_max_concurrency': 200,
+        'scheduler_reserved': {'rediscovery': 20, 'sweep': 50},
+        'scheduler_rate': 50,
+        'scheduler_burst': 50,
+        'scheduler_prefix_length': 24,
+        'scheduler_prefix_length_v6': 64,
+        'scheduler_rate_limits': {},
+        'bulk_deadline': 30,
+        'sweep_max_hosts': 262144,
+        'sweep_job_timeout': 43200,
+        'crawl_max_depth': 3,
+        'crawl_max_hosts': 4096,
+        'crawl_allow_prefixes': [],
+        'crawl_deny_prefixes': [],
+        'crawl_job_timeout': 43200,
+        'harvest_neighbours': True,
+        'harvest_job_timeout': 3600,
     }
+    queues = [
+        'discovery',
+        'rediscovery',
+        'sweep',
+    ]
     
     def ready(self):
         super().ready()
@@ -1,5 +1,9 @@
+from django import forms
 from django.contrib import admin
-from .models import AutoDiscoveryConfig
+from .models import (
+    AutoDiscoveryConfig, DeviceIdentity, DeviceState, DiscoveryJob, DiscoveryResult, KnownCredential, PrefixSweep,
+    SNMPCredential, SSHCredential, TopologyCrawl, UnreachableTarget,
+)
 
 
 @admin.register(AutoDiscoveryConfig)
@@ -40,3 +44,182 @@ class AutoDiscoveryConfigAdmin(admin.ModelAdmin):
     def has_delete_permission(self, request, obj=None):
         # Don't allow deletion of the configuration
         return False
+
+
+@admin.register(DiscoveryJob)
+class DiscoveryJobAdmin(admin.ModelAdmin):
+    """
+    Read-only view of queued discovery jobs and their status.
+    """
+    list_display = ('address', 'status', 'device', 'created', 'started', 'completed')
+    list_filter = ('status',)
+    search_fields = ('address', 'job_id')
+    readonly_fields = (
+        'ip_address', 'address', 'status', 'job_id', 'device', 'error', 'created', 'started', 'completed'
+    )
+
+    def has_add_permission(self, request):
+        # Jobs are only created by the discovery signal
+        return False
+
+
+@admin.register(PrefixSweep)
+class PrefixSweepAdmin(admin.ModelAdmin):
+    """
+    Progress and checkpoints of prefix sweeps.
+    """
+    list_display = ('prefix', 'vrf', 'status', 'hosts_scanned', 'hosts_total', 'responders', 'devices', 'updated')
+    list_filter = ('status',)
+    search_fields = ('prefix',)
+    readonly_fields = (
+        'prefix', 'vrf', 'status', 'job_id', 'hosts_total', 'hosts_scanned', 'responders', 'devices',
+        'last_address', 'error', 'created', 'updated', 'completed'
+    )
+
+    def has_add_permission(self, request):
+        # Sweeps are started from a prefix or the autodiscover_prefix command
+        return False
+
+
+@admin.register(TopologyCrawl)
+class TopologyCrawlAdmin(admin.ModelAdmin):
+    """
+    Progress of LLDP/CDP topology crawls.
+    """
+    list_display = ('seed', 'status', 'depth', 'max_depth', 'visited', 'responders', 'devices', 'cables', 'updated')
+    list_filter = ('status',)
+    search_fields = ('seed',)
+    readonly_fields = (
+        'seed', 'max_depth', 'allow_prefixes', 'deny_prefixes', 'status', 'job_id', 'depth', 'visited',
+        'responders', 'devices', 'cables', 'error', 'created', 'updated', 'completed'
+    )
+
+    def has_add_permission(self, request):
+        # Crawls are started from a device or the autodiscover_crawl command
+        return False
+
+
+@admin.register(UnreachableTarget)
+class UnreachableTargetAdmin(admin.ModelAdmin):
+    """
+    Targets skipped by discovery after SNMP failures. Delete an entry to retry it right away.
+    """
+    list_display = ('address', 'failures', 'last_failure', 'retry_after', 'last_error')
+    search_fields = ('address',)
+    readonly_fields = ('address', 'credential', 'failures', 'first_failure', 'last_failure', 'retry_after', 'last_error')
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(DeviceState)
+class DeviceStateAdmin(admin.ModelAdmin):
+    """
+    Change indicators kept for rediscovery. Delete an entry to force a full re-poll.
+    """
+    list_display = ('device', 'sys_uptime', 'if_table_last_change', 'last_polled', 'last_full_poll', 'last_changed')
+    search_fields = ('device__name',)
+    readonly_fields = (
+        'device', 'sys_uptime', 'if_table_last_change', 'interface_changes', 'last_polled', 'last_full_poll',
+        'last_changed'
+    )
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(DeviceIdentity)
+class DeviceIdentityAdmin(admin.ModelAdmin):
+    """
+    Identifiers matching new IPs to existing devices. Delete an entry if a device was matched wrongly.
+    """
+    list_display = ('device', 'kind', 'value', 'updated')
+    list_filter = ('kind',)
+    search_fields = ('device__name', 'value')
+    readonly_fields = ('kind', 'value', 'device', 'updated')
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(DiscoveryResult)
+class DiscoveryResultAdmin(admin.ModelAdmin):
+    """
+    Data collected by each discovery run.
+    """
+    list_display = ('address', 'status', 'protocol', 'device', 'total_duration', 'created')
+    list_filter = ('status', 'protocol')
+    search_fields = ('address',)
+    readonly_fields = ('ip_address', 'address', 'device', 'status', 'protocol', 'data', 'durations', 'error', 'created')
+
+    def has_add_permission(self, request):
+        return False
+
+
+class SNMPCredentialForm(forms.ModelForm):
+    class Meta:
+        model = SNMPCredential
+        fields = '__all__'
+        widgets = {
+            'community': forms.PasswordInput(render_value=True),
+            'auth_key': forms.PasswordInput(render_value=True),
+            'priv_key': forms.PasswordInput(render_value=True),
+        }
+
+
+@admin.register(SNMPCredential)
+class SNMPCredentialAdmin(admin.ModelAdmin):
+    """
+    SNMP credentials tried by discovery, in ascending priority.
+    """
+    form = SNMPCredentialForm
+    list_display = ('name', 'version', 'priority', 'enabled')
+    list_editable = ('priority', 'enabled')
+    list_filter = ('version', 'enabled')
+    search_fields = ('name', 'username')
+    fieldsets = (
+        (None, {
+            'fields': ('name', 'enabled', 'priority', 'version')
+        }),
+        ('SNMP v1/v2c', {
+            'fields': ('community',)
+        }),
+        ('SNMP v3', {
+            'fields': ('username', 'auth_protocol', 'auth_key', 'priv_protocol', 'priv_key')
+        }),
+    )
+
+
+@admin.register(KnownCredential)
+class KnownCredentialAdmin(admin.ModelAdmin):
+    """
+    The credential that last worked per address and subnet. Delete an entry to go back to priority order.
+    """
+    list_display = ('scope', 'credential', 'updated')
+    search_fields = ('scope',)
+    readonly_fields = ('scope', 'credential', 'updated')
+
+    def has_add_permission(self, request):
+        return False
+
+
+class SSHCredentialForm(forms.ModelForm):
+    class Meta:
+        model = SSHCredential
+        fields = '__all__'
+        widgets = {
+            'password': forms.PasswordInput(render_value=True),
+            'secret': forms.PasswordInput(render_value=True),
+        }
+
+
+@admin.register(SSHCredential)
+class SSHCredentialAdmin(admin.ModelAdmin):
+    """
+    SSH logins tried for devices that do not answer SNMP, in ascending priority.
+    """
+    form = SSHCredentialForm
+    list_display = ('name', 'username', 'device_type', 'port', 'priority', 'enabled')
+    list_editable = ('priority', 'enabled')
+    list_filter = ('device_type', 'enabled')
+    search_fields = ('name', 'username')
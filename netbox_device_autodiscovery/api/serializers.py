@@ -0,0 +1,15 @@
+from rest_framework import serializers
+from ..models import DiscoveryResult
+
+
+class DiscoveryResultSerializer(serializers.ModelSerializer):
+    url = serializers.HyperlinkedIdentityField(
+        view_name='plugins-api:netbox_device_autodiscovery-api:discoveryresult-detail'
+    )
+
+    class Meta:
+        model = DiscoveryResult
+        fields = (
+            'id', 'url', 'ip_address', 'address', 'device', 'status', 'protocol', 'data', 'durations', 'error',
+            'created',
+        )
@@ -0,0 +1,7 @@
+from netbox.api.routers import NetBoxRouter
+from . import views
+
+router = NetBoxRouter()
+router.register('results', views.DiscoveryResultViewSet)
+
+urlpatterns = router.urls
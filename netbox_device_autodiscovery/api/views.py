@@ -0,0 +1,22 @@
+from netbox.api.authentication import TokenPermissions
+from rest_framework.viewsets import ReadOnlyModelViewSet
+from ..models import DiscoveryResult
+from .serializers import DiscoveryResultSerializer
+
+
+class DiscoveryResultViewSet(ReadOnlyModelViewSet):
+    """
+    Stored discovery results. Filter with ?device_id=, ?ip_address_id=, ?address=,
+    ?status= and ?protocol=.
+    """
+    permission_classes = [TokenPermissions]
+    queryset = DiscoveryResult.objects.all()
+    serializer_class = DiscoveryResultSerializer
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        for param in ('device_id', 'ip_address_id', 'address', 'status', 'protocol'):
+            value = self.request.query_params.get(param)
+            if value:
+                queryset = queryset.filter(**{param: value})
+        return queryset
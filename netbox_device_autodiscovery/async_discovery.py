@@ -0,0 +1,351 @@
+from pysnmp.hlapi.asyncio import (
+    ContextData, ObjectIdentity, ObjectType, SnmpEngine, Udp6TransportTarget, UdpTransportTarget, bulkCmd, getCmd,
+    nextCmd,
+)
+from . import credentials, negative_cache, ssh
+from .discovery import DeviceDiscovery
+from .metrics import PHASE_DURATION, PROBES_IN_FLIGHT, SNMP_PDUS, SNMP_PROBES, snmp_outcome
+from .models import AutoDiscoveryConfig, DiscoveryResult
+from .probe import SYS_UPTIME_OID, Reachability, adaptive_timeout
+from .resolver import get_resolver
+from .scheduler import PRIORITY_INTERACTIVE, get_scheduler
+from .snmp import (
+    INTERFACE_COLUMNS, NO_SUCH_NAME, SYSTEM_OIDS, SNMPError, add_column_value, address_oids, build_interfaces,
+    format_value, get_auth_data, is_empty_value, is_v1,
+)
+from .utils import get_plugin_setting
+import asyncio
+import ipaddress
+import logging
+import time
+
+logger = logging.getLogger('netbox.plugins.device_autodiscovery')
+
+
+class AsyncDiscoveryEngine:
+    """
+    Probes many targets concurrently using pysnmp's asyncio hlapi.
+
+    Results are plain `device_info` dicts, ready to be handed to DeviceDiscovery.
+    """
+
+    def __init__(self, credentials, timeout, retries=1, concurrency=100, deadline=30, max_repetitions=25,
+                 prefilter_timeout=None, priority=PRIORITY_INTERACTIVE):
+        """
+        `credentials` are tried in turn for each target. With `prefilter_timeout`,
+        every target first gets a single short sysUpTime GET; targets that answer
+        are then queried with a timeout derived from its latency. `priority` is the
+        scheduler class of the probes (see scheduler.py).
+        """
+        self.credentials = list(credentials)
+        self.scheduler = get_scheduler(priority)
+        self.timeout = timeout
+        self.retries = retries
+        self.concurrency = concurrency
+        self.deadline = deadline
+        self.max_repetitions = max_repetitions
+        self.prefilter_timeout = prefilter_timeout
+        # ip -> Reachability of the targets probed by the pre-filter
+        self.reachability = {}
+        # ip -> duration of its probe in milliseconds
+        self.timings = {}
+        # ip -> credentials in the order to try them, and the credential that worked
+        self.order = {}
+        self.used = {}
+
+    def run(self, ips):
+        """
+        Probe all IPs and return a dict of ip -> device_info (empty for non-responders).
+        """
+        return asyncio.run(self.probe_many(ips))
+
+    def run_cached(self, ips):
+        """
+        Like run(), but skip targets in negative-cache backoff, try the last known
+        good credentials first, and record the outcomes.
+        """
+        credential_set = credentials.set_key(self.credentials)
+        suppressed = negative_cache.get_suppressed(ips, credential_set)
+        if suppressed:
+            logger.debug(f"Skipping {len(suppressed)} targets in backoff")
+
+        ips = [ip for ip in ips if ip not in suppressed]
+        self.order = credentials.order_credentials(self.credentials, ips)
+        results = self.run(ips)
+
+        negative_cache.record_results(
+            {ip: 'No SNMP response' for ip, device_info in results.items() if not device_info},
+            credential_set,
+            successes=[ip for ip, device_info in results.items() if device_info]
+        )
+        credentials.record_successes({ip: self.used[ip] for ip, device_info in results.items() if device_info})
+        return results
+
+    async def probe_many(self, ips):
+        self.engine = SnmpEngine()
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def bounded_probe(ip):
+            async with self.scheduler.slot(ip, semaphore):
+                started = time.monotonic()
+                PROBES_IN_FLIGHT.inc()
+                try:
+                    result = await asyncio.wait_for(self.probe(ip), self.deadline)
+                    # An empty result means the reachability pre-probe got no answer
+                    SNMP_PROBES.labels(snmp_outcome(None) if result else 'unreachable').inc()
+                    return ip, result
+                except asyncio.TimeoutError:
+                    logger.debug(f"SNMP probe of {ip} exceeded the {self.deadline}s deadline")
+                    SNMP_PROBES.labels('timeout').inc()
+                except Exception as e:
+                    logger.debug(f"SNMP probe of {ip} failed: {str(e)}")
+                    SNMP_PROBES.labels(snmp_outcome(e)).inc()
+                finally:
+                    PROBES_IN_FLIGHT.dec()
+                    self.timings[ip] = round((time.monotonic() - started) * 1000, 1)
+                    PHASE_DURATION.labels('snmp').observe(self.timings[ip] / 1000)
+                return ip, {}
+
+        try:
+            # Probes start in this order, spread across prefixes
+            return dict(await asyncio.gather(*[bounded_probe(ip) for ip in self.scheduler.interleave(ips)]))
+        finally:
+            if self.engine.transportDispatcher:
+                self.engine.transportDispatcher.closeDispatcher()
+
+    async def probe(self, ip):
+        """
+        Fetch the system group and interface table of a single target.
+        """
+        timeout = self.timeout
+        candidates = self.get_order(ip)
+        if self.prefilter_timeout:
+            transport = await self._transport(ip, self.prefilter_timeout, 0)
+            started = time.monotonic()
+            try:
+                _, credential = await self._login(transport, candidates, {'sysUpTime': SYS_UPTIME_OID})
+            except SNMPError:
+                self.reachability[ip] = Reachability(False, False, None, None)
+                return {}
+            latency = time.monotonic() - started
+            self.reachability[ip] = Reachability(True, True, 'snmp', latency)
+            timeout = adaptive_timeout(latency, self.timeout)
+            candidates = [credential]
+
+        transport = await self._transport(ip, timeout, self.retries)
+        device_info, credential = await self._login(transport, candidates, {**SYSTEM_OIDS, **address_oids(ip)})
+        self.used[ip] = credential
+        if device_info:
+            try:
+                table = await self._walk(transport, credential, INTERFACE_COLUMNS)
+            except SNMPError as e:
+                # The target did answer; keep its system group rather than report it unreachable
+                logger.warning(f"Interface discovery failed for {ip}: {str(e)}")
+                table = {}
+            device_info['interfaces'] = build_interfaces(table)
+        return device_info
+
+    def get_order(self, ip):
+        return self.order.get(ip) or self.credentials
+
+    async def _login(self, transport, candidates, oids):
+        """
+        GET `oids` with each credential in turn; return the values and the credential
+        of the first that gets an answer. Raises the last SNMPError if none does.
+        """
+        error = None
+        for credential in candidates:
+            try:
+                return await self._get(transport, credential, oids), credential
+            except SNMPError as e:
+                error = e
+        raise error
+
+    async def _transport(self, ip, timeout, retries):
+        port = get_plugin_setting('snmp_port', 161)
+        transport_class = Udp6TransportTarget if ipaddress.ip_address(ip).version == 6 else UdpTransportTarget
+        # pysnmp >= 6 resolves the address asynchronously through a factory
+        if hasattr(transport_class, 'create'):
+            return await transport_class.create((ip, port), timeout=timeout, retries=retries)
+        return transport_class((ip, port), timeout=timeout, retries=retries)
+
+    async def _get(self, transport, credential, oids):
+        oids = dict(oids)
+        result = {}
+
+        while oids:
+            SNMP_PDUS.labels('get').inc()
+            errorIndication, errorStatus, errorIndex, varBinds = await getCmd(
+                self.engine,
+                get_auth_data(credential),
+                transport,
+                ContextData(),
+                *[ObjectType(ObjectIdentity(oid)) for oid in oids.values()],
+                lookupMib=False
+            )
+
+            if errorIndication:
+                raise SNMPError(str(errorIndication))
+
+            if errorStatus:
+                if int(errorStatus) == NO_SUCH_NAME and errorIndex:
+                    del oids[list(oids)[int(errorIndex) - 1]]
+                    continue
+                raise SNMPError(errorStatus.prettyPrint())
+
+            for key, varBind in zip(oids, varBinds):
+                if not is_empty_value(varBind[1]):
+                    result[key] = format_value(key, varBind[1])
+            break
+
+        return result
+
+    async def _get_rows(self, transport, credential, columns, indexes, rows_per_request=4):
+        """
+        Fetch selected rows of a table with GETs instead of walking all of it.
+
+        Returns a dict of row index -> {column key: value}, like _walk().
+        """
+        table = {}
+        indexes = list(indexes)
+
+        for start in range(0, len(indexes), rows_per_request):
+            oids = [f'{oid}.{index}' for index in indexes[start:start + rows_per_request] for oid in columns.values()]
+            SNMP_PDUS.labels('get').inc()
+            errorIndication, errorStatus, errorIndex, varBinds = await getCmd(
+                self.engine,
+                get_auth_data(credential),
+                transport,
+                ContextData(),
+                *[ObjectType(ObjectIdentity(oid)) for oid in oids],
+                lookupMib=False
+            )
+            if errorIndication:
+                raise SNMPError(str(errorIndication))
+            if errorStatus:
+                raise SNMPError(errorStatus.prettyPrint())
+
+            for name, value in varBinds:
+                add_column_value(table, columns, str(name), value)
+
+        return table
+
+    async def _walk(self, transport, credential, columns):
+        """
+        Walk several table columns side by side with GETBULK (GETNEXT for SNMPv1).
+
+        Columns that run out are dropped from later requests. Returns a dict of
+        row index -> {column key: value}, like snmp.snmp_bulk_walk.
+        """
+        table = {}
+        # column key -> OID to continue the walk from
+        cursors = dict(columns)
+        auth_data = get_auth_data(credential)
+
+        while cursors:
+            objects = [ObjectType(ObjectIdentity(oid)) for oid in cursors.values()]
+            if is_v1(credential):
+                SNMP_PDUS.labels('getnext').inc()
+                errorIndication, errorStatus, errorIndex, varBindTable = await nextCmd(
+                    self.engine, auth_data, transport, ContextData(), *objects, lookupMib=False
+                )
+            else:
+                SNMP_PDUS.labels('getbulk').inc()
+                errorIndication, errorStatus, errorIndex, varBindTable = await bulkCmd(
+                    self.engine, auth_data, transport, ContextData(), 0, self.max_repetitions, *objects,
+                    lookupMib=False
+                )
+            if errorIndication:
+                raise SNMPError(str(errorIndication))
+            if errorStatus or not varBindTable:
+                break
+
+            keys = list(cursors)
+            for varBindRow in varBindTable:
+                for key, (name, value) in zip(keys, varBindRow):
+                    if key not in cursors:
+                        continue
+                    name = str(name)
+                    if add_column_value(table, {key: columns[key]}, name, value):
+                        cursors[key] = name
+                    else:
+                        del cursors[key]
+
+        return table
+
+
+def get_engine_for_config(db_config=None, engine_class=AsyncDiscoveryEngine, **kwargs):
+    """
+    Build an AsyncDiscoveryEngine (or subclass) from the plugin configuration.
+    """
+    if db_config:
+        timeout = db_config.snmp_timeout
+    else:
+        timeout = get_plugin_setting('snmp_timeout', 5)
+
+    options = {
+        'concurrency': get_plugin_setting('bulk_concurrency', 100),
+        'deadline': get_plugin_setting('bulk_deadline', 30),
+        'max_repetitions': get_plugin_setting('snmp_max_repetitions', 25),
+    }
+    if get_plugin_setting('prefilter_enabled', False):
+        options['prefilter_timeout'] = get_plugin_setting('prefilter_timeout', 1)
+    options.update(kwargs)
+    return engine_class(credentials.get_credentials(db_config), timeout, **options)
+
+
+def discover_many(ip_addresses, chunk_size=256, **kwargs):
+    """
+    Discover devices for many IPAddress objects, probing them concurrently.
+
+    SNMP probing runs in an event loop one chunk at a time; the ORM work for each
+    chunk then goes through the regular DeviceDiscovery.create_device path.
+    Returns a dict of IPAddress -> Device (or None).
+    """
+    db_config = AutoDiscoveryConfig.get_cached_config()
+    if not db_config.enabled:
+        logger.info("⏸️  Auto-discovery is disabled in configuration")
+        return {}
+
+    engine = get_engine_for_config(db_config, **kwargs)
+    ssh_credentials = ssh.get_credentials(db_config) if get_plugin_setting('enable_ssh', False) else []
+    ip_addresses = list(ip_addresses)
+    devices = {}
+
+    for start in range(0, len(ip_addresses), chunk_size):
+        chunk = ip_addresses[start:start + chunk_size]
+        if db_config.snmp_enabled:
+            results = engine.run_cached([str(ip.address.ip) for ip in chunk])
+        else:
+            results = {}
+
+        # SSH facts and names of all non-responders are collected at once, in parallel
+        silent = [str(ip_address.address.ip) for ip_address in chunk if not results.get(str(ip_address.address.ip))]
+        ssh_results = ssh.collect_many(silent, ssh_credentials) if ssh_credentials else {}
+        if db_config.dns_enabled:
+            get_resolver().resolve_many([ip for ip in silent if not ssh_results.get(ip)])
+
+        discovery_results = []
+        for ip_address in chunk:
+            ip = str(ip_address.address.ip)
+            discovery = DeviceDiscovery(
+                ip_address,
+                device_info=results.get(ip) or ssh_results.get(ip, {}),
+                timings={'snmp': engine.timings[ip]} if ip in engine.timings else None
+            )
+            if ssh_results.get(ip) and not results.get(ip):
+                discovery.protocol = DiscoveryResult.PROTOCOL_SSH
+            try:
+                devices[ip_address] = discovery.discover_and_create_device(save_result=False)
+            except Exception as e:
+                # One broken target must not abort the rest of the batch
+                logger.error(f"❌ ERROR during device discovery for IP {ip_address.address}: {str(e)}")
+                devices[ip_address] = None
+            if discovery.result:
+                discovery_results.append(discovery.result)
+
+        DiscoveryResult.objects.bulk_create(discovery_results, batch_size=get_plugin_setting('bulk_batch_size', 500))
+
+        logger.info(f"📦 Bulk discovery progress: {min(start + chunk_size, len(ip_addresses))}/{len(ip_addresses)}")
+
+    return devices
@@ -0,0 +1,65 @@
+from collections import OrderedDict
+from django.db import transaction
+from .utils import get_plugin_setting
+import threading
+import time
+
+
+class LookupCache:
+    """
+    Process-local LRU cache with TTL for resolved NetBox objects.
+
+    Entries are keyed by (model, key). Saving or deleting an instance of a cached
+    model drops all entries of that model (see signals.py); the TTL bounds how long
+    changes made by other processes can go unnoticed. Database objects are
+    cached with `on_commit=True`, so objects created by a transaction that is
+    rolled back are never served.
+    """
+
+    def __init__(self, maxsize=1024, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, model, key):
+        with self._lock:
+            entry = self._entries.get((model, key))
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._entries[(model, key)]
+                return None
+            self._entries.move_to_end((model, key))
+            return value
+
+    def set(self, model, key, value, ttl=None, on_commit=False):
+        """
+        Cache a value. With `on_commit`, wait until the current transaction (if any)
+        commits; this touches the database connection, so it is only for ORM
+        lookups, not for caches written from event loops or threads.
+        """
+        if on_commit:
+            transaction.on_commit(lambda: self.set(model, key, value, ttl))
+            return
+        with self._lock:
+            self._entries[(model, key)] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+            self._entries.move_to_end((model, key))
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, model):
+        with self._lock:
+            for cache_key in [cache_key for cache_key in self._entries if cache_key[0] is model]:
+                del self._entries[cache_key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+lookup_cache = LookupCache(
+    maxsize=get_plugin_setting('lookup_cache_size', 1024),
+    ttl=get_plugin_setting('lookup_cache_ttl', 300)
+)
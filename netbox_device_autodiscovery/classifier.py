@@ -0,0 +1,146 @@
+from collections import namedtuple
+from .utils import get_plugin_setting
+import csv
+import logging
+import os
+import re
+
+logger = logging.getLogger('netbox.plugins.device_autodiscovery')
+
+ENTERPRISES_OID = '1.3.6.1.4.1'
+
+DEFAULT_DATABASE = os.path.join(os.path.dirname(__file__), 'data', 'vendors.csv')
+
+Classification = namedtuple('Classification', ['manufacturer', 'platform'])
+
+
+class VendorClassifier:
+    """
+    Maps sysObjectID and sysDescr to a manufacturer and platform.
+
+    sysObjectID prefixes are kept in a trie keyed by OID arc, so a lookup walks at
+    most one node per arc no matter how many prefixes are loaded; the deepest
+    matching prefix wins. sysDescr is only consulted for what the OID did not
+    answer; its patterns are tried in order until both are known.
+    """
+
+    def __init__(self):
+        self.root = {}
+        self.descr_rules = []
+
+    def add_oid(self, prefix, manufacturer=None, platform=None):
+        node = self.root
+        for arc in prefix.strip('.').split('.'):
+            node = node.setdefault(int(arc), {})
+        if manufacturer:
+            node['manufacturer'] = manufacturer
+        if platform:
+            node['platform'] = platform
+
+    def add_descr_pattern(self, pattern, manufacturer=None, platform=None):
+        """
+        Add a case-insensitive sysDescr pattern. Earlier patterns take precedence.
+        """
+        self.descr_rules.append((re.compile(pattern, re.IGNORECASE), manufacturer, platform))
+
+    def load(self, path):
+        """
+        Load a CSV mapping file with the columns kind (oid or descr), match,
+        manufacturer and platform. Lines starting with '#' are ignored.
+        """
+        count = 0
+        with open(path, newline='', encoding='utf-8') as f:
+            rows = csv.DictReader(line for line in f if line.strip() and not line.startswith('#'))
+            for row in rows:
+                manufacturer = row.get('manufacturer') or None
+                platform = row.get('platform') or None
+                if row['kind'] == 'oid':
+                    self.add_oid(row['match'], manufacturer, platform)
+                elif row['kind'] == 'descr':
+                    self.add_descr_pattern(row['match'], manufacturer, platform)
+                else:
+                    raise ValueError(f"{path}: unknown entry kind '{row['kind']}'")
+                count += 1
+        logger.debug(f"Loaded {count} vendor classification entries from {path}")
+        return count
+
+    def load_iana(self, path):
+        """
+        Load the IANA Private Enterprise Numbers registry
+        (https://www.iana.org/assignments/enterprise-numbers.txt) as manufacturer names.
+        """
+        count = 0
+        number = None
+        with open(path, encoding='utf-8', errors='replace') as f:
+            for line in f:
+                if line[:1].isdigit():
+                    number = line.strip()
+                elif number is not None and line.startswith('  ') and not line.startswith('    '):
+                    organization = line.strip()
+                    if organization and organization != '---none---':
+                        self.add_oid(f'{ENTERPRISES_OID}.{number}', manufacturer=organization[:100])
+                        count += 1
+                    number = None
+        logger.debug(f"Loaded {count} enterprise numbers from {path}")
+        return count
+
+    def classify(self, sys_object_id=None, sys_descr=None):
+        manufacturer, platform = self._lookup_oid(sys_object_id) if sys_object_id else (None, None)
+        if sys_descr and not (manufacturer and platform):
+            descr_manufacturer, descr_platform = self._match_descr(sys_descr)
+            manufacturer = manufacturer or descr_manufacturer
+            platform = platform or descr_platform
+        return Classification(manufacturer, platform)
+
+    def _lookup_oid(self, oid):
+        manufacturer = platform = None
+        node = self.root
+        for arc in oid.strip('.').split('.'):
+            try:
+                node = node.get(int(arc))
+            except ValueError:
+                break
+            if node is None:
+                break
+            manufacturer = node.get('manufacturer', manufacturer)
+            platform = node.get('platform', platform)
+        return manufacturer, platform
+
+    def _match_descr(self, text):
+        # Each pattern is searched on its own: in a single alternation, a general
+        # pattern matching earlier in the text (e.g. "Cisco IOS") would hide a more
+        # specific one listed before it (e.g. "IOS XR")
+        manufacturer = platform = None
+        for regex, rule_manufacturer, rule_platform in self.descr_rules:
+            if (manufacturer or not rule_manufacturer) and (platform or not rule_platform):
+                continue
+            if regex.search(text):
+                manufacturer = manufacturer or rule_manufacturer
+                platform = platform or rule_platform
+                if manufacturer and platform:
+                    break
+        return manufacturer, platform
+
+
+_classifier = None
+
+
+def get_classifier():
+    """
+    Return the process-wide classifier, loading the mapping files on first use.
+
+    The IANA registry (`iana_enterprise_numbers`) is loaded first, then the bundled
+    database, then any files listed in `vendor_databases`, so later files override
+    earlier ones.
+    """
+    global _classifier
+    if _classifier is None:
+        classifier = VendorClassifier()
+        iana_path = get_plugin_setting('iana_enterprise_numbers')
+        if iana_path:
+            classifier.load_iana(iana_path)
+        classifier.load(DEFAULT_DATABASE)
+        for path in get_plugin_setting('vendor_databases', []):
+            classifier.load(path)
+        _classifier = classifier
+    return _classifier
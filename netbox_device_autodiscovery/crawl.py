@@ -0,0 +1,280 @@
+from django.db import transaction
+from django.db.models.functions import Lower
+from django.utils import timezone
+from dcim.models import Cable, Device, Interface
+from ipam.models import IPAddress
+from .async_discovery import AsyncDiscoveryEngine, get_engine_for_config
+from .discovery import DeviceDiscovery
+from .models import AutoDiscoveryConfig, TopologyCrawl
+from .scheduler import PRIORITY_SWEEP
+from .snmp import NEIGHBOUR_COLUMNS, SNMPError, build_neighbours
+from .utils import discovery_suppressed, get_plugin_setting
+import ipaddress
+import logging
+import re
+
+logger = logging.getLogger('netbox.plugins.device_autodiscovery')
+
+# CDP device IDs of some platforms carry the serial number, e.g. "core-sw1(FOC1234X0AB)"
+DEVICE_ID_SUFFIX = re.compile(r'\(.*\)$')
+
+
+class NeighbourEngine(AsyncDiscoveryEngine):
+    """
+    Probes targets like AsyncDiscoveryEngine, and also walks their LLDP and CDP
+    neighbour tables. Results carry a `neighbours` list (see snmp.build_neighbours).
+    """
+
+    async def probe(self, ip):
+        device_info = await super().probe(ip)
+        if not device_info:
+            return device_info
+
+        transport = await self._transport(ip, self.timeout, self.retries)
+        try:
+            table = await self._walk(transport, self.used[ip], NEIGHBOUR_COLUMNS)
+        except SNMPError as e:
+            logger.debug(f"Could not walk the neighbour tables of {ip}: {str(e)}")
+            table = {}
+        device_info['neighbours'] = build_neighbours(table, device_info['interfaces'])
+        return device_info
+
+
+def parse_prefixes(prefixes):
+    return [ipaddress.ip_network(prefix) for prefix in prefixes]
+
+
+def start_crawl(seed, max_depth=None, allow_prefixes=None, deny_prefixes=None):
+    """
+    Create a crawl from a seed address, with the configured defaults for
+    anything not given.
+    """
+    ipaddress.ip_address(seed)
+    allow_prefixes = get_plugin_setting('crawl_allow_prefixes', []) if allow_prefixes is None else allow_prefixes
+    deny_prefixes = get_plugin_setting('crawl_deny_prefixes', []) if deny_prefixes is None else deny_prefixes
+    # Fail early on malformed prefixes
+    parse_prefixes(allow_prefixes)
+    parse_prefixes(deny_prefixes)
+
+    return TopologyCrawl.objects.create(
+        seed=seed,
+        max_depth=get_plugin_setting('crawl_max_depth', 3) if max_depth is None else max_depth,
+        allow_prefixes=[str(ipaddress.ip_network(prefix)) for prefix in allow_prefixes],
+        deny_prefixes=[str(ipaddress.ip_network(prefix)) for prefix in deny_prefixes]
+    )
+
+
+class TopologyCrawler:
+    """
+    Discovers a network by following LLDP and CDP neighbours from a seed address.
+
+    The crawl proceeds breadth-first, one hop at a time: all addresses of the
+    frontier are probed concurrently, responders are materialised as devices,
+    and the management addresses their neighbours report that were not visited
+    yet form the next frontier. Once the frontier is exhausted (or `max_depth`
+    is reached), cables are created between the interfaces on both ends of each
+    link.
+    """
+
+    def __init__(self, crawl, concurrency=None, progress=None):
+        self.crawl = crawl
+        self.progress = progress
+        self.db_config = AutoDiscoveryConfig.get_cached_config()
+        self.allow = parse_prefixes(crawl.allow_prefixes)
+        self.deny = parse_prefixes(crawl.deny_prefixes)
+        self.max_hosts = get_plugin_setting('crawl_max_hosts', 4096)
+
+        options = {'engine_class': NeighbourEngine, 'priority': PRIORITY_SWEEP}
+        if concurrency:
+            options['concurrency'] = concurrency
+        self.engine = get_engine_for_config(self.db_config, **options)
+
+        self.visited = set()
+        # ip -> device of every responder, and (device, neighbour) pairs to cable
+        self.devices = {}
+        self.links = []
+
+    def is_allowed(self, ip):
+        address = ipaddress.ip_address(ip)
+        if any(address.version == network.version and address in network for network in self.deny):
+            return False
+        return not self.allow or any(
+            address.version == network.version and address in network for network in self.allow
+        )
+
+    def run(self):
+        crawl = self.crawl
+        if not self.db_config.enabled or not self.db_config.snmp_enabled:
+            raise ValueError("Auto-discovery or SNMP is disabled in configuration")
+
+        crawl.status = TopologyCrawl.STATUS_RUNNING
+        crawl.error = ''
+        crawl.save(update_fields=['status', 'error', 'updated'])
+        logger.info(f"🕸️  Starting topology crawl from {crawl.seed} (max. {crawl.max_depth} hops)")
+
+        try:
+            frontier = [crawl.seed]
+            depth = 0
+            while frontier:
+                frontier = self.process_hop(frontier, depth)
+                if depth >= crawl.max_depth:
+                    break
+                depth += 1
+            crawl.cables += self.create_cables()
+        except BaseException as e:
+            # Like sweeps, never stay running after a job timeout
+            crawl.status = TopologyCrawl.STATUS_FAILED
+            crawl.error = str(e) or e.__class__.__name__
+            crawl.save(update_fields=['status', 'error', 'cables', 'updated'])
+            raise
+
+        crawl.status = TopologyCrawl.STATUS_COMPLETED
+        crawl.completed = timezone.now()
+        crawl.save(update_fields=['status', 'cables', 'completed', 'updated'])
+        logger.info(
+            f"✅ Topology crawl from {crawl.seed} complete: {crawl.visited} addresses visited, "
+            f"{crawl.devices} devices, {crawl.cables} cables"
+        )
+        return crawl
+
+    def process_hop(self, frontier, depth):
+        """
+        Probe and materialise one hop; return the next frontier.
+        """
+        crawl = self.crawl
+        ips = []
+        for ip in frontier:
+            if ip in self.visited or not self.is_allowed(ip):
+                continue
+            if len(self.visited) >= self.max_hosts:
+                logger.warning(f"⚠️  Topology crawl reached {self.max_hosts} addresses (crawl_max_hosts), stopping")
+                break
+            self.visited.add(ip)
+            ips.append(ip)
+
+        results = self.engine.run_cached(ips)
+        next_frontier = []
+        for ip in ips:
+            device_info = results.get(ip)
+            if not device_info:
+                continue
+            crawl.responders += 1
+            neighbours = device_info.pop('neighbours', [])
+            device = self.materialise(ip, device_info)
+            if device is None:
+                continue
+            self.devices[ip] = device
+            for neighbour in neighbours:
+                self.links.append((device, neighbour))
+                next_frontier.extend(address for address in neighbour['addresses'] if address not in self.visited)
+
+        # dict.fromkeys drops repeats while keeping the order
+        next_frontier = list(dict.fromkeys(next_frontier))
+
+        crawl.depth = depth
+        crawl.visited = len(self.visited)
+        crawl.devices = len(set(self.devices.values()))
+        crawl.save(update_fields=['depth', 'visited', 'responders', 'devices', 'updated'])
+        if self.progress:
+            self.progress(crawl, len(next_frontier))
+
+        return next_frontier
+
+    def materialise(self, ip, device_info):
+        """
+        Return the device of a responding address, creating the IP and device as needed.
+        """
+        ip_address = IPAddress.objects.filter(vrf=None, address__net_host=ip).first()
+
+        if ip_address is None:
+            with discovery_suppressed():
+                ip_address = IPAddress.objects.create(
+                    address=f"{ip}/{32 if ipaddress.ip_address(ip).version == 4 else 128}",
+                    description='Created by auto-discovery topology crawl'
+                )
+        elif ip_address.assigned_object:
+            # Already known, e.g. the seed: its neighbours are still followed
+            return getattr(ip_address.assigned_object, 'device', None)
+
+        timings = {'snmp': self.engine.timings[ip]} if ip in self.engine.timings else None
+        return DeviceDiscovery(ip_address, device_info=device_info, timings=timings).discover_and_create_device()
+
+    def find_remote_device(self, neighbour, by_name):
+        for address in neighbour['addresses']:
+            if address in self.devices:
+                return self.devices[address]
+        if neighbour['name']:
+            name = DEVICE_ID_SUFFIX.sub('', neighbour['name']).lower()
+            # Also try the host name of a fully qualified name
+            return by_name.get(name) or by_name.get(name.split('.')[0])
+        return None
+
+    def create_cables(self):
+        """
+        Cable the local and remote interfaces of every link whose both ends are
+        known and not cabled yet. Returns the number of cables created.
+        """
+        if not self.links:
+            return 0
+
+        names = set()
+        for _, neighbour in self.links:
+            if neighbour['name']:
+                name = DEVICE_ID_SUFFIX.sub('', neighbour['name']).lower()
+                names.update((name, name.split('.')[0]))
+        by_name = {
+            device.name.lower(): device
+            for device in Device.objects.annotate(lower_name=Lower('name')).filter(lower_name__in=names)
+        }
+        by_name.update({device.name.lower(): device for device in self.devices.values()})
+
+        pairs = []
+        for device, neighbour in self.links:
+            remote = self.find_remote_device(neighbour, by_name)
+            if neighbour['interface'] and remote and remote != device and neighbour['ports']:
+                pairs.append((device, neighbour, remote))
+
+        # All interfaces of the devices involved, in one query
+        interfaces = {}
+        device_ids = {device.pk for pair in pairs for device in (pair[0], pair[2])}
+        for interface in Interface.objects.filter(device_id__in=device_ids):
+            interfaces[(interface.device_id, interface.name.lower())] = interface
+
+        created = 0
+        for device, neighbour, remote in pairs:
+            local_interface = interfaces.get((device.pk, neighbour['interface'].lower()))
+            remote_interface = next((
+                interfaces[(remote.pk, port.lower())]
+                for port in neighbour['ports'] if (remote.pk, port.lower()) in interfaces
+            ), None)
+            # Both ends report the link; the first one seen creates the cable
+            if not local_interface or not remote_interface or local_interface.cable_id or remote_interface.cable_id:
+                continue
+            try:
+                with transaction.atomic():
+                    cable = build_cable(local_interface, remote_interface)
+                    cable.save()
+            except Exception as e:
+                logger.warning(
+                    f"⚠️  Could not cable {device.name} {local_interface.name} to "
+                    f"{remote.name} {remote_interface.name}: {str(e)}"
+                )
+                continue
+            local_interface.cable_id = remote_interface.cable_id = cable.pk
+            created += 1
+            logger.info(
+                f"   ✓ Cabled {device.name} {local_interface.name} to {remote.name} {remote_interface.name} "
+                f"({neighbour['protocol'].upper()})"
+            )
+
+        return created
+
+
+def build_cable(a, b):
+    """
+    Return an unsaved cable between two interfaces.
+    """
+    # NetBox 3.3 replaced the single terminations with lists
+    if hasattr(Cable, 'a_terminations'):
+        return Cable(a_terminations=[a], b_terminations=[b])
+    return Cable(termination_a=a, termination_b=b)
@@ -0,0 +1,115 @@
+from django.utils import timezone
+from .models import KnownCredential, SNMPCredential
+from .negative_cache import credential_key
+from .utils import get_plugin_setting
+import ipaddress
+import logging
+
+logger = logging.getLogger('netbox.plugins.device_autodiscovery')
+
+
+def get_credentials(db_config=None):
+    """
+    Return the SNMP credentials to try, in priority order.
+
+    Without SNMP Credentials, the community (and v1/v2c version) of the
+    configuration is used as a single, unsaved credential.
+    """
+    if db_config is not None:
+        credentials = getattr(db_config, 'snmp_credentials', None)
+        if credentials is None:
+            credentials = list(SNMPCredential.objects.filter(enabled=True))
+        if credentials:
+            return credentials
+        community, version = db_config.snmp_community, db_config.snmp_version
+    else:
+        community, version = get_plugin_setting('snmp_community', 'public'), get_plugin_setting('snmp_version', 2)
+
+    return [SNMPCredential(name='default', version=1 if version == 1 else 2, community=community)]
+
+
+def set_key(credentials):
+    """
+    Identify a set of credentials for the negative cache: adding or changing a
+    credential gives every unreachable target a fresh chance.
+    """
+    return credential_key(*sorted(
+        f'{credential.version}:{credential.community}:{credential.username}:{credential.auth_key}:{credential.priv_key}'
+        for credential in credentials
+    ))
+
+
+def get_scope_prefix(address):
+    """
+    Return the subnet around an address that shares its last known good credential.
+    """
+    ip = ipaddress.ip_address(address)
+    if ip.version == 4:
+        length = get_plugin_setting('credential_prefix_length', 24)
+    else:
+        length = get_plugin_setting('credential_prefix_length_v6', 64)
+    return str(ipaddress.ip_network(f'{ip}/{length}', strict=False))
+
+
+def order_credentials(credentials, addresses):
+    """
+    Return a dict of address -> credentials in the order they should be tried.
+
+    The credential that last worked for the address goes first, followed by the
+    one that last worked in its subnet, then the rest by priority. Needs one
+    query for all addresses.
+    """
+    addresses = list(addresses)
+    if len(credentials) < 2:
+        return {address: list(credentials) for address in addresses}
+
+    scopes = {address: (address, get_scope_prefix(address)) for address in addresses}
+    known = dict(KnownCredential.objects.filter(
+        scope__in={scope for pair in scopes.values() for scope in pair}
+    ).values_list('scope', 'credential_id'))
+    by_pk = {credential.pk: credential for credential in credentials}
+
+    ordered = {}
+    for address, pair in scopes.items():
+        preferred = [by_pk[known[scope]] for scope in pair if known.get(scope) in by_pk]
+        # dict.fromkeys drops repeats while keeping the order
+        ordered[address] = list(dict.fromkeys(preferred + list(credentials)))
+    return ordered
+
+
+def record_successes(successes):
+    """
+    Remember the credential that worked for each address and for its subnet.
+
+    `successes` maps addresses to credentials. Only scopes whose credential
+    changed are written, so a stable network costs no writes.
+    """
+    winners = {}
+    for address, credential in successes.items():
+        # The fallback credential from the configuration has no row to point to
+        if credential.pk is None:
+            continue
+        winners[address] = credential
+        winners[get_scope_prefix(address)] = credential
+    if not winners:
+        return
+
+    existing = {known.scope: known for known in KnownCredential.objects.filter(scope__in=list(winners))}
+    now = timezone.now()
+    changed, new = [], []
+
+    for scope, credential in winners.items():
+        known = existing.get(scope)
+        if known is None:
+            new.append(KnownCredential(scope=scope, credential=credential, updated=now))
+        elif known.credential_id != credential.pk:
+            known.credential = credential
+            known.updated = now
+            changed.append(known)
+
+    batch_size = get_plugin_setting('bulk_batch_size', 500)
+    if changed:
+        KnownCredential.objects.bulk_update(changed, ['credential', 'updated'], batch_size=batch_size)
+    if new:
+        # Another worker may have recorded the same scope meanwhile
+        KnownCredential.objects.bulk_create(new, batch_size=batch_size, ignore_conflicts=True)
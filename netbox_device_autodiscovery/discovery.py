@@ -1,30 +1,103 @@
-import socket
-from pysnmp.hlapi import *
-from netmiko import ConnectHandler
 from dcim.models import Device, DeviceType, DeviceRole, Site, Manufacturer, Interface, Platform, Location
 from ipam.models import IPAddress
 from extras.models import Tag
 from tenancy.models import Tenant
+from contextlib import contextmanager
 from django.conf import settings
-from .models import AutoDiscoveryConfig
+from django.db import transaction
+from .cache import lookup_cache
+from .classifier import get_classifier
+from .locks import lock_device
+from .metrics import DISCOVERIES, SNMP_PROBES, observe_phase, snmp_outcome
+from .models import AutoDiscoveryConfig, DeviceIdentity, DiscoveryResult
+from . import credentials, identity, negative_cache, ssh
+from .probe import adaptive_timeout, check_reachability
+from .resolver import get_resolver
+from .scheduler import get_scheduler
+from .results import pack_device_info, unpack_device_info
+from .snmp import (
+    INTERFACE_COLUMNS, SYSTEM_OIDS, SNMPError, address_oids, build_interfaces, snmp_bulk_walk, snmp_get,
+)
+from .utils import send_bulk_create_signals
 import logging
 import ipaddress
+import time
 
 logger = logging.getLogger('netbox.plugins.device_autodiscovery')
 
+# IANA ifType values
+IF_TYPE_ETHERNET = 6
+IF_TYPE_LAG = 161
+VIRTUAL_IF_TYPES = {
+    24,   # softwareLoopback
+    53,   # propVirtual
+    131,  # tunnel
+    135,  # l2vlan
+    136,  # l3ipvlan
+}
+
+# ifHighSpeed (Mbps) of ethernetCsmacd interfaces -> NetBox interface type
+ETHERNET_SPEED_TYPES = {
+    10: '10base-t',
+    100: '100base-tx',
+    1000: '1000base-t',
+    2500: '2.5gbase-t',
+    10000: '10gbase-x-sfpp',
+    25000: '25gbase-x-sfp28',
+    40000: '40gbase-x-qsfpp',
+    100000: '100gbase-x-qsfp28',
+    400000: '400gbase-x-qsfpdd',
+}
+
+# Tag added to every device created by discovery
+TAG_NAME = 'auto-discovered'
+
+# Start of the comments of a device created by discovery, followed by the IP
+COMMENTS_PREFIX = 'Auto-discovered from IP '
+
+
+def get_platform(name, create=True):
+    """
+    Return the platform called `name`, creating it if it is missing. With `create`
+    False, a missing platform is not created and None is returned instead.
+    """
+    cached = lookup_cache.get(Platform, name)
+    if cached:
+        return cached
+    
+    if create:
+        platform, created = Platform.objects.get_or_create(
+            name=name,
+            defaults={'slug': name.lower().replace(' ', '-')}
+        )
+        if created:
+            logger.info(f"Created platform: {name}")
+    else:
+        platform = Platform.objects.filter(name=name).first()
+        if platform is None:
+            return None
+    
+    lookup_cache.set(Platform, name, platform, on_commit=True)
+    return platform
+
 
 class DeviceDiscovery:
     """
     Handles device discovery using SNMP and SSH protocols.
     """
     
-    def __init__(self, ip_address_obj):
+    def __init__(self, ip_address_obj, device_info=None, timings=None):
+        """
+        `device_info` may carry SNMP results collected elsewhere (e.g. by the bulk
+        engine); SNMP probing is then skipped for this IP. `timings` carries the
+        durations of phases that ran elsewhere, in milliseconds.
+        """
         self.ip_address_obj = ip_address_obj
         self.ip = str(ip_address_obj.address.ip)
         
         # Get configuration from database (preferred) or settings (fallback)
         try:
-            self.db_config = AutoDiscoveryConfig.get_config()
+            self.db_config = AutoDiscoveryConfig.get_cached_config()
             logger.info(f"📋 Using database configuration for discovery")
         except Exception as e:
             logger.warning(f"Could not load database config: {e}, using settings")
@@ -32,11 +105,43 @@ class DeviceDiscovery:
         
         # Fallback to settings if database config not available
         self.config = settings.PLUGINS_CONFIG.get('netbox_device_autodiscovery', {})
-        self.device_info = {}
+        self.snmp_prefetched = device_info is not None
+        self.device_info = dict(device_info or {})
+        self.classification = None
+        # Outcome of the reachability pre-probe and the SNMP timeout derived from it
+        self.reachability = None
+        self.snmp_timeout = None
+        # SNMP credential that the device answered
+        self.credential = None
+        # Renews the scheduler slot held while probing; called before each SNMP request
+        self.keep_alive = lambda: None
+        # Protocol that produced device_info, phase durations and the stored result
+        self.protocol = DiscoveryResult.PROTOCOL_SNMP if self.device_info else DiscoveryResult.PROTOCOL_NONE
+        self.timings = dict(timings or {})
+        self.error = ''
+        self.result = None
+    
+    @classmethod
+    def from_result(cls, result):
+        """
+        Prepare a discovery that rebuilds objects from a stored DiscoveryResult,
+        without touching the network.
+        """
+        if result.ip_address is None:
+            raise ValueError(f"The IP address of {result} no longer exists")
+        if not result.data:
+            raise ValueError(f"{result} holds no device information")
+        
+        discovery = cls(result.ip_address, device_info=unpack_device_info(result.data))
+        discovery.protocol = result.protocol
+        return discovery
     
-    def discover_and_create_device(self):
+    def discover_and_create_device(self, save_result=True):
         """
         Main method to discover device information and create the device in NetBox.
+        
+        The outcome is kept as an unsaved DiscoveryResult in `self.result`, which is
+        saved unless `save_result` is False (bulk callers save results in batches).
         """
         # Check if discovery is enabled
         if self.db_config and not self.db_config.enabled:
@@ -45,65 +150,139 @@ class DeviceDiscovery:
         
         # Try to discover device information
         snmp_enabled = self.db_config.snmp_enabled if self.db_config else self.config.get('enable_snmp', True)
-        if snmp_enabled:
-            self.discover_via_snmp()
-        
-        dns_enabled = self.db_config.dns_enabled if self.db_config else True
-        if not self.device_info and dns_enabled:
-            self.discover_via_ssh()
+        if snmp_enabled and not self.snmp_prefetched:
+            # A request gives up after the first attempt and one retry have timed out
+            lease = self.get_snmp_timeout() * 2
+            with get_scheduler().slot_sync(self.ip, lease) as self.keep_alive, self.timed('snmp'):
+                self.discover_via_snmp()
+        
+        # Bulk callers collect SSH facts for all non-responders at once
+        ssh_enabled = self.config.get('enable_ssh', False)
+        if not self.device_info and ssh_enabled and not self.snmp_prefetched:
+            with self.timed('ssh'):
+                self.discover_via_ssh()
         
         # If no discovery method worked, try basic DNS/ping
         if not self.device_info:
-            self.discover_basic()
+            with self.timed('dns'):
+                self.discover_basic()
         
         # Create device if we have enough information
+        device = None
         if self.device_info:
-            return self.create_device()
+            with self.timed('create'):
+                device = self.create_device()
+        
+        DISCOVERIES.labels(
+            'completed' if device else 'failed',
+            self.protocol,
+            (self.classify().manufacturer if self.device_info else None) or 'unknown'
+        ).inc()
+        
+        self.result = self.build_result(device)
+        if save_result and self.result:
+            self.result.save()
+        
+        return device
+    
+    @contextmanager
+    def timed(self, phase):
+        """
+        Record the duration of a discovery phase in milliseconds.
+        """
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.timings[phase] = round((time.monotonic() - started) * 1000, 1)
+    
+    def build_result(self, device):
+        """
+        Return an unsaved DiscoveryResult for this run, or None if results are not stored.
+        """
+        if not self.config.get('store_results', True):
+            return None
         
-        return None
+        return DiscoveryResult(
+            ip_address=self.ip_address_obj,
+            address=str(self.ip_address_obj.address),
+            device=device,
+            status=DiscoveryResult.STATUS_COMPLETED if device else DiscoveryResult.STATUS_FAILED,
+            protocol=self.protocol,
+            data=pack_device_info(self.device_info),
+            durations=self.timings,
+            error=self.error
+        )
+    
+    def get_snmp_timeout(self):
+        """
+        Return the SNMP timeout from database config or fallback to settings.
+        """
+        if self.db_config:
+            return self.snmp_timeout or self.db_config.snmp_timeout
+        return self.snmp_timeout or self.config.get('snmp_timeout', 5)
     
+    @observe_phase('snmp')
     def discover_via_snmp(self):
         """
         Discover device information using SNMP.
+        
+        The credentials are tried in turn, starting with the one that last worked
+        for this IP or its subnet; the first that gets an answer is remembered.
         """
         try:
-            # Get SNMP settings from database config or fallback to settings
-            if self.db_config:
-                community = self.db_config.snmp_community
-                timeout = self.db_config.snmp_timeout
-            else:
-                community = self.config.get('snmp_community', 'public')
-                timeout = self.config.get('snmp_timeout', 5)
+            all_credentials = credentials.get_credentials(self.db_config)
+            credential_set = credentials.set_key(all_credentials)
+            timeout = self.get_snmp_timeout()
             
-            logger.info(f"🔎 Attempting SNMP discovery for {self.ip} with community '{community}'...")
+            if negative_cache.is_suppressed(self.ip, credential_set):
+                logger.info(f"⏭️  Skipping SNMP for {self.ip}: no response on earlier attempts, backing off")
+                SNMP_PROBES.labels('skipped').inc()
+                return
             
-            # SNMP OIDs for common device information
-            oids = {
-                'sysName': '1.3.6.1.2.1.1.5.0',
-                'sysDescr': '1.3.6.1.2.1.1.1.0',
-                'sysObjectID': '1.3.6.1.2.1.1.2.0',
-                'sysContact': '1.3.6.1.2.1.1.4.0',
-                'sysLocation': '1.3.6.1.2.1.1.6.0',
-            }
+            ordered = credentials.order_credentials(all_credentials, [self.ip])[self.ip]
             
-            for key, oid in oids.items():
-                iterator = getCmd(
-                    SnmpEngine(),
-                    CommunityData(community),
-                    UdpTransportTarget((self.ip, 161), timeout=timeout, retries=1),
-                    ContextData(),
-                    ObjectType(ObjectIdentity(oid))
+            if self.config.get('prefilter_enabled', False):
+                self.keep_alive()
+                self.reachability = check_reachability(self.ip, ordered[0])
+                if not self.reachability.reachable:
+                    logger.info(f"⏭️  {self.ip} did not answer the reachability pre-probe, skipping SNMP")
+                    negative_cache.record_failure(self.ip, credential_set, 'No answer to reachability pre-probe')
+                    SNMP_PROBES.labels('unreachable').inc()
+                    return
+                logger.info(
+                    f"   - Reachable via {self.reachability.method} in {self.reachability.latency * 1000:.0f} ms"
                 )
-                
-                errorIndication, errorStatus, errorIndex, varBinds = next(iterator)
-                
-                if errorIndication or errorStatus:
+                if self.reachability.snmp:
+                    # The agent answered quickly; don't wait the full timeout for later requests
+                    self.snmp_timeout = adaptive_timeout(self.reachability.latency, timeout)
+                    timeout = self.get_snmp_timeout()
+            
+            # All system group and identity OIDs are fetched in a single request
+            oids = {**SYSTEM_OIDS, **address_oids(self.ip)}
+            error = None
+            for credential in ordered:
+                logger.info(f"🔎 Attempting SNMP discovery for {self.ip} with credential '{credential.name}'...")
+                try:
+                    self.keep_alive()
+                    self.device_info.update(snmp_get(self.ip, credential, oids, timeout))
+                except SNMPError as e:
+                    logger.debug(f"Credential '{credential.name}' got no answer from {self.ip}: {str(e)}")
+                    error = e
                     continue
-                
-                for varBind in varBinds:
-                    self.device_info[key] = str(varBind[1])
+                self.credential = credential
+                break
+            
+            if self.credential is None:
+                negative_cache.record_failure(self.ip, credential_set, str(error))
+                SNMP_PROBES.labels(snmp_outcome(error)).inc()
+                raise error
+            negative_cache.record_success(self.ip, credential_set)
+            credentials.record_successes({self.ip: self.credential})
+            SNMP_PROBES.labels(snmp_outcome(None)).inc()
             
             if self.device_info:
+                self.protocol = DiscoveryResult.PROTOCOL_SNMP
                 logger.info(f"✅ SNMP discovery successful for {self.ip}")
                 logger.info(f"   - System Name: {self.device_info.get('sysName', 'N/A')}")
                 logger.info(f"   - Description: {self.device_info.get('sysDescr', 'N/A')[:80]}...")
@@ -117,57 +296,76 @@ class DeviceDiscovery:
         except Exception as e:
             logger.warning(f"⚠️  SNMP discovery failed for {self.ip}: {str(e)}")
     
+    @observe_phase('snmp_interfaces')
     def discover_interfaces_snmp(self):
         """
         Discover network interfaces using SNMP.
+        
+        ifTable and ifXTable columns are walked together with GETBULK, so even large
+        chassis need only a handful of requests.
         """
         try:
-            community = self.config.get('snmp_community', 'public')
-            interfaces = []
-            
-            # Walk interface names (ifDescr)
-            for (errorIndication, errorStatus, errorIndex, varBinds) in nextCmd(
-                SnmpEngine(),
-                CommunityData(community),
-                UdpTransportTarget((self.ip, 161), timeout=5, retries=1),
-                ContextData(),
-                ObjectType(ObjectIdentity('1.3.6.1.2.1.2.2.1.2')),
-                lexicographicMode=False
-            ):
-                if errorIndication or errorStatus:
-                    break
-                
-                for varBind in varBinds:
-                    interfaces.append(str(varBind[1]))
-            
-            self.device_info['interfaces'] = interfaces[:20]  # Limit to first 20 interfaces
+            table = snmp_bulk_walk(
+                self.ip,
+                self.credential,
+                INTERFACE_COLUMNS,
+                self.get_snmp_timeout(),
+                max_repetitions=self.config.get('snmp_max_repetitions', 25),
+                on_request=self.keep_alive
+            )
+            self.device_info['interfaces'] = build_interfaces(table)
+            logger.info(f"   - Interfaces: {len(self.device_info['interfaces'])}")
         
         except Exception as e:
             logger.warning(f"Interface discovery failed for {self.ip}: {str(e)}")
     
+    @observe_phase('ssh')
     def discover_via_ssh(self):
         """
-        Discover device information using SSH (placeholder for future implementation).
+        Discover device information over SSH, for devices with SNMP locked down.
+        
+        Sessions are pooled per worker and parsed outputs are cached (see ssh.py).
         """
-        # This would require credentials management
-        logger.info(f"SSH discovery not yet implemented for {self.ip}")
-        pass
+        ssh_credentials = ssh.get_credentials(self.db_config)
+        if not ssh_credentials:
+            logger.debug(f"No SSH credentials configured, skipping SSH for {self.ip}")
+            return
+        
+        logger.info(f"🔎 Attempting SSH discovery for {self.ip}...")
+        try:
+            device_info = ssh.collect_facts(self.ip, ssh_credentials)
+        except ssh.SSHError as e:
+            logger.warning(f"⚠️  SSH discovery failed for {self.ip}: {str(e)}")
+            return
+        
+        self.device_info.update(device_info)
+        self.protocol = DiscoveryResult.PROTOCOL_SSH
+        logger.info(f"✅ SSH discovery successful for {self.ip}")
+        logger.info(f"   - System Name: {self.device_info.get('sysName', 'N/A')}")
+        logger.info(f"   - Model: {self.device_info.get('model', 'N/A')}")
+        logger.info(f"   - Interfaces: {len(self.device_info.get('interfaces', []))}")
     
+    @observe_phase('dns')
     def discover_basic(self):
         """
         Basic discovery using DNS and ping.
         """
-        try:
+        dns_enabled = self.db_config.dns_enabled if self.db_config else True
+        hostname = None
+        if dns_enabled:
             logger.info(f"🔎 Attempting DNS lookup for {self.ip}...")
-            # Try reverse DNS lookup
-            hostname = socket.gethostbyaddr(self.ip)[0]
+            # Try reverse DNS lookup (cached, with a deadline)
+            hostname = get_resolver().resolve(self.ip)
+        if hostname:
             self.device_info['sysName'] = hostname
+            self.protocol = DiscoveryResult.PROTOCOL_DNS
             logger.info(f"✅ DNS lookup successful: {hostname}")
-        except socket.herror:
-            # Use IP as hostname if DNS fails
+        else:
+            # Use IP as hostname if DNS fails or is disabled
             self.device_info['sysName'] = f"device-{self.ip.replace('.', '-')}"
-            logger.info(f"⚠️  No DNS record found, using generated name: {self.device_info['sysName']}")
+            logger.info(f"⚠️  No DNS name for {self.ip}, using generated name: {self.device_info['sysName']}")
     
+    @observe_phase('create_device')
     def create_device(self):
         """
         Create device and related objects in NetBox.
@@ -228,88 +426,118 @@ class DeviceDiscovery:
                 hostname=sysName
             )
             
-            # Check if device already exists
-            existing_device = Device.objects.filter(name=device_name).first()
-            if existing_device:
-                logger.info(f"ℹ️  Device {device_name} already exists, skipping creation")
-                return existing_device
-            
             # Get tenant and location from config if set
             tenant = self.db_config.default_tenant if self.db_config else None
             location = self.db_config.default_location if self.db_config else None
+            tag = self.get_or_create_tag()
             
-            # Create device
-            device = Device.objects.create(
-                name=device_name,
-                device_type=device_type,
-                device_role=device_role,
-                site=site,
-                platform=platform,
-                tenant=tenant,
-                location=location,
-                comments=f"Auto-discovered from IP {self.ip}\n{self.device_info.get('sysDescr', '')}"
-            )
-            logger.info(f"   ✓ Device created: {device.name}")
-            if tenant:
-                logger.info(f"   ✓ Tenant: {tenant.name}")
-            if location:
-                logger.info(f"   ✓ Location: {location.name}")
-            
-            # Create management interface
-            self.create_management_interface(device)
-            logger.info(f"   ✓ Management interface created")
+            identities = identity.get_identities(self.device_info)
             
-            # Create additional interfaces if enabled
-            create_interfaces = self.db_config.create_interfaces if self.db_config else True
-            if create_interfaces:
-                interface_count = len(self.device_info.get('interfaces', []))
-                if interface_count > 0:
-                    self.create_interfaces(device)
-                    logger.info(f"   ✓ Created {interface_count} additional interfaces")
-            
-            # Add auto-discovery tag
-            tag, _ = Tag.objects.get_or_create(
-                name='auto-discovered',
-                defaults={'color': '4caf50', 'description': 'Automatically discovered device'}
-            )
-            device.tags.add(tag)
-            logger.info(f"   ✓ Tagged as 'auto-discovered'")
+            # Everything below is one unit: a failure leaves no half-created device behind
+            with transaction.atomic():
+                # Another worker may be creating the same device or claiming the same IP:
+                # wait for it to commit, then find its work below
+                lock_device(device_name, self.ip, *(f'{kind}:{value}' for kind, value in identities.items()))
+                self.ip_address_obj.refresh_from_db(fields=['assigned_object_type', 'assigned_object_id'])
+                if self.ip_address_obj.assigned_object_id:
+                    logger.info(f"ℹ️  {self.ip} was assigned meanwhile, skipping creation")
+                    return getattr(self.ip_address_obj.assigned_object, 'device', None)
+                
+                # Another address of a known device joins that device
+                existing_device = identity.find_device(identities)
+                if existing_device:
+                    self.attach_to_device(existing_device)
+                    identity.record_identities([(existing_device, identities)])
+                    return existing_device
+                
+                # Check if device already exists
+                existing_device = Device.objects.filter(name=device_name).first()
+                if existing_device:
+                    logger.info(f"ℹ️  Device {device_name} already exists, skipping creation")
+                    # Devices discovered before identities were recorded get them now
+                    if not DeviceIdentity.objects.filter(device=existing_device).exists():
+                        identity.record_identities([(existing_device, identities)])
+                    return existing_device
+                
+                # Create device, with the primary IP set up front rather than in a second save
+                device = Device(
+                    name=device_name,
+                    device_type=device_type,
+                    device_role=device_role,
+                    site=site,
+                    platform=platform,
+                    tenant=tenant,
+                    location=location,
+                    serial=identity.get_serial(self.device_info)[:50],
+                    comments=self.get_comments()
+                )
+                set_primary = self.db_config.set_primary_ip if self.db_config else True
+                if set_primary:
+                    if self.ip_address_obj.family == 4:
+                        device.primary_ip4 = self.ip_address_obj
+                    else:
+                        device.primary_ip6 = self.ip_address_obj
+                device.save()
+                logger.info(f"   ✓ Device created: {device.name}")
+                if tenant:
+                    logger.info(f"   ✓ Tenant: {tenant.name}")
+                if location:
+                    logger.info(f"   ✓ Location: {location.name}")
+                
+                # Management and discovered interfaces go in one bulk insert
+                create_interfaces = self.db_config.create_interfaces if self.db_config else True
+                created = self.create_interfaces(device, include_discovered=create_interfaces)
+                logger.info(f"   ✓ Created {len(created)} interfaces")
+                
+                # Assign IP address to the management interface
+                self.assign_management_ip(device, created)
+                logger.info(f"   ✓ Management interface created")
+                
+                # Add auto-discovery tag
+                device.tags.add(tag)
+                logger.info(f"   ✓ Tagged as 'auto-discovered'")
+                
+                identity.record_identities([(device, identities)])
             
             logger.info(f"✅ Device creation complete: {device.name}")
             return device
         
         except Exception as e:
+            self.error = str(e)
             logger.error(f"❌ Error creating device: {str(e)}")
             import traceback
             logger.error(traceback.format_exc())
             return None
 
     
+    def get_comments(self):
+        """
+        Return the device comments written by discovery.
+        """
+        return f"{COMMENTS_PREFIX}{self.ip}\n{self.device_info.get('sysDescr', '')}"
+    
+    def classify(self):
+        """
+        Classify manufacturer and platform from sysObjectID and sysDescr.
+        """
+        if self.classification is None:
+            self.classification = get_classifier().classify(
+                self.device_info.get('sysObjectID'),
+                self.device_info.get('sysDescr')
+            )
+        return self.classification
+    
+    @observe_phase('manufacturer')
     def get_or_create_manufacturer(self):
         """
         Extract and create manufacturer from device info.
         """
-        # Try to parse manufacturer from sysDescr or sysObjectID
-        sys_descr = self.device_info.get('sysDescr', '').lower()
-        
-        manufacturer_map = {
-            'cisco': 'Cisco',
-            'juniper': 'Juniper',
-            'arista': 'Arista',
-            'hp': 'HP',
-            'dell': 'Dell',
-            'huawei': 'Huawei',
-            'mikrotik': 'MikroTik',
-            'ubiquiti': 'Ubiquiti',
-            'fortinet': 'Fortinet',
-            'palo alto': 'Palo Alto Networks',
-        }
+        # Identify manufacturer from sysObjectID, falling back to sysDescr
+        manufacturer_name = self.classify().manufacturer or 'Generic'
         
-        manufacturer_name = 'Generic'
-        for key, value in manufacturer_map.items():
-            if key in sys_descr:
-                manufacturer_name = value
-                break
+        cached = lookup_cache.get(Manufacturer, manufacturer_name)
+        if cached:
+            return cached
         
         # Create a valid slug
         slug = manufacturer_name.lower().replace(' ', '-').replace('_', '-')
@@ -329,6 +557,7 @@ class DeviceDiscovery:
             if created:
                 logger.info(f"   ✓ Created manufacturer: {manufacturer_name}")
             
+            lookup_cache.set(Manufacturer, manufacturer_name, manufacturer, on_commit=True)
             return manufacturer
         except Exception as e:
             logger.error(f"   ❌ Error creating manufacturer: {str(e)}")
@@ -340,19 +569,25 @@ class DeviceDiscovery:
                 manufacturer = Manufacturer.objects.create(name=manufacturer_name, slug=slug)
             return manufacturer
     
+    @observe_phase('device_type')
     def get_or_create_device_type(self, manufacturer):
         """
         Create device type based on discovered information.
         """
         sys_descr = self.device_info.get('sysDescr', 'Unknown Device')
         
-        # Create a simplified model name
-        model = sys_descr[:50] if len(sys_descr) > 50 else sys_descr
+        # Create a simplified model name (SSH discovery reports the model itself)
+        model = self.device_info.get('model') or sys_descr
+        model = model[:50] if len(model) > 50 else model
         # Clean up model name
         model = model.strip()
         if not model:
             model = 'Unknown Device'
         
+        cached = lookup_cache.get(DeviceType, (manufacturer.pk, model))
+        if cached:
+            return cached
+        
         # Create a valid slug
         slug_base = f"{manufacturer.slug}-{model}"
         slug = slug_base.lower().replace('/', '-').replace(' ', '-').replace('_', '-')
@@ -373,6 +608,7 @@ class DeviceDiscovery:
             if created:
                 logger.info(f"   ✓ Created device type: {model}")
             
+            lookup_cache.set(DeviceType, (manufacturer.pk, model), device_type, on_commit=True)
             return device_type
         except Exception as e:
             logger.error(f"   ❌ Error creating device type: {str(e)}")
@@ -384,6 +620,7 @@ class DeviceDiscovery:
                 device_type = DeviceType.objects.create(manufacturer=manufacturer, model=model, slug=slug)
             return device_type
     
+    @observe_phase('device_role')
     def get_or_create_device_role(self):
         """
         Get or create a default device role.
@@ -393,6 +630,10 @@ class DeviceDiscovery:
             logger.info(f"   ✓ Using configured default role: {self.db_config.default_device_role.name}")
             return self.db_config.default_device_role
         
+        cached = lookup_cache.get(DeviceRole, 'Auto-Discovered')
+        if cached:
+            return cached
+        
         device_role, created = DeviceRole.objects.get_or_create(
             name='Auto-Discovered',
             defaults={
@@ -405,8 +646,10 @@ class DeviceDiscovery:
         if created:
             logger.info("   ✓ Created device role: Auto-Discovered")
         
+        lookup_cache.set(DeviceRole, 'Auto-Discovered', device_role, on_commit=True)
         return device_role
     
+    @observe_phase('site')
     def get_or_create_site(self):
         """
         Get or create site based on IP location or default.
@@ -439,6 +682,10 @@ class DeviceDiscovery:
         if not slug:
             slug = 'default-site'
         
+        cached = lookup_cache.get(Site, slug)
+        if cached:
+            return cached
+        
         try:
             site, created = Site.objects.get_or_create(
                 slug=slug,
@@ -448,6 +695,7 @@ class DeviceDiscovery:
             if created:
                 logger.info(f"   ✓ Created site: {site_name}")
             
+            lookup_cache.set(Site, slug, site, on_commit=True)
             return site
         except Exception as e:
             logger.error(f"   ❌ Error creating site: {str(e)}")
@@ -459,101 +707,125 @@ class DeviceDiscovery:
                 site = Site.objects.create(name=site_name, slug=slug)
             return site
     
-    def get_or_create_platform(self):
+    @observe_phase('platform')
+    def get_or_create_platform(self, create=True):
         """
-        Determine and create platform based on device info.
+        Determine and create platform based on device info (see get_platform).
         """
-        sys_descr = self.device_info.get('sysDescr', '').lower()
-        
-        platform_map = {
-            'ios': 'Cisco IOS',
-            'nxos': 'Cisco NX-OS',
-            'junos': 'Juniper Junos',
-            'eos': 'Arista EOS',
-            'routeros': 'MikroTik RouterOS',
-        }
-        
-        platform_name = None
-        for key, value in platform_map.items():
-            if key in sys_descr:
-                platform_name = value
-                break
+        platform_name = self.classify().platform
         
         if not platform_name:
             return None
         
-        platform, created = Platform.objects.get_or_create(
-            name=platform_name,
-            defaults={'slug': platform_name.lower().replace(' ', '-')}
+        return get_platform(platform_name, create)
+    
+    @observe_phase('tag')
+    def get_or_create_tag(self):
+        """
+        Get or create the 'auto-discovered' tag.
+        """
+        cached = lookup_cache.get(Tag, TAG_NAME)
+        if cached:
+            return cached
+        
+        tag, _ = Tag.objects.get_or_create(
+            name=TAG_NAME,
+            defaults={'color': '4caf50', 'description': 'Automatically discovered device'}
         )
         
-        if created:
-            logger.info(f"Created platform: {platform_name}")
+        lookup_cache.set(Tag, TAG_NAME, tag, on_commit=True)
+        return tag
+    
+    def assign_management_ip(self, device, interfaces=()):
+        """
+        Assign the IP address to the device's management interface, taking it
+        from the just-created `interfaces` when possible.
+        """
+        interface = next((i for i in interfaces if i.name == 'Management'), None)
+        if interface is None:
+            interface = Interface.objects.get(device=device, name='Management')
+        self.ip_address_obj.assigned_object = interface
+        self.ip_address_obj.save()
+        logger.info(f"Created management interface for device {device.name}")
+    
+    def attach_to_device(self, device):
+        """
+        Assign the IP address to the interface of an existing device that holds it.
         
-        return platform
+        The interface is found through the ifIndex the device reported for the
+        address, falling back to the device's management interface.
+        """
+        if_index = self.device_info.get('ipIfIndex')
+        names = [i['name'] for i in self.device_info.get('interfaces', []) if if_index and i['index'] == if_index]
+        names.append('Management')
+        found = {interface.name: interface for interface in Interface.objects.filter(device=device, name__in=names)}
+        interface = next((found[name] for name in names if name in found), None)
+        if interface is None:
+            logger.warning(f"⚠️  No interface of {device.name} to assign {self.ip} to")
+            return
+        self.ip_address_obj.assigned_object = interface
+        self.ip_address_obj.save()
+        logger.info(f"   ✓ Assigned {self.ip} to {device.name} {interface.name}")
     
-    def create_management_interface(self, device):
+    def create_interfaces(self, device, include_discovered=True):
         """
-        Create management interface and assign the IP address.
+        Create the management interface and the interfaces discovered via SNMP.
+        
+        Existing names (e.g. from device type templates) are fetched in one query
+        and the missing interfaces are inserted with a single bulk_create. Returns
+        the list of created interfaces.
         """
-        try:
-            interface, created = Interface.objects.get_or_create(
-                device=device,
-                name='Management',
-                defaults={
-                    'type': 'virtual',
-                    'mgmt_only': True
-                }
-            )
+        existing = set(Interface.objects.filter(device=device).values_list('name', flat=True))
+        new_interfaces = []
+        
+        if 'Management' not in existing:
+            existing.add('Management')
+            new_interfaces.append(Interface(device=device, name='Management', type='virtual', mgmt_only=True))
+        
+        discovered = self.device_info.get('interfaces', []) if include_discovered else []
+        for interface in discovered:
+            interface_name = interface['name']
+            # Skip if interface already exists (or is listed twice by the device)
+            if interface_name in existing:
+                continue
+            existing.add(interface_name)
             
-            # Assign IP address to interface
-            self.ip_address_obj.assigned_object = interface
-            self.ip_address_obj.save()
-            
-            # Set as primary IP if enabled
-            set_primary = self.db_config.set_primary_ip if self.db_config else True
-            if set_primary:
-                if not device.primary_ip4 and self.ip_address_obj.family == 4:
-                    device.primary_ip4 = self.ip_address_obj
-                    device.save()
-                elif not device.primary_ip6 and self.ip_address_obj.family == 6:
-                    device.primary_ip6 = self.ip_address_obj
-                    device.save()
-            
-            logger.info(f"Created management interface for device {device.name}")
+            new_interfaces.append(Interface(device=device, name=interface_name, **self.interface_values(interface)))
         
-        except Exception as e:
-            logger.error(f"Error creating management interface: {str(e)}")
+        if not new_interfaces:
+            return []
+        
+        created = Interface.objects.bulk_create(
+            new_interfaces,
+            batch_size=self.config.get('bulk_batch_size', 500)
+        )
+        send_bulk_create_signals(created)
+        return created
     
-    def create_interfaces(self, device):
+    def interface_values(self, interface):
         """
-        Create additional interfaces discovered via SNMP.
+        Return the Interface field values for a discovered interface dict.
         """
-        interfaces = self.device_info.get('interfaces', [])
-        
-        for idx, interface_name in enumerate(interfaces):
-            try:
-                # Skip if interface already exists
-                if Interface.objects.filter(device=device, name=interface_name).exists():
-                    continue
-                
-                # Determine interface type
-                interface_type = self.determine_interface_type(interface_name)
-                
-                Interface.objects.create(
-                    device=device,
-                    name=interface_name,
-                    type=interface_type,
-                    enabled=True
-                )
-            
-            except Exception as e:
-                logger.warning(f"Error creating interface {interface_name}: {str(e)}")
+        return {
+            'type': self.determine_interface_type(interface['name'], interface.get('type'), interface.get('speed')),
+            'enabled': interface.get('enabled', True),
+            'description': interface.get('description', ''),
+            'mac_address': interface.get('mac_address'),
+            # ifHighSpeed is in Mbps, NetBox stores Kbps
+            'speed': interface['speed'] * 1000 if interface.get('speed') else None,
+        }
     
-    def determine_interface_type(self, interface_name):
+    def determine_interface_type(self, interface_name, if_type=None, speed=None):
         """
-        Determine interface type based on name.
+        Determine interface type from ifType and speed, falling back to the name.
         """
+        if if_type in VIRTUAL_IF_TYPES:
+            return 'virtual'
+        if if_type == IF_TYPE_LAG:
+            return 'lag'
+        if if_type == IF_TYPE_ETHERNET and speed in ETHERNET_SPEED_TYPES:
+            return ETHERNET_SPEED_TYPES[speed]
+        
         name_lower = interface_name.lower()
         
         if 'ethernet' in name_lower or 'eth' in name_lower:
@@ -0,0 +1,187 @@
+from collections import Counter
+from django.db import transaction
+from django.db.models import Q
+from dcim.models import Device, Interface
+from ipam.models import IPAddress
+from .async_discovery import AsyncDiscoveryEngine, get_engine_for_config
+from .discovery import TAG_NAME
+from .models import AutoDiscoveryConfig
+from .probe import SYS_UPTIME_OID
+from .scheduler import PRIORITY_SWEEP
+from .snmp import ADDRESS_COLUMNS, build_addresses
+from .utils import discovery_suppressed, get_plugin_setting, send_bulk_create_signals, send_bulk_update_signals
+import ipaddress
+import logging
+
+logger = logging.getLogger('netbox.plugins.device_autodiscovery')
+
+
+class HarvestEngine(AsyncDiscoveryEngine):
+    """
+    Walks the address tables (ipAddressTable/ipAddrTable) and neighbour caches
+    (ipNetToPhysicalTable/ipNetToMediaTable) of known devices. Results are the
+    dicts of snmp.build_addresses.
+    """
+
+    async def probe(self, ip):
+        transport = await self._transport(ip, self.timeout, self.retries)
+        _, credential = await self._login(transport, self.get_order(ip), {'sysUpTime': SYS_UPTIME_OID})
+        self.used[ip] = credential
+        return build_addresses(await self._walk(transport, credential, ADDRESS_COLUMNS))
+
+
+def is_harvestable(address):
+    return not (
+        address.is_loopback or address.is_link_local or address.is_multicast or address.is_unspecified
+    )
+
+
+class AddressHarvester:
+    """
+    Fills IPAM from the address tables and ARP/neighbour caches of discovered devices.
+
+    The addresses a device owns are created (or assigned, if they exist unassigned)
+    on the interfaces that hold them. Addresses from its caches are created
+    unassigned, with the prefix length of the connected subnet they belong to;
+    they are collected in `harvested` to be handed to discovery in one batch.
+    Everything is written with bulk operations, one transaction per device.
+    """
+
+    def __init__(self, chunk_size=256, **kwargs):
+        self.chunk_size = chunk_size
+        self.db_config = AutoDiscoveryConfig.get_cached_config()
+        self.stats = Counter()
+        self.harvested = []
+        self.engine = get_engine_for_config(
+            self.db_config, engine_class=HarvestEngine, priority=PRIORITY_SWEEP, **kwargs
+        )
+
+    def get_devices(self):
+        return Device.objects.filter(
+            Q(primary_ip4__isnull=False) | Q(primary_ip6__isnull=False),
+            tags__name=TAG_NAME
+        ).select_related('primary_ip4', 'primary_ip6').order_by('pk')
+
+    def run(self, devices=None):
+        """
+        Harvest the given devices (a queryset), or all auto-discovered devices.
+        Returns a Counter of outcomes.
+        """
+        if not self.db_config.enabled or not self.db_config.snmp_enabled:
+            raise ValueError("Auto-discovery or SNMP is disabled in configuration")
+
+        devices = list(self.get_devices() if devices is None else devices)
+        for start in range(0, len(devices), self.chunk_size):
+            targets = {
+                str((device.primary_ip4 or device.primary_ip6).address.ip): device
+                for device in devices[start:start + self.chunk_size]
+            }
+            results = self.engine.run_cached(list(targets))
+            for ip, device in targets.items():
+                if not results.get(ip):
+                    self.stats['unreachable'] += 1
+                    continue
+                self.stats['polled'] += 1
+                self.process_device(device, results[ip])
+
+        logger.info(
+            f"✅ Address harvest complete: {self.stats['polled']} devices polled, "
+            f"{self.stats['addresses_created']} addresses created, {self.stats['addresses_assigned']} assigned, "
+            f"{len(self.harvested)} to discover, {self.stats['unreachable']} unreachable"
+        )
+        return self.stats
+
+    def process_device(self, device, harvest):
+        # host address -> (interface address, ifIndex) of the device's own addresses
+        own = {}
+        for address, if_index in harvest['addresses']:
+            interface_address = ipaddress.ip_interface(address)
+            if is_harvestable(interface_address.ip):
+                own[str(interface_address.ip)] = (interface_address, if_index)
+
+        # Connected subnets, most specific first
+        networks = sorted(
+            {address.network for address, _ in own.values() if address.network.prefixlen < address.max_prefixlen},
+            key=lambda network: network.prefixlen,
+            reverse=True
+        )
+
+        neighbours = {}
+        if get_plugin_setting('harvest_neighbours', True):
+            for host in harvest['neighbours']:
+                address = ipaddress.ip_address(host)
+                if host in own or not is_harvestable(address):
+                    continue
+                network = next((n for n in networks if n.version == address.version and address in n), None)
+                # Cache entries outside the connected subnets (e.g. proxy ARP) are not trusted
+                if network is None:
+                    continue
+                if network.num_addresses > 2 and address in (network.network_address, network.broadcast_address):
+                    continue
+                neighbours[host] = ipaddress.ip_interface(f'{address}/{network.prefixlen}')
+
+        if not own and not neighbours:
+            return
+
+        existing = self.get_existing(networks, own)
+        interfaces = {interface.name: interface for interface in Interface.objects.filter(device=device)}
+        new, assigned = [], []
+
+        for host, (interface_address, if_index) in own.items():
+            interface = interfaces.get(harvest['interfaces'].get(if_index))
+            ip_address = existing.get(host)
+            if ip_address is None:
+                new.append(IPAddress(
+                    address=str(interface_address),
+                    assigned_object=interface,
+                    description=f'Harvested from {device.name}'[:200]
+                ))
+            elif interface and not ip_address.assigned_object_id:
+                ip_address.snapshot()
+                ip_address.assigned_object = interface
+                assigned.append(ip_address)
+
+        for host, interface_address in neighbours.items():
+            if host not in existing:
+                new.append(IPAddress(
+                    address=str(interface_address),
+                    description=f'Harvested from the neighbour cache of {device.name}'[:200]
+                ))
+
+        batch_size = get_plugin_setting('bulk_batch_size', 500)
+        created = []
+        # The harvested addresses are discovered as one batch afterwards, not one by one from post_save
+        with transaction.atomic(), discovery_suppressed():
+            if assigned:
+                fields = ['assigned_object_type', 'assigned_object_id']
+                IPAddress.objects.bulk_update(assigned, fields, batch_size=batch_size)
+                send_bulk_update_signals(assigned, fields)
+            if new:
+                created = IPAddress.objects.bulk_create(new, batch_size=batch_size)
+                send_bulk_create_signals(created)
+
+        self.stats['addresses_created'] += len(created)
+        self.stats['addresses_assigned'] += len(assigned)
+        self.harvested.extend(ip_address for ip_address in created if not ip_address.assigned_object_id)
+        logger.info(
+            f"📦 Harvested {device.name}: {len(own)} own addresses, {len(neighbours)} neighbours, "
+            f"{len(created)} created, {len(assigned)} assigned"
+        )
+
+    def get_existing(self, networks, own):
+        """
+        Return the existing global IP addresses within the device's connected
+        subnets and among its own addresses, by host address.
+        """
+        query = Q()
+        for network in networks:
+            query |= Q(address__net_host_contained=str(network))
+        for host, (interface_address, _) in own.items():
+            if interface_address.network.prefixlen == interface_address.max_prefixlen:
+                query |= Q(address__net_host=host)
+        if not query:
+            return {}
+        return {
+            str(ip_address.address.ip): ip_address
+            for ip_address in IPAddress.objects.filter(query, vrf=None)
+        }
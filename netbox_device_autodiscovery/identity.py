@@ -0,0 +1,131 @@
+from django.db.models import Q
+from django.utils import timezone
+from .models import DeviceIdentity
+from .utils import get_plugin_setting
+import logging
+
+logger = logging.getLogger('netbox.plugins.device_autodiscovery')
+
+# Identity kinds from the most to the least trustworthy; the strongest match wins
+KIND_ORDER = [
+    DeviceIdentity.KIND_SERIAL,
+    DeviceIdentity.KIND_BASE_MAC,
+    DeviceIdentity.KIND_ENGINE_ID,
+    DeviceIdentity.KIND_SYSNAME,
+]
+
+# entPhysicalClass chassis(3)
+ENTITY_CLASS_CHASSIS = '3'
+
+# Placeholders some devices report instead of a serial number
+INVALID_SERIALS = {'', '0', 'n/a', 'na', 'none', 'null', 'unknown', 'not available', 'not specified', '123456789'}
+
+# Factory default host names that many unrelated devices share
+GENERIC_SYSNAMES = {'', 'localhost', 'localhost.localdomain', '(none)', 'router', 'switch', 'default'}
+
+# Shortest engine ID taken as unique: an enterprise number and at least one octet of its own
+MIN_ENGINE_ID_LENGTH = 10
+
+
+def get_serial(device_info):
+    """
+    Return the chassis serial number, from SSH facts or from ENTITY-MIB.
+    """
+    serial = device_info.get('serial')
+    if not serial and device_info.get('entPhysicalClass') == ENTITY_CLASS_CHASSIS:
+        serial = device_info.get('entPhysicalSerialNum')
+    serial = (serial or '').strip()
+    return '' if serial.lower() in INVALID_SERIALS else serial
+
+
+def get_identities(device_info):
+    """
+    Return a dict of identity kind -> value for the identifiers in device_info.
+
+    Only the kinds listed in `identity_kinds` are used. Values that are known to
+    be shared between devices (placeholder serials, default host names, empty
+    MAC addresses) are left out.
+    """
+    kinds = get_plugin_setting('identity_kinds', KIND_ORDER)
+    identities = {}
+
+    serial = get_serial(device_info)
+    if serial:
+        identities[DeviceIdentity.KIND_SERIAL] = serial.upper()
+
+    base_mac = device_info.get('baseMac', '')
+    if len(base_mac) == 12 and base_mac.strip('0'):
+        identities[DeviceIdentity.KIND_BASE_MAC] = ':'.join(base_mac[i:i + 2] for i in range(0, 12, 2)).upper()
+
+    engine_id = device_info.get('snmpEngineID', '')
+    if len(engine_id) >= MIN_ENGINE_ID_LENGTH and engine_id[8:].strip('0'):
+        identities[DeviceIdentity.KIND_ENGINE_ID] = engine_id.lower()
+
+    sys_name = device_info.get('sysName', '').strip().lower()
+    sys_object_id = device_info.get('sysObjectID', '')
+    if sys_object_id and sys_name not in GENERIC_SYSNAMES:
+        identities[DeviceIdentity.KIND_SYSNAME] = f'{sys_name}|{sys_object_id}'[:255]
+
+    return {kind: value for kind, value in identities.items() if kind in kinds}
+
+
+def find_device(identities):
+    """
+    Return the device known by the strongest of the given identities, or None.
+
+    All identities are looked up in one indexed query.
+    """
+    if not identities:
+        return None
+
+    query = Q()
+    for kind, value in identities.items():
+        query |= Q(kind=kind, value=value)
+    matches = {
+        match.kind: match.device
+        for match in DeviceIdentity.objects.filter(query).select_related('device')
+    }
+
+    for kind in KIND_ORDER:
+        if kind in matches:
+            logger.info(f"   ✓ Matched existing device {matches[kind]} by {kind} {identities[kind]}")
+            return matches[kind]
+    return None
+
+
+def record_identities(devices):
+    """
+    Store the identities of devices, given as a list of (device, identities).
+
+    Identities that moved to another device (e.g. a replaced chassis kept its
+    name) are updated; unchanged ones cost no writes.
+    """
+    wanted = {}
+    for device, identities in devices:
+        for kind, value in identities.items():
+            wanted[(kind, value)] = device
+    if not wanted:
+        return
+
+    query = Q()
+    for kind, value in wanted:
+        query |= Q(kind=kind, value=value)
+    existing = {(identity.kind, identity.value): identity for identity in DeviceIdentity.objects.filter(query)}
+
+    now = timezone.now()
+    changed, new = [], []
+    for key, device in wanted.items():
+        identity = existing.get(key)
+        if identity is None:
+            new.append(DeviceIdentity(kind=key[0], value=key[1], device=device, updated=now))
+        elif identity.device_id != device.pk:
+            identity.device = device
+            identity.updated = now
+            changed.append(identity)
+
+    batch_size = get_plugin_setting('bulk_batch_size', 500)
+    if changed:
+        DeviceIdentity.objects.bulk_update(changed, ['device', 'updated'], batch_size=batch_size)
+    if new:
+        # Another worker may have recorded the same identity meanwhile
+        DeviceIdentity.objects.bulk_create(new, batch_size=batch_size, ignore_conflicts=True)
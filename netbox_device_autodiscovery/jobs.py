@@ -0,0 +1,417 @@
+from datetime import timedelta
+from django.db import connection, transaction
+from django.utils import timezone
+from django_rq import get_queue
+from rq.exceptions import NoSuchJobError
+from rq.job import Job, JobStatus
+from ipam.models import IPAddress
+from . import metrics
+from .async_discovery import discover_many
+from .crawl import TopologyCrawler
+from .harvest import AddressHarvester
+from .models import DiscoveryJob, PrefixSweep, TopologyCrawl
+from .rediscovery import Rediscoverer
+from .results import prune_results
+from .sweep import PrefixSweeper
+from .utils import PLUGIN_NAME, get_plugin_setting
+import ipaddress
+import logging
+import threading
+
+logger = logging.getLogger('netbox.plugins.device_autodiscovery')
+
+# NetBox registers plugin queues as "<plugin name>.<queue>". Workers listening on all
+# three in this order always take interactive discovery jobs first.
+QUEUE_NAME = f'{PLUGIN_NAME}.discovery'
+REDISCOVERY_QUEUE_NAME = f'{PLUGIN_NAME}.rediscovery'
+SWEEP_QUEUE_NAME = f'{PLUGIN_NAME}.sweep'
+
+# Redis list of DiscoveryJob IDs waiting for the next coalesced batch
+PENDING_KEY = f'{PLUGIN_NAME}.pending'
+# Set while a flush of the pending list is scheduled
+FLUSH_SCHEDULED_KEY = f'{PLUGIN_NAME}.flush_scheduled'
+
+_transaction_state = threading.local()
+
+metrics.register_queue_collector(QUEUE_NAME, PENDING_KEY)
+
+
+def defer_discovery(ip_address):
+    """
+    Collect a newly created IP for batched discovery once its transaction commits.
+
+    All IPs created in the same transaction (e.g. a CSV import or API bulk create)
+    are handed over together in a single on_commit callback.
+    """
+    if not connection.in_atomic_block:
+        # Autocommit: the IP is already committed
+        return enqueue_discovery_batch([ip_address])
+
+    pending = getattr(_transaction_state, 'pending', None)
+    if pending is None or not pending.is_open():
+        pending = _PendingIPs()
+        _transaction_state.pending = pending
+        transaction.on_commit(pending.flush)
+
+    pending.ip_addresses.append(ip_address)
+
+
+class _PendingIPs:
+
+    def __init__(self):
+        self.ip_addresses = []
+        self.flushed = False
+
+    def is_open(self):
+        """
+        Whether IPs may still join this batch.
+
+        Django drops the callbacks of a transaction or savepoint that is rolled
+        back, so the batch stays open only while its callback is registered (bound
+        methods compare equal, but are never the same object). A savepoint that was
+        left without rolling back cannot drop the callback any more.
+        """
+        return not self.flushed and any(item[1] == self.flush for item in connection.run_on_commit)
+
+    def flush(self):
+        self.flushed = True
+        enqueue_discovery_batch(self.ip_addresses)
+
+
+def enqueue_discovery_batch(ip_addresses):
+    """
+    Track and queue discovery of many IP addresses.
+
+    Jobs are pushed onto a pending list in Redis; the first push schedules a flush
+    `coalesce_window` seconds later, which hands everything collected by then to
+    batch jobs of up to `coalesce_batch_size` IPs. With a window of 0, batches are
+    queued right away.
+    """
+    jobs = DiscoveryJob.objects.bulk_create([
+        DiscoveryJob(ip_address=ip_address, address=str(ip_address.address)) for ip_address in ip_addresses
+    ])
+    window = get_plugin_setting('coalesce_window', 2)
+
+    try:
+        queue = get_queue(QUEUE_NAME)
+        if window:
+            queue.connection.rpush(PENDING_KEY, *[job.pk for job in jobs])
+            # The flag expires on its own in case the scheduled flush is lost
+            if queue.connection.set(FLUSH_SCHEDULED_KEY, 1, nx=True, ex=window * 10):
+                queue.enqueue_in(timedelta(seconds=window), flush_pending_discoveries)
+        else:
+            _enqueue_batches(queue, [job.pk for job in jobs])
+    except Exception as e:
+        # Never let a broken queue fail the request that created the IPs
+        logger.error(f"❌ Could not queue discovery for {len(jobs)} IP addresses: {str(e)}")
+        DiscoveryJob.objects.filter(pk__in=[job.pk for job in jobs]).update(
+            status=DiscoveryJob.STATUS_FAILED,
+            error=f"Could not queue job: {e}",
+            completed=timezone.now()
+        )
+        return jobs
+
+    logger.info(f"📥 Queued discovery of {len(jobs)} IP addresses")
+    return jobs
+
+
+def flush_pending_discoveries():
+    """
+    Background job: split the pending list into batch discovery jobs.
+    """
+    queue = get_queue(QUEUE_NAME)
+    # IPs arriving from now on schedule the next flush
+    queue.connection.delete(FLUSH_SCHEDULED_KEY)
+
+    pipeline = queue.connection.pipeline()
+    pipeline.lrange(PENDING_KEY, 0, -1)
+    pipeline.delete(PENDING_KEY)
+    job_ids, _ = pipeline.execute()
+
+    _enqueue_batches(queue, [int(job_id) for job_id in job_ids])
+    return len(job_ids)
+
+
+def _enqueue_batches(queue, job_ids):
+    """
+    Split jobs into batches that each own whole prefixes.
+
+    Jobs are grouped by their `shard_prefix_length` subnet and the subnets packed
+    into batches, so concurrent workers rarely discover the same device (whose
+    addresses tend to share a subnet) and each batch stays within few rate
+    limiting buckets. Only a subnet larger than a batch is split.
+    """
+    batch_size = get_plugin_setting('coalesce_batch_size', 500)
+    shards = {}
+    for job_id, address in DiscoveryJob.objects.filter(pk__in=job_ids).order_by('pk').values_list('pk', 'address'):
+        shards.setdefault(get_shard(address), []).append(job_id)
+
+    batches, batch = [], []
+    # Neighbouring subnets end up in the same batch
+    for _, shard in sorted(shards.items(), key=lambda item: (item[0].version, item[0])):
+        if batch and len(batch) + len(shard) > batch_size:
+            batches.append(batch)
+            batch = []
+        batch.extend(shard)
+        while len(batch) >= batch_size:
+            batches.append(batch[:batch_size])
+            batch = batch[batch_size:]
+    if batch:
+        batches.append(batch)
+
+    for batch in batches:
+        rq_job = queue.enqueue(
+            run_discovery_batch,
+            batch,
+            job_timeout=get_plugin_setting('job_timeout', 300) * max(len(batch) // 50, 1)
+        )
+        DiscoveryJob.objects.filter(pk__in=batch).update(job_id=rq_job.id)
+
+
+def get_shard(address):
+    """
+    Return the subnet of an address (a string, with or without prefix length)
+    that is always discovered by a single batch.
+    """
+    ip = ipaddress.ip_interface(address).ip
+    if ip.version == 4:
+        length = get_plugin_setting('shard_prefix_length', 24)
+    else:
+        length = get_plugin_setting('shard_prefix_length_v6', 64)
+    return ipaddress.ip_network(f'{ip}/{length}', strict=False)
+
+
+def run_discovery_batch(discovery_job_ids):
+    """
+    Background job entry point: discover a batch of IPs in one pipeline run.
+
+    The batch shares one SNMP engine, the DNS cache and the ORM lookup caches.
+    """
+    jobs = list(DiscoveryJob.objects.filter(pk__in=discovery_job_ids, status=DiscoveryJob.STATUS_PENDING))
+    if not jobs:
+        return None
+
+    now = timezone.now()
+    DiscoveryJob.objects.filter(pk__in=[job.pk for job in jobs]).update(
+        status=DiscoveryJob.STATUS_RUNNING,
+        started=now
+    )
+
+    try:
+        ip_addresses = IPAddress.objects.in_bulk([job.ip_address_id for job in jobs if job.ip_address_id])
+        to_discover = [
+            ip_address for ip_address in ip_addresses.values() if not ip_address.assigned_object_id
+        ]
+        logger.info(f"🚀 Starting batched device discovery for {len(to_discover)} IP addresses...")
+
+        devices = discover_many(to_discover)
+        devices_by_ip = {ip_address.pk: device for ip_address, device in devices.items()}
+    except BaseException as e:
+        # Also covers worker timeouts, which older rq versions raise as BaseException
+        logger.error(f"❌ ERROR during batched discovery of {len(jobs)} IP addresses: {str(e)}")
+        DiscoveryJob.objects.filter(pk__in=[job.pk for job in jobs]).update(
+            status=DiscoveryJob.STATUS_FAILED,
+            error=str(e) or e.__class__.__name__,
+            completed=timezone.now()
+        )
+        raise
+
+    completed = timezone.now()
+    for job in jobs:
+        job.completed = completed
+        if job.ip_address_id not in devices_by_ip:
+            # Removed, assigned meanwhile, or discovery is disabled
+            job.status = DiscoveryJob.STATUS_SKIPPED
+        elif devices_by_ip[job.ip_address_id]:
+            job.status = DiscoveryJob.STATUS_COMPLETED
+            job.device = devices_by_ip[job.ip_address_id]
+        else:
+            job.status = DiscoveryJob.STATUS_FAILED
+            job.error = 'No device could be discovered'
+
+    DiscoveryJob.objects.bulk_update(jobs, ['status', 'device', 'error', 'completed'])
+    logger.info(f"✅ Batched discovery finished: {sum(1 for job in jobs if job.device)} devices")
+    return len(jobs)
+
+
+def enqueue_sweep(sweep):
+    """
+    Queue a background job running (or resuming) a prefix sweep.
+    """
+    rq_job = get_queue(SWEEP_QUEUE_NAME).enqueue(
+        run_prefix_sweep,
+        sweep.pk,
+        job_timeout=get_plugin_setting('sweep_job_timeout', 43200)
+    )
+
+    sweep.status = PrefixSweep.STATUS_PENDING
+    sweep.job_id = rq_job.id
+    sweep.save(update_fields=['status', 'job_id', 'updated'])
+    logger.info(f"📥 Queued sweep job {rq_job.id} for {sweep.prefix}")
+
+    return sweep
+
+
+def is_job_active(job_id, queue_name=SWEEP_QUEUE_NAME):
+    """
+    Whether an RQ job is still waiting or running, as opposed to finished, failed,
+    or lost (e.g. expired after its worker was killed).
+    """
+    if not job_id:
+        return False
+    try:
+        job = Job.fetch(job_id, connection=get_queue(queue_name).connection)
+    except NoSuchJobError:
+        return False
+    return job.get_status() in (JobStatus.QUEUED, JobStatus.STARTED, JobStatus.SCHEDULED, JobStatus.DEFERRED)
+
+
+def run_prefix_sweep(sweep_id):
+    """
+    Background job entry point: run a PrefixSweep from its last checkpoint.
+    """
+    sweep = PrefixSweep.objects.filter(pk=sweep_id).first()
+    if not sweep:
+        logger.warning(f"Prefix sweep {sweep_id} no longer exists")
+        return None
+
+    def report(sweep, rate):
+        logger.info(
+            f"📦 Sweep of {sweep.prefix}: {sweep.hosts_scanned}/{sweep.hosts_total} scanned, "
+            f"{sweep.responders} responding, {sweep.devices} devices ({rate:.1f} hosts/s)"
+        )
+
+    PrefixSweeper(sweep, progress=report).run()
+    return sweep.status
+
+
+def enqueue_crawl(crawl):
+    """
+    Queue a background job running a topology crawl.
+    """
+    rq_job = get_queue(SWEEP_QUEUE_NAME).enqueue(
+        run_topology_crawl,
+        crawl.pk,
+        job_timeout=get_plugin_setting('crawl_job_timeout', 43200)
+    )
+
+    crawl.status = TopologyCrawl.STATUS_PENDING
+    crawl.job_id = rq_job.id
+    crawl.save(update_fields=['status', 'job_id', 'updated'])
+    logger.info(f"📥 Queued crawl job {rq_job.id} from {crawl.seed}")
+
+    return crawl
+
+
+def run_topology_crawl(crawl_id):
+    """
+    Background job entry point: run a TopologyCrawl.
+    """
+    crawl = TopologyCrawl.objects.filter(pk=crawl_id).first()
+    if not crawl:
+        logger.warning(f"Topology crawl {crawl_id} no longer exists")
+        return None
+
+    def report(crawl, frontier):
+        logger.info(
+            f"🕸️  Crawl from {crawl.seed}: hop {crawl.depth}, {crawl.visited} visited, {crawl.devices} devices, "
+            f"{frontier} addresses next"
+        )
+
+    TopologyCrawler(crawl, progress=report).run()
+    return crawl.status
+
+
+def enqueue_harvest(device_ids=None, discover=True):
+    """
+    Queue a background job harvesting addresses from discovered devices.
+    """
+    rq_job = get_queue(SWEEP_QUEUE_NAME).enqueue(
+        run_address_harvest,
+        device_ids,
+        discover=discover,
+        job_timeout=get_plugin_setting('harvest_job_timeout', 3600)
+    )
+    logger.info(f"📥 Queued address harvest job {rq_job.id}")
+    return rq_job
+
+
+def run_address_harvest(device_ids=None, discover=True):
+    """
+    Background job entry point: harvest the addresses known to the given (or all
+    auto-discovered) devices, then queue the new addresses for discovery as one batch.
+    """
+    harvester = AddressHarvester()
+    devices = None
+    if device_ids is not None:
+        devices = harvester.get_devices().filter(pk__in=device_ids)
+
+    stats = harvester.run(devices)
+    if discover and harvester.harvested:
+        enqueue_discovery_batch(harvester.harvested)
+        stats['queued'] = len(harvester.harvested)
+    return dict(stats)
+
+
+def schedule_rediscovery(delay=None):
+    """
+    Schedule the next periodic rediscovery run, unless one is already scheduled.
+
+    Returns the scheduled RQ job, or None if `rediscovery_interval` is 0.
+    """
+    interval = get_plugin_setting('rediscovery_interval', 3600)
+    if not interval:
+        return None
+
+    queue = get_queue(REDISCOVERY_QUEUE_NAME)
+    scheduled = Job.fetch_many(queue.scheduled_job_registry.get_job_ids(), connection=queue.connection)
+    for job in scheduled:
+        if job and job.func_name == f'{__name__}.run_rediscovery':
+            return job
+
+    job = queue.enqueue_in(
+        timedelta(seconds=interval if delay is None else delay),
+        run_rediscovery,
+        job_timeout=get_plugin_setting('rediscovery_job_timeout', 3600)
+    )
+    logger.info(f"🗓️  Scheduled rediscovery job {job.id}")
+    return job
+
+
+def run_rediscovery(full=False, reschedule=True):
+    """
+    Background job entry point: re-poll all auto-discovered devices, prune old
+    discovery results, then schedule the next run.
+
+    With `rediscovery_shards` above 1, the devices are split into that many
+    shard jobs instead, which any number of workers can run side by side.
+    """
+    shards = get_plugin_setting('rediscovery_shards', 1)
+    try:
+        if shards > 1:
+            queue = get_queue(REDISCOVERY_QUEUE_NAME)
+            for index in range(shards):
+                queue.enqueue(
+                    run_rediscovery_shard,
+                    index,
+                    shards,
+                    full=full,
+                    job_timeout=get_plugin_setting('rediscovery_job_timeout', 3600)
+                )
+            logger.info(f"📥 Queued rediscovery in {shards} shards")
+            stats = {'shards': shards}
+        else:
+            stats = Rediscoverer(full=full).run()
+        # Piggyback retention on the periodic job
+        stats['results_pruned'] = prune_results()
+    finally:
+        if reschedule:
+            schedule_rediscovery()
+    return dict(stats)
+
+
+def run_rediscovery_shard(index, count, full=False):
+    """
+    Background job entry point: re-poll one shard of the auto-discovered devices.
+    """
+    return dict(Rediscoverer(full=full, shard=(index, count)).run())
@@ -0,0 +1,36 @@
+from django.db import connection
+from .metrics import PHASE_DURATION
+from .utils import PLUGIN_NAME
+import hashlib
+import time
+
+
+def lock_id(*parts):
+    """
+    Map a lock name onto the signed 64-bit keys of PostgreSQL advisory locks.
+    """
+    name = '\0'.join(str(part) for part in (PLUGIN_NAME,) + parts)
+    return int.from_bytes(hashlib.blake2b(name.encode(), digest_size=8).digest(), 'big', signed=True)
+
+
+def lock_device(*identities):
+    """
+    Serialise workers materialising the same device.
+
+    Takes a transaction-level advisory lock for each identity (device name,
+    serial number...), in a fixed order so two workers can never wait on each
+    other. The locks are released when the transaction commits or rolls back, so
+    this must be called inside transaction.atomic(), before checking whether the
+    device exists.
+
+    NetBox only runs on PostgreSQL; on other databases this does nothing.
+    """
+    if connection.vendor != 'postgresql':
+        return
+
+    keys = sorted({lock_id('device', str(identity).lower()) for identity in identities if identity})
+    started = time.monotonic()
+    with connection.cursor() as cursor:
+        for key in keys:
+            cursor.execute('SELECT pg_advisory_xact_lock(%s)', [key])
+    PHASE_DURATION.labels('lock_wait').observe(time.monotonic() - started)
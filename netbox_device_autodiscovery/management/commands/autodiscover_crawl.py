@@ -0,0 +1,59 @@
+from django.core.management.base import BaseCommand, CommandError
+from dcim.models import Device
+from netbox_device_autodiscovery.crawl import TopologyCrawler, start_crawl
+from netbox_device_autodiscovery.jobs import enqueue_crawl
+import ipaddress
+
+
+class Command(BaseCommand):
+    help = "Discover the devices reachable over LLDP and CDP neighbours of a seed"
+
+    def add_arguments(self, parser):
+        parser.add_argument('seed', help="Address or name of the device to start from")
+        parser.add_argument('--depth', type=int, help="Maximum number of hops from the seed")
+        parser.add_argument('--allow', action='append', help="Only crawl addresses in this prefix (may be repeated)")
+        parser.add_argument('--deny', action='append', help="Never crawl addresses in this prefix (may be repeated)")
+        parser.add_argument('--concurrency', type=int, help="Number of devices probed at the same time")
+        parser.add_argument('--background', action='store_true', help="Queue the crawl as a background job")
+
+    def handle(self, *args, **options):
+        seed = options['seed']
+        try:
+            ipaddress.ip_address(seed)
+        except ValueError:
+            device = Device.objects.filter(name=seed).select_related('primary_ip4', 'primary_ip6').first()
+            if not device or not (device.primary_ip4 or device.primary_ip6):
+                raise CommandError(f"{seed} is neither an IP address nor a device with a primary IP")
+            seed = str((device.primary_ip4 or device.primary_ip6).address.ip)
+
+        try:
+            crawl = start_crawl(
+                seed,
+                max_depth=options['depth'],
+                allow_prefixes=options['allow'],
+                deny_prefixes=options['deny']
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        if options['background']:
+            enqueue_crawl(crawl)
+            self.stdout.write(self.style.SUCCESS(f"Crawl from {seed} queued as job {crawl.job_id}"))
+            return
+
+        self.stdout.write(f"Crawling from {seed} (max. {crawl.max_depth} hops)")
+        try:
+            TopologyCrawler(crawl, concurrency=options['concurrency'], progress=self.report).run()
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Crawl from {seed} complete: {crawl.visited} addresses visited, {crawl.devices} devices, "
+            f"{crawl.cables} cables"
+        ))
+
+    def report(self, crawl, frontier):
+        self.stdout.write(
+            f"Hop {crawl.depth}: {crawl.visited} visited, {crawl.responders} responding, {crawl.devices} devices, "
+            f"{frontier} addresses next"
+        )
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+from netbox_device_autodiscovery.harvest import AddressHarvester
+from netbox_device_autodiscovery.jobs import enqueue_discovery_batch, enqueue_harvest
+
+
+class Command(BaseCommand):
+    help = "Create IP addresses from the address tables and ARP caches of discovered devices"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--device', action='append', help="Limit to the named device (may be repeated)")
+        parser.add_argument('--no-discover', action='store_true', help="Do not queue discovery of new addresses")
+        parser.add_argument('--background', action='store_true', help="Queue the harvest as a background job")
+
+    def handle(self, *args, **options):
+        harvester = AddressHarvester()
+        devices = None
+        if options['device']:
+            devices = harvester.get_devices().filter(name__in=options['device'])
+
+        if options['background']:
+            device_ids = list(devices.values_list('pk', flat=True)) if devices is not None else None
+            job = enqueue_harvest(device_ids, discover=not options['no_discover'])
+            self.stdout.write(self.style.SUCCESS(f"Address harvest queued as job {job.id}"))
+            return
+
+        try:
+            stats = harvester.run(devices)
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        if harvester.harvested and not options['no_discover']:
+            enqueue_discovery_batch(harvester.harvested)
+            stats['queued'] = len(harvester.harvested)
+
+        for key in ('polled', 'unreachable', 'addresses_created', 'addresses_assigned', 'queued'):
+            self.stdout.write(f"{key:<20} {stats[key]}")
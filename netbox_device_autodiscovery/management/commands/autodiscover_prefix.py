@@ -0,0 +1,57 @@
+from django.core.management.base import BaseCommand, CommandError
+from ipam.models import VRF
+from netbox_device_autodiscovery.sweep import PrefixSweeper, start_sweep
+import ipaddress
+
+
+class Command(BaseCommand):
+    help = "Discover devices on all host addresses of a prefix"
+
+    def add_arguments(self, parser):
+        parser.add_argument('prefix', help="Prefix to sweep, e.g. 10.0.0.0/22")
+        parser.add_argument('--vrf', type=int, help="ID of the VRF for created IP addresses")
+        parser.add_argument('--concurrency', type=int, help="Number of hosts probed at the same time")
+        parser.add_argument('--chunk-size', type=int, default=256, help="Hosts per checkpoint (default: 256)")
+        parser.add_argument('--restart', action='store_true', help="Ignore the checkpoint of an unfinished sweep")
+
+    def handle(self, *args, **options):
+        try:
+            network = ipaddress.ip_network(options['prefix'])
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        vrf = None
+        if options['vrf']:
+            vrf = VRF.objects.filter(pk=options['vrf']).first()
+            if not vrf:
+                raise CommandError(f"VRF {options['vrf']} does not exist")
+
+        sweep = start_sweep(str(network), vrf=vrf, restart=options['restart'])
+        if sweep.last_address:
+            self.stdout.write(f"Resuming sweep of {network} after {sweep.last_address}")
+        else:
+            self.stdout.write(f"Sweeping {network} ({sweep.hosts_total} hosts)")
+
+        sweeper = PrefixSweeper(
+            sweep,
+            concurrency=options['concurrency'],
+            chunk_size=options['chunk_size'],
+            progress=self.report
+        )
+        try:
+            sweeper.run()
+        except KeyboardInterrupt:
+            raise CommandError(f"Interrupted after {sweep.last_address}; run the command again to resume")
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Sweep of {network} complete: {sweep.responders} responders, {sweep.devices} devices"
+        ))
+
+    def report(self, sweep, rate):
+        percent = 100 * sweep.hosts_scanned / max(sweep.hosts_total, 1)
+        self.stdout.write(
+            f"{sweep.hosts_scanned}/{sweep.hosts_total} ({percent:.1f}%) scanned, "
+            f"{sweep.responders} responding, {sweep.devices} devices ({rate:.1f} hosts/s)"
+        )
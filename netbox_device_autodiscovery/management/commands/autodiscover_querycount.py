@@ -0,0 +1,73 @@
+from collections import Counter
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from ipam.models import IPAddress
+from netbox_device_autodiscovery.cache import lookup_cache
+from netbox_device_autodiscovery.discovery import DeviceDiscovery
+from netbox_device_autodiscovery.models import AutoDiscoveryConfig
+from netbox_device_autodiscovery.utils import discovery_suppressed
+import ipaddress
+
+# RFC 2544 benchmarking range, never routed
+BENCHMARK_NETWORK = ipaddress.ip_network('198.18.0.0/15')
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Count the database queries needed to create discovered devices (all changes are rolled back)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--devices', type=int, default=20, help="Number of devices to create")
+        parser.add_argument('--interfaces', type=int, default=48, help="Discovered interfaces per device")
+
+    def handle(self, *args, **options):
+        interfaces = [
+            {'index': i, 'name': f'GigabitEthernet0/{i}', 'type': 6, 'speed': 1000, 'enabled': True}
+            for i in range(1, options['interfaces'] + 1)
+        ]
+        counts = []
+        statements = Counter()
+
+        try:
+            with transaction.atomic():
+                for host in list(BENCHMARK_NETWORK.hosts())[:options['devices']]:
+                    with discovery_suppressed():
+                        ip_address = IPAddress.objects.create(address=f'{host}/{BENCHMARK_NETWORK.prefixlen}')
+
+                    # The caches only fill on commit, which never comes here: run the
+                    # callbacks after each device, as if it had been committed
+                    with TestCase.captureOnCommitCallbacks(execute=True):
+                        discovery = DeviceDiscovery(ip_address, device_info={
+                            'sysName': f'querycount-{str(host).replace(".", "-")}',
+                            'sysDescr': 'Cisco IOS Software, benchmark',
+                            'sysObjectID': '1.3.6.1.4.1.9.1.1',
+                            'interfaces': interfaces,
+                        })
+                        with CaptureQueriesContext(connection) as queries:
+                            discovery.create_device()
+
+                    counts.append(len(queries))
+                    statements.update(query['sql'].split(None, 1)[0].upper() for query in queries.captured_queries)
+                raise Rollback
+        except Rollback:
+            pass
+        finally:
+            # Forget the rolled back objects
+            lookup_cache.clear()
+            AutoDiscoveryConfig.invalidate_cache()
+
+        if not counts:
+            return
+
+        warm = counts[1:] or counts
+        self.stdout.write(f"Devices:                   {len(counts)} ({options['interfaces']} interfaces each)")
+        self.stdout.write(f"Queries, first device:     {counts[0]}")
+        self.stdout.write(f"Queries per device (warm): {sum(warm) / len(warm):.1f}")
+        self.stdout.write(
+            "Statements:                " + ', '.join(f'{verb}={count}' for verb, count in statements.most_common())
+        )
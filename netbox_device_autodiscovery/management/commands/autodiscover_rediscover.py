@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+from netbox_device_autodiscovery.jobs import schedule_rediscovery
+from netbox_device_autodiscovery.rediscovery import Rediscoverer
+
+
+class Command(BaseCommand):
+    help = "Re-poll auto-discovered devices and update what changed"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--device', action='append', help="Limit to the named device (may be repeated)")
+        parser.add_argument('--full', action='store_true', help="Walk every interface table, ignoring change indicators")
+        parser.add_argument('--schedule', action='store_true', help="Start the periodic background rediscovery instead")
+
+    def handle(self, *args, **options):
+        if options['schedule']:
+            job = schedule_rediscovery(delay=0)
+            if job is None:
+                raise CommandError("rediscovery_interval is 0, periodic rediscovery is disabled")
+            self.stdout.write(self.style.SUCCESS(f"Rediscovery scheduled as job {job.id}"))
+            return
+
+        rediscoverer = Rediscoverer(full=options['full'])
+        devices = None
+        if options['device']:
+            devices = rediscoverer.get_devices().filter(name__in=options['device'])
+
+        try:
+            stats = rediscoverer.run(devices)
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        for key in ('polled', 'unreachable', 'unchanged', 'full_walks', 'devices_updated', 'interfaces_updated',
+                    'interfaces_created'):
+            self.stdout.write(f"{key:<20} {stats[key]}")
@@ -0,0 +1,52 @@
+from django.core.management.base import BaseCommand, CommandError
+from netbox_device_autodiscovery.discovery import DeviceDiscovery
+from netbox_device_autodiscovery.models import DiscoveryResult
+from netbox_device_autodiscovery.results import prune_results
+
+
+class Command(BaseCommand):
+    help = "Rebuild devices from stored discovery results, or prune old results"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rebuild', action='store_true', help="Create devices from stored results, offline")
+        parser.add_argument('--id', type=int, action='append', help="Limit to the result with this ID (may be repeated)")
+        parser.add_argument('--address', help="Limit to results for this IP address")
+        parser.add_argument('--prune', action='store_true', help="Delete results older than result_retention_days")
+        parser.add_argument('--days', type=int, help="Retention in days, overriding result_retention_days")
+
+    def handle(self, *args, **options):
+        if options['prune']:
+            count = prune_results(retention_days=options['days'])
+            self.stdout.write(self.style.SUCCESS(f"Pruned {count} results"))
+            return
+
+        if not options['rebuild']:
+            raise CommandError("Specify --rebuild or --prune")
+
+        # The latest result with data per IP address
+        results = DiscoveryResult.objects.exclude(data={}).select_related('ip_address').order_by('ip_address', '-created')
+        if options['id']:
+            results = results.filter(pk__in=options['id'])
+        if options['address']:
+            results = results.filter(address__startswith=f"{options['address']}/")
+
+        seen = set()
+        for result in results.iterator():
+            if result.ip_address_id in seen:
+                continue
+            seen.add(result.ip_address_id)
+
+            if result.ip_address is None:
+                self.stdout.write(f"{result.address}: IP address no longer exists, skipping")
+                continue
+            if result.ip_address.assigned_object_id:
+                self.stdout.write(f"{result.address}: already assigned, skipping")
+                continue
+
+            device = DeviceDiscovery.from_result(result).create_device()
+            if device:
+                result.device = device
+                result.save(update_fields=['device'])
+                self.stdout.write(self.style.SUCCESS(f"{result.address}: {device.name}"))
+            else:
+                self.stdout.write(self.style.ERROR(f"{result.address}: no device created"))
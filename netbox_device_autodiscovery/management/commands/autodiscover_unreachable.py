@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from netbox_device_autodiscovery import negative_cache
+from netbox_device_autodiscovery.models import UnreachableTarget
+
+
+class Command(BaseCommand):
+    help = "Inspect or flush the cache of targets that did not answer SNMP"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--address', help="Limit to a single IP address")
+        parser.add_argument('--flush', action='store_true', help="Remove the entries so the targets are probed again")
+        parser.add_argument('--prune', action='store_true', help="Remove entries older than negative_cache_ttl")
+
+    def handle(self, *args, **options):
+        if options['prune']:
+            count = negative_cache.prune()
+            self.stdout.write(self.style.SUCCESS(f"Pruned {count} expired entries"))
+            return
+
+        if options['flush']:
+            count = negative_cache.flush(options['address'])
+            self.stdout.write(self.style.SUCCESS(f"Flushed {count} entries"))
+            return
+
+        targets = UnreachableTarget.objects.all()
+        if options['address']:
+            targets = targets.filter(address=options['address'])
+
+        now = timezone.now()
+        for target in targets.iterator():
+            state = 'backing off' if target.retry_after > now else 'retry allowed'
+            self.stdout.write(
+                f"{target.address:<40} failures={target.failures:<4} last={target.last_failure:%Y-%m-%d %H:%M} "
+                f"retry_after={target.retry_after:%Y-%m-%d %H:%M} ({state}) {target.last_error}"
+            )
@@ -0,0 +1,171 @@
+from django_rq import get_queue
+from functools import wraps
+from .utils import get_plugin_setting
+import logging
+import os
+import time
+
+try:
+    from prometheus_client import (
+        CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess,
+    )
+    from prometheus_client.core import GaugeMetricFamily
+    PROMETHEUS_AVAILABLE = True
+except ImportError:
+    PROMETHEUS_AVAILABLE = False
+
+logger = logging.getLogger('netbox.plugins.device_autodiscovery')
+
+# Seconds; spans a cached ORM lookup up to an SNMP walk of a large chassis
+PHASE_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+class NoOpMetric:
+    """
+    Stands in for every metric when prometheus_client is missing or metrics are disabled.
+    """
+
+    def labels(self, *args, **kwargs):
+        return self
+
+    def observe(self, value):
+        pass
+
+    def inc(self, amount=1):
+        pass
+
+    def dec(self, amount=1):
+        pass
+
+    def set(self, value):
+        pass
+
+
+ENABLED = PROMETHEUS_AVAILABLE and get_plugin_setting('metrics_enabled', True)
+
+if ENABLED:
+    PHASE_DURATION = Histogram(
+        'netbox_autodiscovery_phase_duration_seconds',
+        'Duration of discovery phases',
+        ['phase'],
+        buckets=PHASE_BUCKETS
+    )
+    DISCOVERIES = Counter(
+        'netbox_autodiscovery_discoveries_total',
+        'Discovery runs by outcome, protocol and vendor',
+        ['outcome', 'protocol', 'vendor']
+    )
+    SNMP_PROBES = Counter(
+        'netbox_autodiscovery_snmp_probes_total',
+        'SNMP probes of a target by outcome (success, timeout, error, unreachable, skipped)',
+        ['outcome']
+    )
+    SNMP_PDUS = Counter(
+        'netbox_autodiscovery_snmp_pdus_total',
+        'SNMP request PDUs sent, by operation (get, getnext, getbulk)',
+        ['operation']
+    )
+    PROBES_IN_FLIGHT = Gauge(
+        'netbox_autodiscovery_probes_in_flight',
+        'SNMP probes currently running',
+        multiprocess_mode='livesum'
+    )
+else:
+    PHASE_DURATION = DISCOVERIES = SNMP_PROBES = SNMP_PDUS = PROBES_IN_FLIGHT = NoOpMetric()
+
+
+def observe_phase(phase):
+    """
+    Decorator recording the duration of each call in the phase histogram.
+
+    The labelled child is resolved once, so a call costs two clock reads and a
+    histogram update. Without metrics the function is returned unchanged.
+    """
+    def decorator(func):
+        if not ENABLED:
+            return func
+        histogram = PHASE_DURATION.labels(phase)
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - started)
+        return wrapper
+    return decorator
+
+
+def snmp_outcome(error):
+    """
+    Map an SNMP error message (or None) to the outcome label of SNMP_PROBES.
+    """
+    if error is None:
+        return 'success'
+    return 'timeout' if 'timeout' in str(error).lower() else 'error'
+
+
+class QueueCollector:
+    """
+    Reports the discovery queue depth at scrape time.
+
+    Reading two Redis lengths per scrape costs nothing while discovery runs.
+    """
+
+    def __init__(self, queue_name, pending_key):
+        self.queue_name = queue_name
+        self.pending_key = pending_key
+
+    def collect(self):
+        try:
+            queue = get_queue(self.queue_name)
+            jobs, pending = queue.count, queue.connection.llen(self.pending_key)
+        except Exception as e:
+            logger.debug(f"Could not read discovery queue depth: {str(e)}")
+            return
+
+        yield GaugeMetricFamily(
+            'netbox_autodiscovery_queue_jobs', 'Jobs waiting in the discovery queue', value=jobs
+        )
+        yield GaugeMetricFamily(
+            'netbox_autodiscovery_pending_ips', 'New IPs waiting to be coalesced into batch jobs', value=pending
+        )
+
+
+_queue_collector = None
+
+
+def register_queue_collector(queue_name, pending_key):
+    global _queue_collector
+    if ENABLED and _queue_collector is None:
+        _queue_collector = QueueCollector(queue_name, pending_key)
+        REGISTRY.register(_queue_collector)
+
+
+def is_multiprocess():
+    return bool(os.environ.get('PROMETHEUS_MULTIPROC_DIR') or os.environ.get('prometheus_multiproc_dir'))
+
+
+def get_registry():
+    """
+    Return a registry with the metrics of all processes and the queue gauges.
+
+    In multiprocess mode every scrape reads the metric files of all processes into
+    a fresh registry, as NetBox's /metrics view does; the queue collector is
+    added to it, so the queue depth is read at scrape time in both modes.
+    """
+    if not is_multiprocess():
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    if _queue_collector is not None:
+        registry.register(_queue_collector)
+    return registry
+
+
+def export():
+    """
+    Return the body and content type of a scrape.
+    """
+    return generate_latest(get_registry()), CONTENT_TYPE_LATEST
@@ -0,0 +1,36 @@
+# Generated migration for DiscoveryJob model
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dcim', '0001_initial'),
+        ('ipam', '0001_initial'),
+        ('netbox_device_autodiscovery', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DiscoveryJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False)),
+                ('address', models.CharField(help_text='IP address at the time the job was queued', max_length=64)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('completed', 'Completed'), ('failed', 'Failed'), ('skipped', 'Skipped')], default='pending', max_length=20)),
+                ('job_id', models.CharField(blank=True, help_text='ID of the background (RQ) job', max_length=64)),
+                ('error', models.TextField(blank=True)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('started', models.DateTimeField(blank=True, null=True)),
+                ('completed', models.DateTimeField(blank=True, null=True)),
+                ('ip_address', models.ForeignKey(blank=True, help_text='IP address being discovered', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='ipam.ipaddress')),
+                ('device', models.ForeignKey(blank=True, help_text='Device created or matched by this job', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='dcim.device')),
+            ],
+            options={
+                'verbose_name': 'Discovery Job',
+                'verbose_name_plural': 'Discovery Jobs',
+                'ordering': ('-created',),
+            },
+        ),
+    ]
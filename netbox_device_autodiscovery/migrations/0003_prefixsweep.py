@@ -0,0 +1,39 @@
+# Generated migration for PrefixSweep model
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ipam', '0001_initial'),
+        ('netbox_device_autodiscovery', '0002_discoveryjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PrefixSweep',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False)),
+                ('prefix', models.CharField(help_text='Prefix being swept, e.g. 10.0.0.0/22', max_length=64)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('completed', 'Completed'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('job_id', models.CharField(blank=True, help_text='ID of the background (RQ) job', max_length=64)),
+                ('hosts_total', models.BigIntegerField(default=0)),
+                ('hosts_scanned', models.BigIntegerField(default=0)),
+                ('responders', models.PositiveIntegerField(default=0)),
+                ('devices', models.PositiveIntegerField(default=0)),
+                ('last_address', models.CharField(blank=True, help_text='Last host address that was fully processed (resume checkpoint)', max_length=64)),
+                ('error', models.TextField(blank=True)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('updated', models.DateTimeField(auto_now=True)),
+                ('completed', models.DateTimeField(blank=True, null=True)),
+                ('vrf', models.ForeignKey(blank=True, help_text='VRF for IP addresses created by the sweep', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='ipam.vrf')),
+            ],
+            options={
+                'verbose_name': 'Prefix Sweep',
+                'verbose_name_plural': 'Prefix Sweeps',
+                'ordering': ('-created',),
+            },
+        ),
+    ]
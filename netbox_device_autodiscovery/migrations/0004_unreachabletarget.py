@@ -0,0 +1,32 @@
+# Generated migration for UnreachableTarget model
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('netbox_device_autodiscovery', '0003_prefixsweep'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UnreachableTarget',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False)),
+                ('address', models.CharField(max_length=64)),
+                ('credential', models.CharField(help_text='Hash identifying the credential that was tried', max_length=64)),
+                ('failures', models.PositiveIntegerField(default=1)),
+                ('first_failure', models.DateTimeField(auto_now_add=True)),
+                ('last_failure', models.DateTimeField()),
+                ('retry_after', models.DateTimeField(db_index=True)),
+                ('last_error', models.CharField(blank=True, max_length=200)),
+            ],
+            options={
+                'verbose_name': 'Unreachable Target',
+                'verbose_name_plural': 'Unreachable Targets',
+                'ordering': ('address',),
+                'unique_together': {('address', 'credential')},
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated migration for DeviceState model
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dcim', '0001_initial'),
+        ('netbox_device_autodiscovery', '0004_unreachabletarget'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeviceState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False)),
+                ('sys_uptime', models.BigIntegerField(blank=True, help_text='sysUpTime (hundredths of a second) at the last poll', null=True)),
+                ('if_table_last_change', models.BigIntegerField(blank=True, help_text='ifTableLastChange at the last poll', null=True)),
+                ('interface_changes', models.JSONField(blank=True, default=dict, help_text='ifLastChange per ifIndex at the last poll')),
+                ('last_polled', models.DateTimeField(blank=True, null=True)),
+                ('last_full_poll', models.DateTimeField(blank=True, help_text='Last time the whole interface table was walked', null=True)),
+                ('last_changed', models.DateTimeField(blank=True, help_text='Last time rediscovery wrote a change', null=True)),
+                ('device', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='dcim.device')),
+            ],
+            options={
+                'verbose_name': 'Device State',
+                'verbose_name_plural': 'Device States',
+                'ordering': ('device',),
+            },
+        ),
+    ]
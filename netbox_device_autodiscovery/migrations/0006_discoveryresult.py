@@ -0,0 +1,36 @@
+# Generated migration for DiscoveryResult model
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dcim', '0001_initial'),
+        ('ipam', '0001_initial'),
+        ('netbox_device_autodiscovery', '0005_devicestate'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DiscoveryResult',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False)),
+                ('address', models.CharField(help_text='IP address at the time of discovery', max_length=64)),
+                ('status', models.CharField(choices=[('completed', 'Completed'), ('failed', 'Failed')], max_length=20)),
+                ('protocol', models.CharField(choices=[('snmp', 'SNMP'), ('ssh', 'SSH'), ('dns', 'DNS'), ('none', 'None')], help_text='Protocol that provided the device information', max_length=10)),
+                ('data', models.JSONField(blank=True, default=dict)),
+                ('durations', models.JSONField(blank=True, default=dict, help_text='Duration of each discovery phase in milliseconds')),
+                ('error', models.TextField(blank=True)),
+                ('created', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('device', models.ForeignKey(blank=True, help_text='Device created or matched from this result', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='dcim.device')),
+                ('ip_address', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='ipam.ipaddress')),
+            ],
+            options={
+                'verbose_name': 'Discovery Result',
+                'verbose_name_plural': 'Discovery Results',
+                'ordering': ('-created',),
+            },
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated migration for SNMPCredential and KnownCredential models
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('netbox_device_autodiscovery', '0006_discoveryresult'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='autodiscoveryconfig',
+            name='snmp_community',
+            field=models.CharField(default='public', help_text='SNMP community string for device discovery, used while no SNMP Credentials are defined', max_length=100),
+        ),
+        migrations.AlterField(
+            model_name='autodiscoveryconfig',
+            name='snmp_version',
+            field=models.IntegerField(choices=[(1, 'v1'), (2, 'v2c'), (3, 'v3')], default=2, help_text='SNMP version of the community above (v1 or v2c); v3 needs SNMP Credentials'),
+        ),
+        migrations.CreateModel(
+            name='SNMPCredential',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('enabled', models.BooleanField(default=True)),
+                ('priority', models.PositiveIntegerField(default=100, help_text='Credentials are tried in ascending priority')),
+                ('version', models.IntegerField(choices=[(1, 'v1'), (2, 'v2c'), (3, 'v3')], default=2)),
+                ('community', models.CharField(blank=True, help_text='Community string (v1 and v2c)', max_length=100)),
+                ('username', models.CharField(blank=True, help_text='Security name (v3)', max_length=100)),
+                ('auth_protocol', models.CharField(blank=True, choices=[('', 'None'), ('md5', 'MD5'), ('sha', 'SHA'), ('sha224', 'SHA-224'), ('sha256', 'SHA-256'), ('sha384', 'SHA-384'), ('sha512', 'SHA-512')], help_text='Authentication protocol (v3)', max_length=10)),
+                ('auth_key', models.CharField(blank=True, help_text='Authentication passphrase (v3)', max_length=100)),
+                ('priv_protocol', models.CharField(blank=True, choices=[('', 'None'), ('des', 'DES'), ('3des', '3DES'), ('aes', 'AES-128'), ('aes192', 'AES-192'), ('aes256', 'AES-256')], help_text='Privacy (encryption) protocol (v3)', max_length=10)),
+                ('priv_key', models.CharField(blank=True, help_text='Privacy passphrase (v3)', max_length=100)),
+            ],
+            options={
+                'verbose_name': 'SNMP Credential',
+                'verbose_name_plural': 'SNMP Credentials',
+                'ordering': ('priority', 'name'),
+            },
+        ),
+        migrations.CreateModel(
+            name='KnownCredential',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False)),
+                ('scope', models.CharField(max_length=64, unique=True)),
+                ('updated', models.DateTimeField(help_text='When this credential was first seen working for the scope')),
+                ('credential', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='netbox_device_autodiscovery.snmpcredential')),
+            ],
+            options={
+                'verbose_name': 'Known Credential',
+                'verbose_name_plural': 'Known Credentials',
+                'ordering': ('scope',),
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated migration for SSHCredential model
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('netbox_device_autodiscovery', '0007_snmpcredential'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SSHCredential',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('enabled', models.BooleanField(default=True)),
+                ('priority', models.PositiveIntegerField(default=100, help_text='Credentials are tried in ascending priority')),
+                ('username', models.CharField(max_length=100)),
+                ('password', models.CharField(blank=True, max_length=200)),
+                ('secret', models.CharField(blank=True, help_text='Enable secret, if the device needs one', max_length=200)),
+                ('device_type', models.CharField(default='autodetect', help_text="Netmiko device type, e.g. cisco_ios, cisco_nxos, arista_eos or juniper_junos; 'autodetect' probes the device once", max_length=50)),
+                ('port', models.PositiveIntegerField(default=22)),
+            ],
+            options={
+                'verbose_name': 'SSH Credential',
+                'verbose_name_plural': 'SSH Credentials',
+                'ordering': ('priority', 'name'),
+            },
+        ),
+    ]
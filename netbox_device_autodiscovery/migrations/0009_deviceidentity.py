@@ -0,0 +1,31 @@
+# Generated migration for DeviceIdentity model
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dcim', '0001_initial'),
+        ('netbox_device_autodiscovery', '0008_sshcredential'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeviceIdentity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False)),
+                ('kind', models.CharField(choices=[('serial', 'Serial number'), ('base_mac', 'Base MAC address'), ('engine_id', 'SNMP engine ID'), ('sysname', 'sysName and sysObjectID')], max_length=20)),
+                ('value', models.CharField(max_length=255)),
+                ('updated', models.DateTimeField(help_text='When the identifier was recorded for the device')),
+                ('device', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='dcim.device')),
+            ],
+            options={
+                'verbose_name': 'Device Identity',
+                'verbose_name_plural': 'Device Identities',
+                'ordering': ('device', 'kind'),
+                'unique_together': {('kind', 'value')},
+            },
+        ),
+    ]
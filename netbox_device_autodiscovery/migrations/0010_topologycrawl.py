@@ -0,0 +1,39 @@
+# Generated migration for TopologyCrawl model
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('netbox_device_autodiscovery', '0009_deviceidentity'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TopologyCrawl',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False)),
+                ('seed', models.CharField(help_text='Address the crawl starts from', max_length=64)),
+                ('max_depth', models.PositiveIntegerField(default=3, help_text='Maximum number of hops from the seed')),
+                ('allow_prefixes', models.JSONField(blank=True, default=list, help_text='Only addresses in these prefixes are crawled; empty allows all')),
+                ('deny_prefixes', models.JSONField(blank=True, default=list, help_text='Addresses in these prefixes are never crawled')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('completed', 'Completed'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('job_id', models.CharField(blank=True, help_text='ID of the background (RQ) job', max_length=64)),
+                ('depth', models.PositiveIntegerField(default=0, help_text='Hops from the seed reached so far')),
+                ('visited', models.PositiveIntegerField(default=0)),
+                ('responders', models.PositiveIntegerField(default=0)),
+                ('devices', models.PositiveIntegerField(default=0)),
+                ('cables', models.PositiveIntegerField(default=0)),
+                ('error', models.TextField(blank=True)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('updated', models.DateTimeField(auto_now=True)),
+                ('completed', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Topology Crawl',
+                'verbose_name_plural': 'Topology Crawls',
+                'ordering': ('-created',),
+            },
+        ),
+    ]
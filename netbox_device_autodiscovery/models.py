@@ -1,7 +1,23 @@
-from django.db import models
-from dcim.models import Site, DeviceRole
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db import models, transaction
+from dcim.models import Site, DeviceRole, Device
+from ipam.models import IPAddress, VRF
 from tenancy.models import Tenant
 from dcim.models import Location
+from .utils import get_plugin_setting
+import logging
+import time
+import types
+import uuid
+
+logger = logging.getLogger('netbox.plugins.device_autodiscovery')
+
+# Key in NetBox's (Redis) cache holding the current configuration version
+CONFIG_VERSION_CACHE_KEY = 'netbox_device_autodiscovery.config_version'
+
+# Snapshot shared by all discoveries in this process
+_config_snapshot = types.SimpleNamespace(config=None, version=None, expires=0)
 
 
 class AutoDiscoveryConfig(models.Model):
@@ -22,12 +38,12 @@ class AutoDiscoveryConfig(models.Model):
     snmp_community = models.CharField(
         max_length=100,
         default='public',
-        help_text="SNMP community string for device discovery"
+        help_text="SNMP community string for device discovery, used while no SNMP Credentials are defined"
     )
     snmp_version = models.IntegerField(
         default=2,
         choices=[(1, 'v1'), (2, 'v2c'), (3, 'v3')],
-        help_text="SNMP version to use"
+        help_text="SNMP version of the community above (v1 or v2c); v3 needs SNMP Credentials"
     )
     snmp_timeout = models.IntegerField(
         default=5,
@@ -105,3 +121,685 @@ class AutoDiscoveryConfig(models.Model):
         """
         config, created = cls.objects.get_or_create(pk=1)
         return config
+    
+    @classmethod
+    def get_cached_config(cls):
+        """
+        Get a shared, read-only snapshot of the configuration.
+        
+        The default site, role, tenant and location are loaded in the same query, and
+        the enabled SNMP and SSH credentials are attached as `snmp_credentials` and
+        `ssh_credentials`.
+        The snapshot is reloaded after `config_cache_ttl` seconds, when the
+        configuration is saved, or (with `config_cache_shared`) when another worker
+        published a new configuration version through NetBox's cache. A snapshot
+        loaded inside a transaction is only kept once the transaction commits.
+        """
+        version = cls._get_shared_version()
+        config = _config_snapshot.config
+        
+        if config is None or _config_snapshot.version != version or _config_snapshot.expires < time.monotonic():
+            config = cls.objects.select_related(
+                'default_site', 'default_device_role', 'default_tenant', 'default_location'
+            ).filter(pk=1).first() or cls.get_config()
+            config.snmp_credentials = list(SNMPCredential.objects.filter(enabled=True))
+            config.ssh_credentials = list(SSHCredential.objects.filter(enabled=True))
+            transaction.on_commit(lambda: cls._store_snapshot(config, version))
+        
+        return config
+    
+    @classmethod
+    def _store_snapshot(cls, config, version):
+        _config_snapshot.config = config
+        _config_snapshot.version = version
+        _config_snapshot.expires = time.monotonic() + get_plugin_setting('config_cache_ttl', 60)
+    
+    @classmethod
+    def invalidate_cache(cls):
+        """
+        Drop the cached snapshot in this process and, if shared, in all other workers.
+        """
+        _config_snapshot.config = None
+        if get_plugin_setting('config_cache_shared', False):
+            try:
+                cache.set(CONFIG_VERSION_CACHE_KEY, uuid.uuid4().hex, None)
+            except Exception as e:
+                logger.warning(f"Could not publish configuration change: {e}")
+    
+    @classmethod
+    def _get_shared_version(cls):
+        if not get_plugin_setting('config_cache_shared', False):
+            return None
+        try:
+            return cache.get(CONFIG_VERSION_CACHE_KEY)
+        except Exception as e:
+            logger.warning(f"Could not read configuration version from cache: {e}")
+            return None
+
+
+class DiscoveryJob(models.Model):
+    """
+    Tracks the status of a queued discovery job for a single IP address.
+    """
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_COMPLETED = 'completed'
+    STATUS_FAILED = 'failed'
+    STATUS_SKIPPED = 'skipped'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_COMPLETED, 'Completed'),
+        (STATUS_FAILED, 'Failed'),
+        (STATUS_SKIPPED, 'Skipped'),
+    ]
+
+    ip_address = models.ForeignKey(
+        IPAddress,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+        help_text="IP address being discovered"
+    )
+    address = models.CharField(
+        max_length=64,
+        help_text="IP address at the time the job was queued"
+    )
+    status = models.CharField(
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default=STATUS_PENDING
+    )
+    job_id = models.CharField(
+        max_length=64,
+        blank=True,
+        help_text="ID of the background (RQ) job"
+    )
+    device = models.ForeignKey(
+        Device,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+        help_text="Device created or matched by this job"
+    )
+    error = models.TextField(
+        blank=True
+    )
+    created = models.DateTimeField(
+        auto_now_add=True
+    )
+    started = models.DateTimeField(
+        null=True,
+        blank=True
+    )
+    completed = models.DateTimeField(
+        null=True,
+        blank=True
+    )
+
+    class Meta:
+        ordering = ('-created',)
+        verbose_name = "Discovery Job"
+        verbose_name_plural = "Discovery Jobs"
+
+    def __str__(self):
+        return f"Discovery of {self.address} ({self.get_status_display()})"
+
+
+class PrefixSweep(models.Model):
+    """
+    A discovery sweep over all host addresses of a prefix.
+
+    `last_address` is the checkpoint: an interrupted sweep resumes after it.
+    """
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_COMPLETED = 'completed'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_COMPLETED, 'Completed'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    prefix = models.CharField(
+        max_length=64,
+        help_text="Prefix being swept, e.g. 10.0.0.0/22"
+    )
+    vrf = models.ForeignKey(
+        VRF,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+        help_text="VRF for IP addresses created by the sweep"
+    )
+    status = models.CharField(
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default=STATUS_PENDING
+    )
+    job_id = models.CharField(
+        max_length=64,
+        blank=True,
+        help_text="ID of the background (RQ) job"
+    )
+    hosts_total = models.BigIntegerField(
+        default=0
+    )
+    hosts_scanned = models.BigIntegerField(
+        default=0
+    )
+    responders = models.PositiveIntegerField(
+        default=0
+    )
+    devices = models.PositiveIntegerField(
+        default=0
+    )
+    last_address = models.CharField(
+        max_length=64,
+        blank=True,
+        help_text="Last host address that was fully processed (resume checkpoint)"
+    )
+    error = models.TextField(
+        blank=True
+    )
+    created = models.DateTimeField(
+        auto_now_add=True
+    )
+    updated = models.DateTimeField(
+        auto_now=True
+    )
+    completed = models.DateTimeField(
+        null=True,
+        blank=True
+    )
+
+    class Meta:
+        ordering = ('-created',)
+        verbose_name = "Prefix Sweep"
+        verbose_name_plural = "Prefix Sweeps"
+
+    def __str__(self):
+        return f"Sweep of {self.prefix} ({self.get_status_display()})"
+
+
+class UnreachableTarget(models.Model):
+    """
+    Negative cache entry for an address that did not answer SNMP with a credential.
+
+    Discovery skips the target until `retry_after`; every further failure doubles
+    the wait (see negative_cache.py).
+    """
+    address = models.CharField(
+        max_length=64
+    )
+    credential = models.CharField(
+        max_length=64,
+        help_text="Hash identifying the credential that was tried"
+    )
+    failures = models.PositiveIntegerField(
+        default=1
+    )
+    first_failure = models.DateTimeField(
+        auto_now_add=True
+    )
+    last_failure = models.DateTimeField()
+    retry_after = models.DateTimeField(
+        db_index=True
+    )
+    last_error = models.CharField(
+        max_length=200,
+        blank=True
+    )
+
+    class Meta:
+        ordering = ('address',)
+        unique_together = ('address', 'credential')
+        verbose_name = "Unreachable Target"
+        verbose_name_plural = "Unreachable Targets"
+
+    def __str__(self):
+        return f"{self.address} ({self.failures} failures)"
+
+
+class DeviceState(models.Model):
+    """
+    Change indicators from the last poll of an auto-discovered device.
+
+    Rediscovery compares them with fresh values to decide what needs to be walked
+    and written again (see rediscovery.py).
+    """
+    device = models.OneToOneField(
+        Device,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    sys_uptime = models.BigIntegerField(
+        null=True,
+        blank=True,
+        help_text="sysUpTime (hundredths of a second) at the last poll"
+    )
+    if_table_last_change = models.BigIntegerField(
+        null=True,
+        blank=True,
+        help_text="ifTableLastChange at the last poll"
+    )
+    interface_changes = models.JSONField(
+        default=dict,
+        blank=True,
+        help_text="ifLastChange per ifIndex at the last poll"
+    )
+    last_polled = models.DateTimeField(
+        null=True,
+        blank=True
+    )
+    last_full_poll = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="Last time the whole interface table was walked"
+    )
+    last_changed = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="Last time rediscovery wrote a change"
+    )
+
+    class Meta:
+        ordering = ('device',)
+        verbose_name = "Device State"
+        verbose_name_plural = "Device States"
+
+    def __str__(self):
+        return f"State of {self.device}"
+
+
+class DiscoveryResult(models.Model):
+    """
+    What a discovery run collected for an IP address, and how long each phase took.
+
+    `data` holds the device_info in the compact form of results.pack_device_info,
+    so objects can be rebuilt later without probing the device again.
+    """
+    STATUS_COMPLETED = 'completed'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_COMPLETED, 'Completed'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    PROTOCOL_SNMP = 'snmp'
+    PROTOCOL_SSH = 'ssh'
+    PROTOCOL_DNS = 'dns'
+    PROTOCOL_NONE = 'none'
+    PROTOCOL_CHOICES = [
+        (PROTOCOL_SNMP, 'SNMP'),
+        (PROTOCOL_SSH, 'SSH'),
+        (PROTOCOL_DNS, 'DNS'),
+        (PROTOCOL_NONE, 'None'),
+    ]
+
+    ip_address = models.ForeignKey(
+        IPAddress,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+'
+    )
+    address = models.CharField(
+        max_length=64,
+        help_text="IP address at the time of discovery"
+    )
+    device = models.ForeignKey(
+        Device,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+        help_text="Device created or matched from this result"
+    )
+    status = models.CharField(
+        max_length=20,
+        choices=STATUS_CHOICES
+    )
+    protocol = models.CharField(
+        max_length=10,
+        choices=PROTOCOL_CHOICES,
+        help_text="Protocol that provided the device information"
+    )
+    data = models.JSONField(
+        default=dict,
+        blank=True
+    )
+    durations = models.JSONField(
+        default=dict,
+        blank=True,
+        help_text="Duration of each discovery phase in milliseconds"
+    )
+    error = models.TextField(
+        blank=True
+    )
+    created = models.DateTimeField(
+        auto_now_add=True,
+        db_index=True
+    )
+
+    class Meta:
+        ordering = ('-created',)
+        verbose_name = "Discovery Result"
+        verbose_name_plural = "Discovery Results"
+
+    def __str__(self):
+        return f"Result for {self.address} ({self.get_status_display()})"
+
+    @property
+    def total_duration(self):
+        return round(sum(self.durations.values()), 1)
+
+
+class SNMPCredential(models.Model):
+    """
+    An SNMP credential tried by discovery.
+
+    Enabled credentials are tried in order of priority, except that the credential
+    that last worked for the target (or its subnet) goes first (see credentials.py).
+    """
+    VERSION_CHOICES = [(1, 'v1'), (2, 'v2c'), (3, 'v3')]
+
+    AUTH_PROTOCOL_CHOICES = [
+        ('', 'None'),
+        ('md5', 'MD5'),
+        ('sha', 'SHA'),
+        ('sha224', 'SHA-224'),
+        ('sha256', 'SHA-256'),
+        ('sha384', 'SHA-384'),
+        ('sha512', 'SHA-512'),
+    ]
+    PRIV_PROTOCOL_CHOICES = [
+        ('', 'None'),
+        ('des', 'DES'),
+        ('3des', '3DES'),
+        ('aes', 'AES-128'),
+        ('aes192', 'AES-192'),
+        ('aes256', 'AES-256'),
+    ]
+
+    name = models.CharField(
+        max_length=100,
+        unique=True
+    )
+    enabled = models.BooleanField(
+        default=True
+    )
+    priority = models.PositiveIntegerField(
+        default=100,
+        help_text="Credentials are tried in ascending priority"
+    )
+    version = models.IntegerField(
+        default=2,
+        choices=VERSION_CHOICES
+    )
+    community = models.CharField(
+        max_length=100,
+        blank=True,
+        help_text="Community string (v1 and v2c)"
+    )
+    username = models.CharField(
+        max_length=100,
+        blank=True,
+        help_text="Security name (v3)"
+    )
+    auth_protocol = models.CharField(
+        max_length=10,
+        blank=True,
+        choices=AUTH_PROTOCOL_CHOICES,
+        help_text="Authentication protocol (v3)"
+    )
+    auth_key = models.CharField(
+        max_length=100,
+        blank=True,
+        help_text="Authentication passphrase (v3)"
+    )
+    priv_protocol = models.CharField(
+        max_length=10,
+        blank=True,
+        choices=PRIV_PROTOCOL_CHOICES,
+        help_text="Privacy (encryption) protocol (v3)"
+    )
+    priv_key = models.CharField(
+        max_length=100,
+        blank=True,
+        help_text="Privacy passphrase (v3)"
+    )
+
+    class Meta:
+        ordering = ('priority', 'name')
+        verbose_name = "SNMP Credential"
+        verbose_name_plural = "SNMP Credentials"
+
+    def __str__(self):
+        return f"{self.name} ({self.get_version_display()})"
+
+    def clean(self):
+        errors = {}
+        if self.version in (1, 2) and not self.community:
+            errors['community'] = "A community is required for SNMP v1 and v2c."
+        if self.version == 3:
+            if not self.username:
+                errors['username'] = "A security name is required for SNMP v3."
+            if self.auth_protocol and len(self.auth_key) < 8:
+                errors['auth_key'] = "The authentication passphrase must be at least 8 characters."
+            if self.priv_protocol and not self.auth_protocol:
+                errors['priv_protocol'] = "Privacy requires an authentication protocol."
+            if self.priv_protocol and len(self.priv_key) < 8:
+                errors['priv_key'] = "The privacy passphrase must be at least 8 characters."
+        if errors:
+            raise ValidationError(errors)
+
+
+class KnownCredential(models.Model):
+    """
+    The SNMP credential that last worked for an address or for the subnet around it.
+
+    `scope` is either an address or a prefix like 10.1.2.0/24 (see credentials.py).
+    """
+    scope = models.CharField(
+        max_length=64,
+        unique=True
+    )
+    credential = models.ForeignKey(
+        SNMPCredential,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    updated = models.DateTimeField(
+        help_text="When this credential was first seen working for the scope"
+    )
+
+    class Meta:
+        ordering = ('scope',)
+        verbose_name = "Known Credential"
+        verbose_name_plural = "Known Credentials"
+
+    def __str__(self):
+        return f"{self.scope}: {self.credential}"
+
+
+class SSHCredential(models.Model):
+    """
+    An SSH login tried by discovery when a device does not answer SNMP.
+
+    Enabled credentials are tried in ascending priority (see ssh.py).
+    """
+    name = models.CharField(
+        max_length=100,
+        unique=True
+    )
+    enabled = models.BooleanField(
+        default=True
+    )
+    priority = models.PositiveIntegerField(
+        default=100,
+        help_text="Credentials are tried in ascending priority"
+    )
+    username = models.CharField(
+        max_length=100
+    )
+    password = models.CharField(
+        max_length=200,
+        blank=True
+    )
+    secret = models.CharField(
+        max_length=200,
+        blank=True,
+        help_text="Enable secret, if the device needs one"
+    )
+    device_type = models.CharField(
+        max_length=50,
+        default='autodetect',
+        help_text="Netmiko device type, e.g. cisco_ios, cisco_nxos, arista_eos or juniper_junos; "
+                  "'autodetect' probes the device once"
+    )
+    port = models.PositiveIntegerField(
+        default=22
+    )
+
+    class Meta:
+        ordering = ('priority', 'name')
+        verbose_name = "SSH Credential"
+        verbose_name_plural = "SSH Credentials"
+
+    def __str__(self):
+        return f"{self.name} ({self.username})"
+
+
+class DeviceIdentity(models.Model):
+    """
+    A strong identifier of a device, such as its chassis serial number.
+
+    Discovery looks up the identifiers reported by a new IP here, so all addresses
+    of one device end up on that device (see identity.py).
+    """
+    KIND_SERIAL = 'serial'
+    KIND_BASE_MAC = 'base_mac'
+    KIND_ENGINE_ID = 'engine_id'
+    KIND_SYSNAME = 'sysname'
+    KIND_CHOICES = [
+        (KIND_SERIAL, 'Serial number'),
+        (KIND_BASE_MAC, 'Base MAC address'),
+        (KIND_ENGINE_ID, 'SNMP engine ID'),
+        (KIND_SYSNAME, 'sysName and sysObjectID'),
+    ]
+
+    kind = models.CharField(
+        max_length=20,
+        choices=KIND_CHOICES
+    )
+    value = models.CharField(
+        max_length=255
+    )
+    device = models.ForeignKey(
+        Device,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    updated = models.DateTimeField(
+        help_text="When the identifier was recorded for the device"
+    )
+
+    class Meta:
+        ordering = ('device', 'kind')
+        unique_together = ('kind', 'value')
+        verbose_name = "Device Identity"
+        verbose_name_plural = "Device Identities"
+
+    def __str__(self):
+        return f"{self.get_kind_display()} {self.value}"
+
+
+class TopologyCrawl(models.Model):
+    """
+    A discovery crawl following LLDP and CDP neighbours outwards from a seed address.
+
+    Management addresses reported by the neighbours of each discovered device
+    are probed next, up to `max_depth` hops from the seed (see crawl.py).
+    """
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_COMPLETED = 'completed'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_COMPLETED, 'Completed'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    seed = models.CharField(
+        max_length=64,
+        help_text="Address the crawl starts from"
+    )
+    max_depth = models.PositiveIntegerField(
+        default=3,
+        help_text="Maximum number of hops from the seed"
+    )
+    allow_prefixes = models.JSONField(
+        default=list,
+        blank=True,
+        help_text="Only addresses in these prefixes are crawled; empty allows all"
+    )
+    deny_prefixes = models.JSONField(
+        default=list,
+        blank=True,
+        help_text="Addresses in these prefixes are never crawled"
+    )
+    status = models.CharField(
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default=STATUS_PENDING
+    )
+    job_id = models.CharField(
+        max_length=64,
+        blank=True,
+        help_text="ID of the background (RQ) job"
+    )
+    depth = models.PositiveIntegerField(
+        default=0,
+        help_text="Hops from the seed reached so far"
+    )
+    visited = models.PositiveIntegerField(
+        default=0
+    )
+    responders = models.PositiveIntegerField(
+        default=0
+    )
+    devices = models.PositiveIntegerField(
+        default=0
+    )
+    cables = models.PositiveIntegerField(
+        default=0
+    )
+    error = models.TextField(
+        blank=True
+    )
+    created = models.DateTimeField(
+        auto_now_add=True
+    )
+    updated = models.DateTimeField(
+        auto_now=True
+    )
+    completed = models.DateTimeField(
+        null=True,
+        blank=True
+    )
+
+    class Meta:
+        ordering = ('-created',)
+        verbose_name = "Topology Crawl"
+        verbose_name_plural = "Topology Crawls"
+
+    def __str__(self):
+        return f"Crawl from {self.seed} ({self.get_status_display()})"
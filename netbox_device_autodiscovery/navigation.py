@@ -7,4 +7,10 @@ menu_items = (
         permissions=['netbox_device_autodiscovery.view_autodiscoveryconfig'],
         buttons=()
     ),
+    PluginMenuItem(
+        link='plugins:netbox_device_autodiscovery:discoveryresult_list',
+        link_text='Discovery Results',
+        permissions=['netbox_device_autodiscovery.view_discoveryresult'],
+        buttons=()
+    ),
 )
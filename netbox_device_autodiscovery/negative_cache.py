@@ -0,0 +1,127 @@
+from datetime import timedelta
+from django.utils import timezone
+from .models import UnreachableTarget
+from .utils import get_plugin_setting
+import hashlib
+import logging
+
+logger = logging.getLogger('netbox.plugins.device_autodiscovery')
+
+
+def is_enabled():
+    return get_plugin_setting('negative_cache_enabled', True)
+
+
+def credential_key(*parts):
+    """
+    Identify a credential without storing the secret itself.
+    """
+    return hashlib.sha256('\0'.join(str(part) for part in parts).encode()).hexdigest()[:16]
+
+
+def get_backoff(failures):
+    """
+    Seconds to wait before retrying a target after `failures` consecutive failures.
+    """
+    base = get_plugin_setting('negative_backoff_base', 300)
+    maximum = get_plugin_setting('negative_backoff_max', 86400)
+    return min(base * 2 ** (failures - 1), maximum)
+
+
+def is_suppressed(address, credential):
+    if not is_enabled():
+        return False
+    return UnreachableTarget.objects.filter(
+        address=address,
+        credential=credential,
+        retry_after__gt=timezone.now()
+    ).exists()
+
+
+def get_suppressed(addresses, credential):
+    """
+    Return the subset of addresses that are currently in backoff, using one query.
+    """
+    if not is_enabled():
+        return set()
+    return set(UnreachableTarget.objects.filter(
+        address__in=addresses,
+        credential=credential,
+        retry_after__gt=timezone.now()
+    ).values_list('address', flat=True))
+
+
+def record_success(address, credential):
+    if is_enabled():
+        UnreachableTarget.objects.filter(address=address, credential=credential).delete()
+
+
+def record_failure(address, credential, error=''):
+    record_results({address: error}, credential)
+
+
+def record_results(failures, credential, successes=()):
+    """
+    Update the cache for a batch of probes.
+
+    `failures` maps addresses to an error message; `successes` lists addresses that
+    answered. Failures older than `negative_cache_ttl` start a fresh backoff.
+    """
+    if not is_enabled():
+        return
+
+    if successes:
+        UnreachableTarget.objects.filter(address__in=list(successes), credential=credential).delete()
+    if not failures:
+        return
+
+    now = timezone.now()
+    expired = now - timedelta(seconds=get_plugin_setting('negative_cache_ttl', 604800))
+    existing = {
+        target.address: target
+        for target in UnreachableTarget.objects.filter(address__in=list(failures), credential=credential)
+    }
+    new_targets = []
+
+    for address, error in failures.items():
+        target = existing.get(address)
+        if target is None:
+            target = UnreachableTarget(address=address, credential=credential, failures=0)
+            new_targets.append(target)
+        elif target.last_failure < expired:
+            target.failures = 0
+        target.failures += 1
+        target.last_failure = now
+        target.retry_after = now + timedelta(seconds=get_backoff(target.failures))
+        target.last_error = str(error)[:200]
+
+    batch_size = get_plugin_setting('bulk_batch_size', 500)
+    if existing:
+        UnreachableTarget.objects.bulk_update(
+            existing.values(),
+            ['failures', 'last_failure', 'retry_after', 'last_error'],
+            batch_size=batch_size
+        )
+    if new_targets:
+        # Another worker may have recorded the same target meanwhile
+        UnreachableTarget.objects.bulk_create(new_targets, batch_size=batch_size, ignore_conflicts=True)
+
+
+def flush(address=None):
+    """
+    Remove entries for one address, or all entries. Returns the number removed.
+    """
+    queryset = UnreachableTarget.objects.all()
+    if address:
+        queryset = queryset.filter(address=address)
+    count, _ = queryset.delete()
+    return count
+
+
+def prune():
+    """
+    Remove entries whose last failure is older than `negative_cache_ttl`.
+    """
+    expired = timezone.now() - timedelta(seconds=get_plugin_setting('negative_cache_ttl', 604800))
+    count, _ = UnreachableTarget.objects.filter(last_failure__lt=expired).delete()
+    return count
@@ -0,0 +1,148 @@
+from collections import namedtuple
+from .snmp import CHANGE_OIDS, SNMPError, snmp_get
+from .utils import get_plugin_setting
+import asyncio
+import ipaddress
+import logging
+import os
+import socket
+import struct
+import time
+
+logger = logging.getLogger('netbox.plugins.device_autodiscovery')
+
+SYS_UPTIME_OID = CHANGE_OIDS['sysUpTime']
+
+# `snmp` is True if the target answered the sysUpTime probe, False if it was probed
+# and did not, None if SNMP was not probed
+Reachability = namedtuple('Reachability', ['reachable', 'snmp', 'method', 'latency'])
+
+
+def adaptive_timeout(latency, configured):
+    """
+    Derive a per-target SNMP timeout from the pre-probe round-trip time.
+    """
+    factor = get_plugin_setting('prefilter_timeout_factor', 4)
+    return min(configured, max(1.0, latency * factor))
+
+
+def check_reachability(ip, credential):
+    """
+    Cheaply find out whether a target is alive before running full discovery.
+
+    A single sysUpTime GET with `credential` is tried first; if it gets no answer, TCP connects and an
+    unprivileged ICMP echo run concurrently and the first to succeed wins. All
+    probes use the short `prefilter_timeout`.
+    """
+    methods = get_plugin_setting('prefilter_methods', ['snmp', 'tcp', 'icmp'])
+    timeout = get_plugin_setting('prefilter_timeout', 1)
+    snmp = None
+
+    if 'snmp' in methods:
+        started = time.monotonic()
+        try:
+            snmp_get(ip, credential, {'sysUpTime': SYS_UPTIME_OID}, timeout, retries=0)
+            return Reachability(True, True, 'snmp', time.monotonic() - started)
+        except SNMPError:
+            snmp = False
+
+    other_methods = [method for method in methods if method != 'snmp']
+    if other_methods:
+        method, latency = asyncio.run(probe_concurrently(ip, other_methods, timeout))
+        if method:
+            return Reachability(True, snmp, method, latency)
+
+    return Reachability(False, snmp, None, None)
+
+
+async def probe_concurrently(ip, methods, timeout):
+    """
+    Run the TCP and ICMP probes at the same time; return (method, latency) of the first
+    that succeeds, or (None, None).
+    """
+    async def run(method, probe):
+        return method, await probe
+
+    probes = []
+    if 'tcp' in methods:
+        for port in get_plugin_setting('prefilter_tcp_ports', [22, 443]):
+            probes.append(run(f'tcp/{port}', tcp_probe(ip, port, timeout)))
+    if 'icmp' in methods:
+        probes.append(run('icmp', icmp_probe(ip, timeout)))
+
+    tasks = [asyncio.ensure_future(probe) for probe in probes]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            method, latency = await next_done
+            if latency is not None:
+                return method, latency
+    finally:
+        for task in tasks:
+            task.cancel()
+
+    return None, None
+
+
+async def tcp_probe(ip, port, timeout):
+    """
+    Return the TCP connect latency, or None. A refused connection still proves the host is up.
+    """
+    started = time.monotonic()
+    try:
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(ip, port), timeout)
+    except ConnectionRefusedError:
+        return time.monotonic() - started
+    except (OSError, asyncio.TimeoutError):
+        return None
+    writer.close()
+    return time.monotonic() - started
+
+
+async def icmp_probe(ip, timeout):
+    """
+    Return the ICMP echo latency, or None.
+
+    Uses an unprivileged datagram ICMP socket, which needs the process group to be
+    allowed by net.ipv4.ping_group_range; if it is not, the probe is skipped.
+    """
+    version = ipaddress.ip_address(ip).version
+    family, proto, echo_request, echo_reply = (
+        (socket.AF_INET, socket.IPPROTO_ICMP, 8, 0) if version == 4
+        else (socket.AF_INET6, socket.IPPROTO_ICMPV6, 128, 129)
+    )
+
+    try:
+        sock = socket.socket(family, socket.SOCK_DGRAM, proto)
+    except OSError:
+        return None
+
+    loop = asyncio.get_running_loop()
+    try:
+        sock.setblocking(False)
+        identifier = os.getpid() & 0xffff
+        header = struct.pack('!BBHHH', echo_request, 0, 0, identifier, 1)
+        payload = b'netbox-autodiscovery'
+        checksum = _icmp_checksum(header + payload)
+        packet = struct.pack('!BBHHH', echo_request, 0, checksum, identifier, 1) + payload
+
+        started = time.monotonic()
+        await loop.sock_connect(sock, (ip, 0))
+        await loop.sock_sendall(sock, packet)
+        deadline = started + timeout
+        while True:
+            data = await asyncio.wait_for(loop.sock_recv(sock, 1024), max(deadline - time.monotonic(), 0))
+            if data and data[0] == echo_reply:
+                return time.monotonic() - started
+    except (OSError, asyncio.TimeoutError):
+        return None
+    finally:
+        sock.close()
+
+
+def _icmp_checksum(data):
+    if len(data) % 2:
+        data += b'\0'
+    total = sum(struct.unpack(f'!{len(data) // 2}H', data))
+    total = (total >> 16) + (total & 0xffff)
+    total += total >> 16
+    return ~total & 0xffff
@@ -0,0 +1,345 @@
+from collections import Counter, defaultdict
+from datetime import timedelta
+from django.db import models, transaction
+from django.db.models import Q
+from django.db.models.functions import Mod
+from django.utils import timezone
+from dcim.models import Device, Interface
+from . import identity, ssh
+from .async_discovery import AsyncDiscoveryEngine, get_engine_for_config
+from .discovery import COMMENTS_PREFIX, TAG_NAME, DeviceDiscovery, get_platform
+from .models import AutoDiscoveryConfig, DeviceState
+from .scheduler import PRIORITY_REDISCOVERY
+from .snmp import CHANGE_OIDS, IF_LAST_CHANGE_COLUMN, INTERFACE_COLUMNS, SYSTEM_OIDS, build_interfaces
+from .utils import get_plugin_setting, send_bulk_create_signals, send_bulk_update_signals
+import logging
+
+logger = logging.getLogger('netbox.plugins.device_autodiscovery')
+
+
+class RediscoveryEngine(AsyncDiscoveryEngine):
+    """
+    Polls known devices, walking only what the change indicators say has changed.
+
+    `states` maps IPs to the DeviceState of their device (missing if never polled).
+    Results carry `full`: True if the whole interface table was walked, False if
+    `interfaces` only lists the rows whose ifLastChange moved.
+    """
+
+    def __init__(self, credentials, timeout, states=None, full_before=None, **kwargs):
+        """
+        States whose last full poll is older than `full_before` get a full walk.
+        """
+        super().__init__(credentials, timeout, **kwargs)
+        self.states = states or {}
+        self.full_before = full_before
+
+    async def probe(self, ip):
+        transport = await self._transport(ip, self.timeout, self.retries)
+        device_info, credential = await self._login(transport, self.get_order(ip), {**SYSTEM_OIDS, **CHANGE_OIDS})
+        self.used[ip] = credential
+        if not device_info:
+            return {}
+
+        columns = {**INTERFACE_COLUMNS, **IF_LAST_CHANGE_COLUMN}
+        state = self.states.get(ip)
+
+        if self.needs_full_walk(state, device_info):
+            device_info['interfaces'] = build_interfaces(await self._walk(transport, credential, columns))
+            device_info['if_last_change'] = {
+                interface['index']: interface['last_change']
+                for interface in device_info['interfaces'] if interface['last_change'] is not None
+            }
+            device_info['full'] = True
+            return device_info
+
+        # One column is cheap to walk; full rows are only fetched where it moved
+        last_changes = {
+            index: int(row['last_change'])
+            for index, row in (await self._walk(transport, credential, IF_LAST_CHANGE_COLUMN)).items()
+        }
+        changed = [index for index, value in last_changes.items() if state.interface_changes.get(index) != value]
+        device_info['interfaces'] = build_interfaces(
+            await self._get_rows(transport, credential, columns, changed) if changed else {}
+        )
+        device_info['if_last_change'] = last_changes
+        device_info['full'] = False
+        return device_info
+
+    def needs_full_walk(self, state, device_info):
+        if state is None or state.sys_uptime is None:
+            return True
+        # A restart (or sysUpTime wrapping) resets the ifLastChange baseline
+        if int(device_info.get('sysUpTime', 0)) < state.sys_uptime:
+            return True
+        if self.full_before and (state.last_full_poll is None or state.last_full_poll < self.full_before):
+            return True
+        # ifTableLastChange moves when interfaces are added or removed
+        table_change = device_info.get('ifTableLastChange')
+        return table_change is not None and int(table_change) != state.if_table_last_change
+
+
+class Rediscoverer:
+    """
+    Re-polls auto-discovered devices and writes back only the fields that changed.
+
+    Devices are handled in chunks: the chunk is probed concurrently, diffed
+    against the existing rows, and the changes are saved with bulk updates in one
+    transaction per chunk.
+    """
+
+    def __init__(self, full=False, chunk_size=256, shard=None, **kwargs):
+        """
+        With `full`, every device gets a full interface walk regardless of its indicators.
+        `shard` is an (index, count) pair limiting the run to every count-th device.
+        """
+        self.chunk_size = chunk_size
+        self.shard = shard
+        self.db_config = AutoDiscoveryConfig.get_cached_config()
+        self.now = timezone.now()
+        self.stats = Counter()
+
+        full_interval = get_plugin_setting('rediscovery_full_interval', 86400)
+        if full:
+            full_before = self.now
+        elif full_interval:
+            full_before = self.now - timedelta(seconds=full_interval)
+        else:
+            full_before = None
+        self.engine = get_engine_for_config(
+            self.db_config, engine_class=RediscoveryEngine, full_before=full_before, priority=PRIORITY_REDISCOVERY,
+            **kwargs
+        )
+
+    def get_devices(self):
+        devices = Device.objects.filter(
+            Q(primary_ip4__isnull=False) | Q(primary_ip6__isnull=False),
+            tags__name=TAG_NAME
+        )
+        if self.shard:
+            index, count = self.shard
+            devices = devices.annotate(shard=Mod('pk', count)).filter(shard=index)
+        return devices.select_related('primary_ip4', 'primary_ip6').order_by('pk')
+
+    def run(self, devices=None):
+        """
+        Rediscover the given devices (a queryset), or all auto-discovered devices.
+        Returns a Counter of outcomes.
+        """
+        if not self.db_config.enabled or not self.db_config.snmp_enabled:
+            raise ValueError("Auto-discovery or SNMP is disabled in configuration")
+
+        devices = self.get_devices() if devices is None else devices.order_by('pk')
+        last_pk = 0
+        while True:
+            chunk = list(devices.filter(pk__gt=last_pk)[:self.chunk_size])
+            if not chunk:
+                break
+            self.process_chunk(chunk)
+            last_pk = chunk[-1].pk
+
+        logger.info(
+            f"✅ Rediscovery complete: {self.stats['polled']} polled, {self.stats['unchanged']} unchanged, "
+            f"{self.stats['devices_updated']} devices and {self.stats['interfaces_updated']} interfaces updated, "
+            f"{self.stats['interfaces_created']} interfaces created, {self.stats['unreachable']} unreachable"
+        )
+        return self.stats
+
+    def process_chunk(self, devices):
+        targets = {str((device.primary_ip4 or device.primary_ip6).address.ip): device for device in devices}
+        states = {
+            state.device_id: state
+            for state in DeviceState.objects.filter(device_id__in=[device.pk for device in devices])
+        }
+        self.engine.states = {ip: states[device.pk] for ip, device in targets.items() if device.pk in states}
+
+        results = self.engine.run_cached(list(targets))
+        results.update(self.poll_ssh([ip for ip in targets if not results.get(ip)]))
+
+        # Interface rows are only loaded for devices that reported interface data
+        existing = defaultdict(dict)
+        with_interfaces = [device.pk for ip, device in targets.items() if results.get(ip, {}).get('interfaces')]
+        if with_interfaces:
+            for interface in Interface.objects.filter(device_id__in=with_interfaces):
+                existing[interface.device_id][interface.name] = interface
+
+        # pk -> {field name: discovered value}
+        device_changes, interface_changes = {}, {}
+        new_interfaces, new_states, updated_states = [], [], []
+        identities = []
+
+        for ip, device in targets.items():
+            device_info = results.get(ip)
+            if not device_info:
+                self.stats['unreachable'] += 1
+                continue
+            self.stats['polled'] += 1
+
+            discovery = DeviceDiscovery(device.primary_ip4 or device.primary_ip6, device_info=device_info)
+            identities.append((device, identity.get_identities(device_info)))
+            fields = self.diff_device(device, discovery)
+            if fields:
+                device_changes[device.pk] = fields
+
+            updated, created = self.diff_interfaces(device, discovery, existing[device.pk])
+            for interface, values in updated:
+                interface_changes[interface.pk] = values
+            new_interfaces.extend(created)
+
+            state = states.get(device.pk)
+            if state is None:
+                state = DeviceState(device=device)
+                new_states.append(state)
+            else:
+                updated_states.append(state)
+            state.sys_uptime = int(device_info['sysUpTime']) if 'sysUpTime' in device_info else None
+            state.if_table_last_change = (
+                int(device_info['ifTableLastChange']) if 'ifTableLastChange' in device_info else None
+            )
+            state.interface_changes = device_info['if_last_change']
+            state.last_polled = self.now
+            if device_info['full']:
+                state.last_full_poll = self.now
+                self.stats['full_walks'] += 1
+
+            if fields or updated or created:
+                state.last_changed = self.now
+            else:
+                self.stats['unchanged'] += 1
+
+        batch_size = get_plugin_setting('bulk_batch_size', 500)
+        with transaction.atomic():
+            # Created here, so that a chunk rolled back leaves no platforms behind
+            for values in device_changes.values():
+                if isinstance(values.get('platform'), str):
+                    values['platform'] = get_platform(values['platform'])
+            changed_devices, device_fields = self.apply_changes(Device, device_changes)
+            changed_interfaces, interface_fields = self.apply_changes(Interface, interface_changes)
+            if changed_devices:
+                Device.objects.bulk_update(changed_devices, list(device_fields), batch_size=batch_size)
+                send_bulk_update_signals(changed_devices, device_fields)
+            if changed_interfaces:
+                Interface.objects.bulk_update(changed_interfaces, list(interface_fields), batch_size=batch_size)
+                send_bulk_update_signals(changed_interfaces, interface_fields)
+            if new_interfaces:
+                send_bulk_create_signals(Interface.objects.bulk_create(new_interfaces, batch_size=batch_size))
+            if updated_states:
+                DeviceState.objects.bulk_update(
+                    updated_states,
+                    ['sys_uptime', 'if_table_last_change', 'interface_changes', 'last_polled', 'last_full_poll',
+                     'last_changed'],
+                    batch_size=batch_size
+                )
+            if new_states:
+                DeviceState.objects.bulk_create(new_states, batch_size=batch_size, ignore_conflicts=True)
+            identity.record_identities(identities)
+
+        self.stats['devices_updated'] += len(changed_devices)
+        self.stats['interfaces_updated'] += len(changed_interfaces)
+        self.stats['interfaces_created'] += len(new_interfaces)
+
+    def poll_ssh(self, ips):
+        """
+        Collect SSH facts for devices that did not answer SNMP.
+
+        SSH has no change indicators, so these always count as full polls.
+        """
+        if not ips or not get_plugin_setting('enable_ssh', False):
+            return {}
+        results = {}
+        for ip, device_info in ssh.collect_many(ips, ssh.get_credentials(self.db_config)).items():
+            if device_info:
+                results[ip] = {**device_info, 'if_last_change': {}, 'full': True}
+        return results
+
+    def diff_device(self, device, discovery):
+        """
+        Return the discovery-owned fields of the device that changed, with their new values.
+
+        Nothing is written here: a platform that does not exist yet is returned by name.
+        """
+        values = {}
+
+        platform = discovery.get_or_create_platform(create=False)
+        if platform and device.platform_id != platform.pk:
+            values['platform'] = platform
+        elif platform is None and discovery.classify().platform:
+            # A missing platform is kept by name and created when the changes are applied
+            values['platform'] = discovery.classify().platform
+
+        serial = identity.get_serial(discovery.device_info)[:50]
+        if serial and device.serial != serial:
+            values['serial'] = serial
+
+        # Comments are only refreshed while nobody has edited them
+        comments = discovery.get_comments()
+        if device.comments.startswith(COMMENTS_PREFIX) and device.comments != comments:
+            values['comments'] = comments
+
+        return values
+
+    def diff_interfaces(self, device, discovery, existing):
+        """
+        Compare discovered interfaces with the existing rows by name.
+
+        Returns a list of (interface, {field name: new value}) for updated rows and
+        a list of unsaved new interfaces. Interfaces that disappeared from the device
+        are left alone.
+        """
+        updated, created = [], []
+        create_interfaces = self.db_config.create_interfaces
+
+        for interface in discovery.device_info.get('interfaces', []):
+            values = discovery.interface_values(interface)
+            current = existing.get(interface['name'])
+
+            if current is None:
+                if create_interfaces:
+                    created.append(Interface(device=device, name=interface['name'], **values))
+                continue
+
+            changed = {name: value for name, value in values.items() if self.differs(current, name, value)}
+            if changed:
+                updated.append((current, changed))
+
+        return updated, created
+
+    def apply_changes(self, model, changes):
+        """
+        Apply discovered values to fresh copies of the changed rows.
+
+        Polling can take minutes, so the rows loaded before it may be outdated.
+        They are reloaded with a row lock held until the transaction ends, and only
+        the values discovery changed are set, where they still differ: edits made
+        to other fields in the meantime are kept. Returns the changed objects and
+        the names of the fields to update.
+        """
+        objects, fields = [], set()
+        if not changes:
+            return objects, fields
+
+        # Locked in primary key order, so concurrent workers cannot deadlock
+        for obj in model.objects.select_for_update().filter(pk__in=changes).order_by('pk'):
+            values = {
+                name: value for name, value in changes[obj.pk].items() if self.differs(obj, name, value)
+            }
+            # Comments stop being refreshed once someone edited them
+            if 'comments' in values and not obj.comments.startswith(COMMENTS_PREFIX):
+                del values['comments']
+            if values:
+                obj.snapshot()
+                for name, value in values.items():
+                    setattr(obj, name, value)
+                objects.append(obj)
+                fields.update(values)
+        return objects, fields
+
+    @staticmethod
+    def differs(obj, name, value):
+        if isinstance(value, models.Model):
+            return getattr(obj, f'{name}_id') != value.pk
+        current = getattr(obj, name)
+        if name == 'mac_address':
+            # Compare in the format produced by snmp.format_mac
+            current = str(current).upper() if current else None
+        return current != value
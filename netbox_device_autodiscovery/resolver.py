@@ -0,0 +1,114 @@
+from .cache import LookupCache
+from .utils import get_plugin_setting
+import asyncio
+import logging
+import socket
+
+try:
+    import dns.asyncresolver
+    import dns.exception
+    import dns.reversename
+    DNSPYTHON_AVAILABLE = True
+except ImportError:
+    DNSPYTHON_AVAILABLE = False
+
+logger = logging.getLogger('netbox.plugins.device_autodiscovery')
+
+# Cached value for addresses without a PTR record
+NO_NAME = ''
+
+
+class ReverseResolver:
+    """
+    Reverse (PTR) lookups with a deadline per query and an LRU cache.
+
+    With dnspython installed, answers are cached for their record TTL and queries
+    run natively in asyncio; otherwise the system resolver is used through the
+    event loop's executor and answers are cached for `default_ttl`. Failures and
+    missing records are cached for `negative_ttl`.
+    """
+
+    def __init__(self, timeout=2, cache_size=4096, default_ttl=3600, negative_ttl=300, concurrency=50):
+        self.timeout = timeout
+        self.default_ttl = default_ttl
+        self.negative_ttl = negative_ttl
+        self.concurrency = concurrency
+        self.cache = LookupCache(maxsize=cache_size, ttl=default_ttl)
+
+    def resolve(self, ip):
+        """
+        Return the hostname for an IP, or None. Safe to call from synchronous code.
+        """
+        return self.resolve_many([ip])[ip]
+
+    def resolve_many(self, ips):
+        """
+        Resolve many IPs concurrently; returns a dict of ip -> hostname (or None).
+        """
+        results = {ip: self.cache.get('ptr', ip) for ip in ips}
+        missing = [ip for ip, hostname in results.items() if hostname is None]
+        if missing:
+            results.update(asyncio.run(self.resolve_many_async(missing)))
+        return {ip: hostname or None for ip, hostname in results.items()}
+
+    async def resolve_many_async(self, ips):
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def bounded_resolve(ip):
+            async with semaphore:
+                return ip, await self.resolve_async(ip)
+
+        return dict(await asyncio.gather(*[bounded_resolve(ip) for ip in ips]))
+
+    async def resolve_async(self, ip):
+        """
+        Return the hostname for an IP, or None, within `timeout` seconds.
+        """
+        cached = self.cache.get('ptr', ip)
+        if cached is not None:
+            return cached or None
+
+        hostname, ttl = NO_NAME, self.negative_ttl
+        try:
+            if DNSPYTHON_AVAILABLE:
+                answer = await dns.asyncresolver.resolve(
+                    dns.reversename.from_address(ip), 'PTR', lifetime=self.timeout
+                )
+                hostname, ttl = str(answer[0]).rstrip('.'), answer.rrset.ttl
+            else:
+                loop = asyncio.get_running_loop()
+                hostname, _ = await asyncio.wait_for(
+                    loop.getnameinfo((ip, 0), socket.NI_NAMEREQD), self.timeout
+                )
+                ttl = self.default_ttl
+        except asyncio.TimeoutError:
+            logger.debug(f"Reverse lookup of {ip} timed out after {self.timeout}s")
+        except (OSError, ValueError) as e:
+            # socket.herror and socket.gaierror are OSErrors
+            logger.debug(f"Reverse lookup of {ip} failed: {str(e)}")
+        except Exception as e:
+            if not (DNSPYTHON_AVAILABLE and isinstance(e, dns.exception.DNSException)):
+                raise
+            logger.debug(f"Reverse lookup of {ip} failed: {str(e)}")
+
+        self.cache.set('ptr', ip, hostname, ttl=ttl)
+        return hostname or None
+
+
+_resolver = None
+
+
+def get_resolver():
+    """
+    Return the process-wide resolver configured from the plugin settings.
+    """
+    global _resolver
+    if _resolver is None:
+        _resolver = ReverseResolver(
+            timeout=get_plugin_setting('dns_timeout', 2),
+            cache_size=get_plugin_setting('dns_cache_size', 4096),
+            default_ttl=get_plugin_setting('dns_cache_ttl', 3600),
+            negative_ttl=get_plugin_setting('dns_negative_ttl', 300),
+            concurrency=get_plugin_setting('dns_concurrency', 50)
+        )
+    return _resolver
@@ -0,0 +1,68 @@
+from datetime import timedelta
+from django.utils import timezone
+from .models import DiscoveryResult
+from .utils import get_plugin_setting
+import logging
+
+logger = logging.getLogger('netbox.plugins.device_autodiscovery')
+
+# Keys of the interface dicts built by snmp.build_interfaces, in stored column order
+INTERFACE_KEYS = ('index', 'name', 'description', 'type', 'speed', 'mac_address', 'enabled', 'last_change')
+
+
+def pack_device_info(device_info):
+    """
+    Convert a device_info dict into the compact form stored in DiscoveryResult.data.
+
+    Empty values are dropped and the interface list is stored column-wise, so the
+    keys are not repeated for each of a chassis' hundreds of interfaces.
+    """
+    data = {
+        key: value for key, value in device_info.items()
+        if key != 'interfaces' and value not in (None, '')
+    }
+    interfaces = device_info.get('interfaces')
+    if interfaces:
+        data['interfaces'] = {
+            'columns': INTERFACE_KEYS,
+            'rows': [[interface.get(key) for key in INTERFACE_KEYS] for interface in interfaces],
+        }
+    return data
+
+
+def unpack_device_info(data):
+    """
+    Inverse of pack_device_info().
+    """
+    device_info = dict(data)
+    packed = device_info.pop('interfaces', None)
+    if packed:
+        device_info['interfaces'] = [dict(zip(packed['columns'], row)) for row in packed['rows']]
+    return device_info
+
+
+def prune_results(retention_days=None, batch_size=None):
+    """
+    Delete results older than `result_retention_days`, in batches so no single
+    statement holds locks on a large part of the table. Returns the number deleted.
+    """
+    if retention_days is None:
+        retention_days = get_plugin_setting('result_retention_days', 30)
+    if not retention_days:
+        return 0
+    batch_size = batch_size or get_plugin_setting('result_prune_batch_size', 1000)
+    cutoff = timezone.now() - timedelta(days=retention_days)
+    total = 0
+
+    while True:
+        ids = list(
+            DiscoveryResult.objects.filter(created__lt=cutoff).order_by('pk').values_list('pk', flat=True)[:batch_size]
+        )
+        if not ids:
+            break
+        DiscoveryResult.objects.filter(pk__in=ids).delete()
+        total += len(ids)
+
+    if total:
+        logger.info(f"🧹 Pruned {total} discovery results older than {retention_days} days")
+    return total
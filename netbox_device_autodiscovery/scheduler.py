@@ -0,0 +1,260 @@
+from contextlib import asynccontextmanager, contextmanager
+from django_rq import get_queue
+from .metrics import PHASE_DURATION
+from .utils import PLUGIN_NAME, get_plugin_setting
+import asyncio
+import ipaddress
+import logging
+import random
+import time
+import uuid
+
+logger = logging.getLogger('netbox.plugins.device_autodiscovery')
+
+PRIORITY_INTERACTIVE = 'interactive'
+PRIORITY_REDISCOVERY = 'rediscovery'
+PRIORITY_SWEEP = 'sweep'
+# Highest first
+PRIORITIES = [PRIORITY_INTERACTIVE, PRIORITY_REDISCOVERY, PRIORITY_SWEEP]
+
+# Redis sorted set of probe leases (token -> expiry) shared by all workers
+SLOTS_KEY = f'{PLUGIN_NAME}.scheduler.slots'
+# Prefix of the Redis hashes holding the schedule of each prefix
+BUCKET_KEY = f'{PLUGIN_NAME}.scheduler.bucket'
+
+# Seconds between attempts while all slots are taken
+POLL_INTERVAL = 0.05
+# Seconds added to the lease of a blocking probe for the work between its requests
+LEASE_MARGIN = 5
+
+# Take a slot if fewer than `limit` unexpired leases exist
+ACQUIRE_SCRIPT = """
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', ARGV[1])
+if redis.call('ZCARD', KEYS[1]) < tonumber(ARGV[3]) then
+    redis.call('ZADD', KEYS[1], ARGV[2], ARGV[4])
+    return 1
+end
+return 0
+"""
+
+# Reserve the next probe time of a prefix for a priority class, as a generic cell
+# rate algorithm: each class has a theoretical arrival time (`tat<class>`) advancing
+# by 1/rate per probe, and may run up to `burst` probes ahead of it. Every caller
+# gets its own time, so waiters are served first come, first served without
+# polling. A probe also pushes back the next reservations of the lower classes,
+# which so get the rate the higher ones leave, while never holding up a higher class.
+# Returns the seconds to wait before probing.
+BUCKET_SCRIPT = """
+local now, rate, burst = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+local class, classes = tonumber(ARGV[4]), tonumber(ARGV[5])
+local interval = 1 / rate
+local tat = math.max(tonumber(redis.call('HGET', KEYS[1], 'tat' .. class) or now), now)
+local wait = math.max(0, tat - (burst - 1) * interval - now)
+local last = tat + interval
+redis.call('HSET', KEYS[1], 'tat' .. class, last)
+for lower = class + 1, classes - 1 do
+    local lower_tat = math.max(tonumber(redis.call('HGET', KEYS[1], 'tat' .. lower) or now), now) + interval
+    redis.call('HSET', KEYS[1], 'tat' .. lower, lower_tat)
+    last = math.max(last, lower_tat)
+end
+redis.call('EXPIRE', KEYS[1], math.ceil(last - now) + 1)
+return tostring(wait)
+"""
+
+
+class DiscoveryScheduler:
+    """
+    Decides when a target may be probed, across all discovery workers.
+
+    Three limits apply, all kept in Redis:
+
+    - A rate per prefix (`scheduler_rate` probes per second with bursts of
+      `scheduler_burst`), so a sweep cannot flood a remote site. The rates apply
+      per `scheduler_prefix_length` subnet, or per network listed in
+      `scheduler_rate_limits` with its own rate. Each probe reserves its own time
+      slot, so waiting probes of a prefix go in arrival order, and each priority
+      class has its own queue: probes of lower classes make way for higher ones
+      rather than the other way round.
+    - A global cap of `scheduler_max_concurrency` probes in flight.
+    - Priority classes: rediscovery and sweeps only take a slot while more than
+      `scheduler_reserved[class]` slots are free, which leaves headroom for
+      interactive discovery of new IPs.
+
+    If Redis is unavailable, probes are let through rather than blocked. The
+    asyncio engine makes its Redis calls in the default executor, so they never
+    block the event loop.
+    """
+
+    def __init__(self, priority=PRIORITY_INTERACTIVE):
+        self.priority = priority
+        self.rank = PRIORITIES.index(priority) if priority in PRIORITIES else len(PRIORITIES) - 1
+        self.enabled = get_plugin_setting('scheduler_enabled', True)
+        self.rate = get_plugin_setting('scheduler_rate', 50)
+        self.burst = get_plugin_setting('scheduler_burst', 50)
+        reserved = get_plugin_setting('scheduler_reserved', {PRIORITY_REDISCOVERY: 20, PRIORITY_SWEEP: 50})
+        self.limit = get_plugin_setting('scheduler_max_concurrency', 200) - reserved.get(priority, 0)
+        # Leases of crashed workers expire on their own; probes of the asyncio engine end by bulk_deadline
+        self.lease = get_plugin_setting('bulk_deadline', 30) * 2
+        self.rate_limits = sorted(
+            (
+                (ipaddress.ip_network(network), rate)
+                for network, rate in get_plugin_setting('scheduler_rate_limits', {}).items()
+            ),
+            key=lambda item: item[0].prefixlen,
+            reverse=True
+        )
+        self._redis = None
+        self._scripts = None
+
+    def get_scripts(self):
+        if self._scripts is None:
+            self._redis = get_queue(f'{PLUGIN_NAME}.discovery').connection
+            self._scripts = (
+                self._redis.register_script(ACQUIRE_SCRIPT),
+                self._redis.register_script(BUCKET_SCRIPT),
+            )
+        return self._scripts
+
+    def get_bucket(self, ip):
+        """
+        Return (bucket name, rate) for an address.
+        """
+        address = ipaddress.ip_address(ip)
+        for network, rate in self.rate_limits:
+            if network.version == address.version and address in network:
+                return str(network), rate
+        if address.version == 4:
+            length = get_plugin_setting('scheduler_prefix_length', 24)
+        else:
+            length = get_plugin_setting('scheduler_prefix_length_v6', 64)
+        return str(ipaddress.ip_network(f'{address}/{length}', strict=False)), self.rate
+
+    def interleave(self, ips):
+        """
+        Order targets round-robin across their buckets, so a large prefix cannot
+        hold up the small ones queued behind it.
+        """
+        buckets = {}
+        for ip in ips:
+            buckets.setdefault(self.get_bucket(ip)[0], []).append(ip)
+        queues = list(buckets.values())
+        ordered = []
+        for position in range(max((len(queue) for queue in queues), default=0)):
+            ordered.extend(queue[position] for queue in queues if position < len(queue))
+        return ordered
+
+    def take_token(self, ip):
+        """
+        Reserve a time to probe the target; return the seconds to wait for it.
+        """
+        bucket, rate = self.get_bucket(ip)
+        _, bucket_script = self.get_scripts()
+        return float(bucket_script(
+            keys=[f'{BUCKET_KEY}.{bucket}'],
+            args=[time.time(), rate, self.burst, self.rank, len(PRIORITIES)]
+        ))
+
+    def try_acquire(self, token, lease=None):
+        acquire_script, _ = self.get_scripts()
+        now = time.time()
+        return bool(acquire_script(keys=[SLOTS_KEY], args=[now, now + (lease or self.lease), self.limit, token]))
+
+    def renew(self, token, lease):
+        """
+        Move the expiry of a held slot to `lease` seconds from now.
+        """
+        try:
+            self._redis.zadd(SLOTS_KEY, {token: time.time() + lease}, xx=True)
+        except Exception as e:
+            logger.debug(f"Could not renew scheduler slot: {str(e)}")
+
+    def release(self, token):
+        try:
+            self._redis.zrem(SLOTS_KEY, token)
+        except Exception as e:
+            logger.debug(f"Could not release scheduler slot: {str(e)}")
+
+    @asynccontextmanager
+    async def slot(self, ip, semaphore):
+        """
+        Wait until `ip` may be probed, and hold a global slot while it is.
+
+        The local `semaphore` is taken between waiting for the reserved time and
+        taking the global slot, so neither is held while waiting for the other.
+        """
+        if not self.enabled:
+            async with semaphore:
+                yield
+            return
+
+        loop = asyncio.get_running_loop()
+        started = time.monotonic()
+        try:
+            wait = await loop.run_in_executor(None, self.take_token, ip)
+        except Exception as e:
+            wait = self.unavailable(ip, e)
+        if wait:
+            await asyncio.sleep(wait)
+
+        async with semaphore:
+            token = uuid.uuid4().hex
+            try:
+                while not await loop.run_in_executor(None, self.try_acquire, token):
+                    # Jitter keeps waiting workers from polling in lockstep
+                    await asyncio.sleep(POLL_INTERVAL * (1 + random.random()))
+            except Exception as e:
+                token = self.unavailable(ip, e)
+            PHASE_DURATION.labels('schedule_wait').observe(time.monotonic() - started)
+            try:
+                yield
+            finally:
+                if token:
+                    await loop.run_in_executor(None, self.release, token)
+
+    @contextmanager
+    def slot_sync(self, ip, lease):
+        """
+        Blocking variant of slot(), for discoveries outside the asyncio engine.
+
+        These probes have no overall deadline, so the slot is leased for `lease`
+        seconds, the longest a single request may take. Yields a function that
+        renews the lease; call it before each request.
+        """
+        token = None
+        lease += LEASE_MARGIN
+        if self.enabled:
+            started = time.monotonic()
+            try:
+                wait = self.take_token(ip)
+                if wait:
+                    time.sleep(wait)
+                token = uuid.uuid4().hex
+                while not self.try_acquire(token, lease):
+                    time.sleep(POLL_INTERVAL * (1 + random.random()))
+            except Exception as e:
+                token = self.unavailable(ip, e)
+            PHASE_DURATION.labels('schedule_wait').observe(time.monotonic() - started)
+        try:
+            yield (lambda: self.renew(token, lease)) if token else (lambda: None)
+        finally:
+            if token:
+                self.release(token)
+
+    def unavailable(self, ip, error):
+        """
+        Let the probe through when Redis fails, rather than stopping discovery.
+        """
+        logger.warning(f"Discovery scheduler unavailable, not limiting {ip}: {str(error)}")
+        return None
+
+
+_schedulers = {}
+
+
+def get_scheduler(priority=PRIORITY_INTERACTIVE):
+    """
+    Return the scheduler of a priority class shared by this process.
+    """
+    if priority not in _schedulers:
+        _schedulers[priority] = DiscoveryScheduler(priority)
+    return _schedulers[priority]
@@ -1,9 +1,15 @@
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 from ipam.models import IPAddress
-from dcim.models import Device, DeviceType, DeviceRole, Site, Manufacturer, Interface
+from dcim.models import Device, DeviceType, DeviceRole, Site, Manufacturer, Interface, Platform, Location
 from extras.models import Tag
+from tenancy.models import Tenant
+from .cache import lookup_cache
 from .discovery import DeviceDiscovery
+from .jobs import defer_discovery
+from .models import AutoDiscoveryConfig, SNMPCredential, SSHCredential
+from .utils import get_plugin_setting, is_discovery_suppressed
 import logging
 
 logger = logging.getLogger('netbox.plugins.device_autodiscovery')
@@ -13,7 +19,14 @@ logger = logging.getLogger('netbox.plugins.device_autodiscovery')
 def auto_discover_device(sender, instance, created, **kwargs):
     """
     Signal handler that triggers device discovery when a new IP address is created.
+
+    In 'queued' mode (the default) discovery runs as a background job once the
+    transaction creating the IP has committed, coalesced with other new IPs into
+    batches; in 'sync' mode it runs inline.
     """
+    if is_discovery_suppressed():
+        return
+    
     if not created:
         logger.debug(f"IP address {instance.address} was updated, not created. Skipping discovery.")
         return
@@ -24,6 +37,11 @@ def auto_discover_device(sender, instance, created, **kwargs):
         return
     
     logger.info(f"🔍 NEW IP ADDRESS DETECTED: {instance.address}")
+
+    if get_plugin_setting('discovery_mode', 'queued') == 'queued':
+        defer_discovery(instance)
+        return
+    
     logger.info(f"🚀 Starting automatic device discovery for {instance.address}...")
     
     try:
@@ -44,3 +62,38 @@ def auto_discover_device(sender, instance, created, **kwargs):
         logger.error(f"❌ ERROR during device discovery for IP {instance.address}: {str(e)}")
         import traceback
         logger.error(traceback.format_exc())
+
+
+@receiver(post_save, sender=Manufacturer)
+@receiver(post_save, sender=DeviceType)
+@receiver(post_save, sender=DeviceRole)
+@receiver(post_save, sender=Site)
+@receiver(post_save, sender=Platform)
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Manufacturer)
+@receiver(post_delete, sender=DeviceType)
+@receiver(post_delete, sender=DeviceRole)
+@receiver(post_delete, sender=Site)
+@receiver(post_delete, sender=Platform)
+@receiver(post_delete, sender=Tag)
+def invalidate_lookup_cache(sender, **kwargs):
+    """
+    Drop cached lookups of a model whenever one of its objects changes.
+    """
+    lookup_cache.invalidate(sender)
+
+
+@receiver(post_save, sender=AutoDiscoveryConfig)
+@receiver(post_save, sender=SNMPCredential)
+@receiver(post_delete, sender=SNMPCredential)
+@receiver(post_save, sender=SSHCredential)
+@receiver(post_delete, sender=SSHCredential)
+@receiver(post_delete, sender=Site)
+@receiver(post_delete, sender=DeviceRole)
+@receiver(post_delete, sender=Tenant)
+@receiver(post_delete, sender=Location)
+def invalidate_config_cache(sender, **kwargs):
+    """
+    Reload the cached configuration once a change to it (or to a default it points to) is committed.
+    """
+    transaction.on_commit(AutoDiscoveryConfig.invalidate_cache)
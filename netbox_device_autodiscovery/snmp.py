@@ -0,0 +1,524 @@
+from collections import OrderedDict
+from pysnmp.hlapi import (
+    CommunityData, ContextData, ObjectIdentity, ObjectType, SnmpEngine, Udp6TransportTarget, UdpTransportTarget,
+    UsmUserData, bulkCmd, getCmd, nextCmd, usm3DESEDEPrivProtocol, usmAesCfb128Protocol, usmAesCfb192Protocol,
+    usmAesCfb256Protocol, usmDESPrivProtocol, usmHMAC128SHA224AuthProtocol, usmHMAC192SHA256AuthProtocol,
+    usmHMAC256SHA384AuthProtocol, usmHMAC384SHA512AuthProtocol, usmHMACMD5AuthProtocol, usmHMACSHAAuthProtocol,
+    usmNoAuthProtocol, usmNoPrivProtocol,
+)
+from pysnmp.proto.rfc1905 import EndOfMibView, NoSuchInstance, NoSuchObject
+from .metrics import SNMP_PDUS
+from .utils import get_plugin_setting
+import ipaddress
+import logging
+import threading
+
+logger = logging.getLogger('netbox.plugins.device_autodiscovery')
+
+# Identifiers of the device rather than of the queried address (see identity.py). The
+# chassis serial number is read from the first ENTITY-MIB entry, if that is the chassis.
+IDENTITY_OIDS = {
+    'snmpEngineID': '1.3.6.1.6.3.10.2.1.1.0',
+    'baseMac': '1.3.6.1.2.1.17.1.1.0',  # dot1dBaseBridgeAddress
+    'entPhysicalClass': '1.3.6.1.2.1.47.1.1.1.1.5.1',
+    'entPhysicalSerialNum': '1.3.6.1.2.1.47.1.1.1.1.11.1',
+}
+
+# System group OIDs fetched for every device, in the same GET as the identifiers
+SYSTEM_OIDS = {
+    'sysName': '1.3.6.1.2.1.1.5.0',
+    'sysDescr': '1.3.6.1.2.1.1.1.0',
+    'sysObjectID': '1.3.6.1.2.1.1.2.0',
+    'sysContact': '1.3.6.1.2.1.1.4.0',
+    'sysLocation': '1.3.6.1.2.1.1.6.0',
+    **IDENTITY_OIDS,
+}
+
+# Keys of binary values, which are stored as hex strings
+HEX_KEYS = {'snmpEngineID', 'baseMac'}
+
+# ifIndex of an address: ipAdEntIfIndex (IPv4 only) and ipAddressIfIndex of IP-MIB
+IP_ADDR_IF_INDEX = '1.3.6.1.2.1.4.20.1.2'
+IP_ADDRESS_IF_INDEX = '1.3.6.1.2.1.4.34.1.3'
+
+# ifTable/ifXTable columns walked for every device
+INTERFACE_COLUMNS = {
+    'name': '1.3.6.1.2.1.31.1.1.1.1',
+    'descr': '1.3.6.1.2.1.2.2.1.2',
+    'type': '1.3.6.1.2.1.2.2.1.3',
+    'speed': '1.3.6.1.2.1.31.1.1.1.15',
+    'mac_address': '1.3.6.1.2.1.2.2.1.6',
+    'admin_status': '1.3.6.1.2.1.2.2.1.7',
+    'alias': '1.3.6.1.2.1.31.1.1.1.18',
+}
+
+# Scalars that tell whether anything changed since the last poll. ifTableLastChange and
+# ifLastChange are sysUpTime values, so they are only comparable between restarts.
+CHANGE_OIDS = {
+    'sysUpTime': '1.3.6.1.2.1.1.3.0',
+    'ifTableLastChange': '1.3.6.1.2.1.31.1.5.0',
+}
+
+# ifLastChange column: sysUpTime of the interface's last operational status change
+IF_LAST_CHANGE_COLUMN = {
+    'last_change': '1.3.6.1.2.1.2.2.1.9',
+}
+
+# Neighbour tables walked by topology crawls, side by side in one walk. Their row indexes
+# have different numbers of parts, so rows of different tables never collide.
+NEIGHBOUR_COLUMNS = {
+    # LLDP-MIB lldpRemTable, indexed by timeMark.localPortNum.remIndex
+    'lldp_port_id_subtype': '1.0.8802.1.1.2.1.4.1.1.6',
+    'lldp_port_id': '1.0.8802.1.1.2.1.4.1.1.7',
+    'lldp_port_desc': '1.0.8802.1.1.2.1.4.1.1.8',
+    'lldp_sys_name': '1.0.8802.1.1.2.1.4.1.1.9',
+    # lldpRemManAddrTable: the management address is part of the index
+    'lldp_man_addr_if_subtype': '1.0.8802.1.1.2.1.4.2.1.3',
+    # lldpLocPortTable, indexed by lldpLocPortNum
+    'lldp_local_port_id': '1.0.8802.1.1.2.1.3.7.1.3',
+    'lldp_local_port_desc': '1.0.8802.1.1.2.1.3.7.1.4',
+    # CISCO-CDP-MIB cdpCacheTable, indexed by ifIndex.deviceIndex
+    'cdp_address_type': '1.3.6.1.4.1.9.9.23.1.2.1.1.3',
+    'cdp_address': '1.3.6.1.4.1.9.9.23.1.2.1.1.4',
+    'cdp_device_id': '1.3.6.1.4.1.9.9.23.1.2.1.1.6',
+    'cdp_device_port': '1.3.6.1.4.1.9.9.23.1.2.1.1.7',
+}
+
+# Address tables walked by address harvesting, side by side in one walk. As with the
+# neighbour tables, the row indexes of different tables have different lengths.
+ADDRESS_COLUMNS = {
+    # ifName and ifDescr, indexed by ifIndex
+    'name': INTERFACE_COLUMNS['name'],
+    'descr': INTERFACE_COLUMNS['descr'],
+    # IP-MIB ipAddressTable, indexed by addressType.length.address
+    'address_if_index': '1.3.6.1.2.1.4.34.1.3',
+    'address_type': '1.3.6.1.2.1.4.34.1.4',
+    'address_prefix': '1.3.6.1.2.1.4.34.1.5',
+    # ipAddrTable (IPv4 only, the only one many devices implement), indexed by address
+    'ad_ent_if_index': '1.3.6.1.2.1.4.20.1.2',
+    'ad_ent_net_mask': '1.3.6.1.2.1.4.20.1.3',
+    # ipNetToPhysicalTable, indexed by ifIndex.addressType.length.address
+    'net_to_physical_type': '1.3.6.1.2.1.4.35.1.6',
+    # ipNetToMediaTable (IPv4 only), indexed by ifIndex.address
+    'net_to_media_type': '1.3.6.1.2.1.4.22.1.4',
+}
+
+# ipAddressType unicast(1); ipNetToPhysicalType/ipNetToMediaType dynamic(3) and static(4)
+ADDRESS_TYPE_UNICAST = 1
+NEIGHBOUR_ENTRY_TYPES = {3, 4}
+
+# lldpRemPortIdSubtype values whose port ID is a name: interfaceAlias(1), interfaceName(5), local(7)
+LLDP_NAMED_PORT_SUBTYPES = {1, 5, 7}
+
+# SNMPCredential.auth_protocol / priv_protocol -> pysnmp protocol
+AUTH_PROTOCOLS = {
+    'md5': usmHMACMD5AuthProtocol,
+    'sha': usmHMACSHAAuthProtocol,
+    'sha224': usmHMAC128SHA224AuthProtocol,
+    'sha256': usmHMAC192SHA256AuthProtocol,
+    'sha384': usmHMAC256SHA384AuthProtocol,
+    'sha512': usmHMAC384SHA512AuthProtocol,
+}
+PRIV_PROTOCOLS = {
+    'des': usmDESPrivProtocol,
+    '3des': usm3DESEDEPrivProtocol,
+    'aes': usmAesCfb128Protocol,
+    'aes192': usmAesCfb192Protocol,
+    'aes256': usmAesCfb256Protocol,
+}
+
+# Number of transport targets kept per thread
+TRANSPORT_CACHE_SIZE = 1024
+
+# The engine keeps an entry for every target it talked to; recycle it after this many
+ENGINE_TARGET_LIMIT = 4096
+
+# SNMPv1 error-status for a missing OID
+NO_SUCH_NAME = 2
+
+_local = threading.local()
+
+
+class SNMPError(Exception):
+    """
+    Raised when an SNMP request fails at the transport or protocol level.
+    """
+    pass
+
+
+def get_engine():
+    """
+    Return the SnmpEngine shared by all discoveries in this thread.
+    """
+    engine = getattr(_local, 'engine', None)
+    if engine is None or _local.engine_targets >= ENGINE_TARGET_LIMIT:
+        engine = _local.engine = SnmpEngine()
+        _local.engine_targets = 0
+        _local.transports = OrderedDict()
+    return engine
+
+
+def get_transport(ip, timeout, retries=1, port=None):
+    """
+    Return a cached UDP (or UDP over IPv6) transport target, so address resolution happens once per target.
+    """
+    get_engine()
+    port = port or get_plugin_setting('snmp_port', 161)
+    key = (ip, port, timeout, retries)
+    transports = _local.transports
+
+    transport = transports.get(key)
+    if transport is not None:
+        transports.move_to_end(key)
+        return transport
+
+    transport_class = Udp6TransportTarget if ipaddress.ip_address(ip).version == 6 else UdpTransportTarget
+    transport = transport_class((ip, port), timeout=timeout, retries=retries)
+    transports[key] = transport
+    _local.engine_targets += 1
+    if len(transports) > TRANSPORT_CACHE_SIZE:
+        transports.popitem(last=False)
+    return transport
+
+
+def get_auth_data(credential):
+    """
+    Return the pysnmp authentication data for an SNMPCredential, or for a plain
+    community string (v2c).
+    """
+    if isinstance(credential, str):
+        return CommunityData(credential)
+    if credential.version == 3:
+        return UsmUserData(
+            credential.username,
+            authKey=credential.auth_key or None,
+            privKey=credential.priv_key or None,
+            authProtocol=AUTH_PROTOCOLS.get(credential.auth_protocol, usmNoAuthProtocol),
+            privProtocol=PRIV_PROTOCOLS.get(credential.priv_protocol, usmNoPrivProtocol)
+        )
+    # mpModel 0 is SNMPv1, 1 is SNMPv2c
+    return CommunityData(credential.community, mpModel=0 if credential.version == 1 else 1)
+
+
+def is_v1(credential):
+    """
+    SNMPv1 has no GETBULK; walks fall back to GETNEXT.
+    """
+    return getattr(credential, 'version', 2) == 1
+
+
+def is_empty_value(value):
+    """
+    True for the v2c exception values returned in place of a missing OID.
+    """
+    return isinstance(value, (NoSuchObject, NoSuchInstance, EndOfMibView))
+
+
+def address_oids(ip):
+    """
+    Return the OID of the ifIndex holding `ip`, to be fetched with the system group.
+    """
+    address = ipaddress.ip_address(ip)
+    if address.version == 4:
+        return {'ipIfIndex': f'{IP_ADDR_IF_INDEX}.{address}'}
+    # ipAddressTable is indexed by address type (ipv6(2)), length and octets
+    return {'ipIfIndex': f"{IP_ADDRESS_IF_INDEX}.2.16.{'.'.join(str(octet) for octet in address.packed)}"}
+
+
+def format_value(key, value):
+    """
+    Convert a fetched scalar to a string.
+    """
+    if key in HEX_KEYS:
+        return bytes(value.asOctets() if hasattr(value, 'asOctets') else value).hex()
+    return str(value)
+
+
+def snmp_get(ip, credential, oids, timeout, retries=1):
+    """
+    Fetch several scalar OIDs in a single GET PDU.
+
+    `credential` is an SNMPCredential or a community string. `oids` maps result
+    keys to OIDs; returns a dict with the keys that had a value.
+    """
+    oids = dict(oids)
+    result = {}
+
+    while oids:
+        SNMP_PDUS.labels('get').inc()
+        errorIndication, errorStatus, errorIndex, varBinds = next(getCmd(
+            get_engine(),
+            get_auth_data(credential),
+            get_transport(ip, timeout, retries),
+            ContextData(),
+            *[ObjectType(ObjectIdentity(oid)) for oid in oids.values()],
+            lookupMib=False
+        ))
+
+        if errorIndication:
+            raise SNMPError(str(errorIndication))
+
+        if errorStatus:
+            # SNMPv1 rejects the whole PDU if one OID is missing; drop it and ask again
+            if int(errorStatus) == NO_SUCH_NAME and errorIndex:
+                key = list(oids)[int(errorIndex) - 1]
+                logger.debug(f"{ip} has no value for {key}, retrying without it")
+                del oids[key]
+                continue
+            raise SNMPError(errorStatus.prettyPrint())
+
+        for key, varBind in zip(oids, varBinds):
+            if not is_empty_value(varBind[1]):
+                result[key] = format_value(key, varBind[1])
+        break
+
+    return result
+
+
+def snmp_bulk_walk(ip, credential, columns, timeout, max_repetitions=25, retries=1, on_request=None):
+    """
+    Walk several table columns side by side with GETBULK.
+
+    Every PDU returns up to `max_repetitions` rows of all columns (SNMPv1 agents
+    get one GETNEXT per row). Like AsyncDiscoveryEngine._walk, each request is
+    issued on its own (`maxCalls=1`) from the last OID of every column, and
+    columns that run out are dropped. `on_request` is called before each request.
+    Returns a dict of row index -> {column key: value}.
+    """
+    table = {}
+    # column key -> OID to continue the walk from
+    cursors = dict(columns)
+    auth_data = get_auth_data(credential)
+    transport = get_transport(ip, timeout, retries)
+    operation = 'getnext' if is_v1(credential) else 'getbulk'
+
+    while cursors:
+        objects = [ObjectType(ObjectIdentity(oid)) for oid in cursors.values()]
+        if on_request:
+            on_request()
+        SNMP_PDUS.labels(operation).inc()
+        if operation == 'getnext':
+            responses = nextCmd(
+                get_engine(), auth_data, transport, ContextData(), *objects, maxCalls=1, lookupMib=False
+            )
+        else:
+            responses = bulkCmd(
+                get_engine(), auth_data, transport, ContextData(), 0, max_repetitions, *objects,
+                maxCalls=1, lookupMib=False
+            )
+
+        keys = list(cursors)
+        rows = 0
+        # The sync generator yields one row at a time, all from the single response
+        for errorIndication, errorStatus, errorIndex, varBinds in responses:
+            if errorIndication:
+                raise SNMPError(str(errorIndication))
+            if errorStatus:
+                raise SNMPError(errorStatus.prettyPrint())
+            rows += 1
+            for key, (name, value) in zip(keys, varBinds):
+                if key not in cursors:
+                    continue
+                name = str(name)
+                if add_column_value(table, {key: columns[key]}, name, value):
+                    cursors[key] = name
+                else:
+                    del cursors[key]
+        if not rows:
+            break
+
+    return table
+
+
+def add_column_value(table, columns, name, value):
+    """
+    File a walked value under its row index and column key.
+
+    Returns False if the OID lies outside all walked columns.
+    """
+    if is_empty_value(value):
+        return False
+    for key, oid in columns.items():
+        if name.startswith(f'{oid}.'):
+            table.setdefault(name[len(oid) + 1:], {})[key] = value
+            return True
+    return False
+
+
+def format_mac(value):
+    octets = value.asOctets() if hasattr(value, 'asOctets') else bytes(value)
+    if len(octets) != 6 or not any(octets):
+        return None
+    return ':'.join(f'{octet:02X}' for octet in octets)
+
+
+def build_interfaces(table):
+    """
+    Turn an ifTable/ifXTable walk into a list of interface dicts ordered by ifIndex.
+    """
+    interfaces = []
+
+    for index in sorted(table, key=lambda index: tuple(int(part) for part in index.split('.'))):
+        row = table[index]
+        name = str(row.get('name') or row.get('descr') or '').strip()
+        if not name:
+            continue
+
+        interfaces.append({
+            'index': index,
+            'name': name[:64],
+            'description': str(row.get('alias', '')).strip()[:200],
+            'type': int(row['type']) if 'type' in row else None,
+            'speed': int(row['speed']) if 'speed' in row else None,
+            'mac_address': format_mac(row['mac_address']) if 'mac_address' in row else None,
+            # ifAdminStatus: up(1), down(2), testing(3)
+            'enabled': int(row.get('admin_status', 1)) == 1,
+            'last_change': int(row['last_change']) if 'last_change' in row else None,
+        })
+
+    return interfaces
+
+
+def format_text(value):
+    """
+    Decode a DisplayString; None for empty or binary values such as MAC-based IDs.
+    """
+    if value is None:
+        return None
+    try:
+        text = bytes(value.asOctets() if hasattr(value, 'asOctets') else value).decode('utf-8')
+    except (TypeError, UnicodeDecodeError):
+        return None
+    text = text.strip('\x00').strip()
+    return text if text and text.isprintable() else None
+
+
+def build_neighbours(table, interfaces):
+    """
+    Turn a walk of NEIGHBOUR_COLUMNS into a list of neighbour dicts.
+
+    Each neighbour has the protocol, the name of the local interface (if it
+    could be matched to `interfaces`), the remote system name, candidate names
+    of the remote port and the remote management addresses.
+    """
+    names_by_index = {interface['index']: interface['name'] for interface in interfaces}
+    interface_names = set(names_by_index.values())
+    addresses = {}
+    neighbours = []
+
+    for index, row in table.items():
+        if 'lldp_man_addr_if_subtype' not in row:
+            continue
+        # timeMark.localPortNum.remIndex.addressSubtype.length.octets...
+        parts = [int(part) for part in index.split('.')]
+        subtype, length, octets = parts[3], parts[4], bytes(parts[5:])
+        if (subtype, length) in ((1, 4), (2, 16)) and len(octets) == length:
+            addresses.setdefault('.'.join(index.split('.')[:3]), []).append(str(ipaddress.ip_address(octets)))
+
+    for index, row in sorted(table.items()):
+        if 'lldp_sys_name' in row or 'lldp_port_id' in row:
+            port_num = index.split('.')[1]
+            local = table.get(port_num, {})
+            candidates = [
+                format_text(local.get('lldp_local_port_id')),
+                format_text(local.get('lldp_local_port_desc')),
+                names_by_index.get(port_num),
+            ]
+            ports = [format_text(row.get('lldp_port_desc'))]
+            if int(row.get('lldp_port_id_subtype', 0)) in LLDP_NAMED_PORT_SUBTYPES:
+                ports.insert(0, format_text(row.get('lldp_port_id')))
+            neighbours.append({
+                'protocol': 'lldp',
+                'interface': next((name for name in candidates if name in interface_names), None),
+                'name': format_text(row.get('lldp_sys_name')),
+                'ports': [port for port in ports if port],
+                'addresses': addresses.get(index, []),
+            })
+
+        elif 'cdp_device_id' in row:
+            octets = bytes(row['cdp_address'].asOctets()) if 'cdp_address' in row else b''
+            # cdpCacheAddressType ip(1)
+            address = (
+                str(ipaddress.ip_address(octets))
+                if int(row.get('cdp_address_type', 0)) == 1 and len(octets) == 4 else None
+            )
+            port = format_text(row.get('cdp_device_port'))
+            neighbours.append({
+                'protocol': 'cdp',
+                'interface': names_by_index.get(index.split('.')[0]),
+                'name': format_text(row['cdp_device_id']),
+                'ports': [port] if port else [],
+                'addresses': [address] if address else [],
+            })
+
+    return neighbours
+
+
+def parse_address(parts):
+    """
+    Return the address encoded as addressType.length.octets in an index, or None.
+    """
+    if len(parts) < 2:
+        return None
+    address_type, length, octets = parts[0], parts[1], bytes(parts[2:])
+    if (address_type, length) not in ((1, 4), (2, 16)) or len(octets) != length:
+        return None
+    return ipaddress.ip_address(octets)
+
+
+def build_addresses(table):
+    """
+    Turn a walk of ADDRESS_COLUMNS into the addresses a device owns and those of
+    its neighbours.
+
+    Returns a dict with `interfaces` (ifIndex -> name), `addresses` (list of
+    (address with prefix length, ifIndex)) and `neighbours` (list of addresses
+    from the ARP and neighbour caches).
+    """
+    interfaces, addresses, neighbours = {}, {}, set()
+
+    for index, row in table.items():
+        parts = [int(part) for part in index.split('.')]
+
+        if 'name' in row or 'descr' in row:
+            name = str(row.get('name') or row.get('descr') or '').strip()
+            if name:
+                interfaces[index] = name[:64]
+
+        elif 'address_if_index' in row:
+            address = parse_address(parts)
+            if address is None or int(row.get('address_type', ADDRESS_TYPE_UNICAST)) != ADDRESS_TYPE_UNICAST:
+                continue
+            # ipAddressPrefix points to a row of ipAddressPrefixTable, whose last index arc is the
+            # prefix length; it is zeroDotZero if the prefix is unknown
+            prefix = str(row.get('address_prefix', '')).split('.')[-1]
+            length = int(prefix) if prefix.isdigit() and 0 < int(prefix) <= address.max_prefixlen else None
+            addresses[address] = (f'{address}/{length or address.max_prefixlen}', str(row['address_if_index']))
+
+        elif 'ad_ent_if_index' in row:
+            address = ipaddress.ip_address('.'.join(str(part) for part in parts))
+            if address in addresses:
+                continue
+            length = 32
+            try:
+                mask = ipaddress.ip_address(bytes(row['ad_ent_net_mask'].asOctets()))
+                length = ipaddress.ip_network(f'0.0.0.0/{mask}').prefixlen
+            except (KeyError, ValueError):
+                # No or a non-contiguous netmask
+                pass
+            addresses[address] = (f'{address}/{length}', str(row['ad_ent_if_index']))
+
+        elif 'net_to_physical_type' in row:
+            address = parse_address(parts[1:])
+            if address is not None and int(row['net_to_physical_type']) in NEIGHBOUR_ENTRY_TYPES:
+                neighbours.add(address)
+
+        elif 'net_to_media_type' in row:
+            if len(parts) == 5 and int(row['net_to_media_type']) in NEIGHBOUR_ENTRY_TYPES:
+                neighbours.add(ipaddress.ip_address('.'.join(str(part) for part in parts[1:])))
+
+    return {
+        'interfaces': interfaces,
+        'addresses': list(addresses.values()),
+        'neighbours': [str(address) for address in sorted(neighbours, key=lambda address: (address.version, address))],
+    }
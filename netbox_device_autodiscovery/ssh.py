@@ -0,0 +1,401 @@
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from netmiko import ConnectHandler, NetmikoAuthenticationException, NetmikoTimeoutException
+from netmiko.base_connection import BaseConnection
+from netmiko.ssh_autodetect import SSHDetect
+from netmiko.utilities import get_structured_data
+from .cache import LookupCache
+from .metrics import PHASE_DURATION
+from .models import SSHCredential
+from .utils import get_plugin_setting
+import atexit
+import inspect
+import logging
+import re
+import threading
+import time
+
+logger = logging.getLogger('netbox.plugins.device_autodiscovery')
+
+# Commands run per netmiko device type; `show version` works for anything else
+COMMANDS = {
+    'cisco_ios': {'version': 'show version', 'interfaces': 'show interfaces'},
+    'cisco_xe': {'version': 'show version', 'interfaces': 'show interfaces'},
+    'cisco_xr': {'version': 'show version', 'interfaces': 'show interfaces'},
+    'cisco_nxos': {'version': 'show version', 'interfaces': 'show interface'},
+    'arista_eos': {'version': 'show version', 'interfaces': 'show interfaces'},
+    'juniper_junos': {'version': 'show version', 'interfaces': 'show interfaces'},
+}
+DEFAULT_COMMANDS = {'version': 'show version'}
+
+# Operating system names that the vendor classifier recognises in sysDescr
+OS_NAMES = {
+    'cisco_ios': 'Cisco IOS Software',
+    'cisco_xe': 'Cisco IOS XE Software',
+    'cisco_xr': 'Cisco IOS XR Software',
+    'cisco_nxos': 'Cisco NX-OS',
+    'arista_eos': 'Arista Networks EOS',
+    'juniper_junos': 'Juniper Networks JUNOS',
+}
+
+# Fallbacks for `show version` output without a TextFSM template (ntc-templates)
+VERSION_PATTERNS = {
+    'hostname': [r'^\s*Hostname:\s*(\S+)', r'^(\S+) uptime is'],
+    'version': [r'\bVersion:?\s+([\w.()\-]+)', r'\bJunos:\s*(\S+)'],
+    'model': [r'^[Cc]isco (\S+) .*processor', r'^\s*Model(?: number)?\s*:\s*(\S+)', r'^\s*Hardware\s*:\s*(\S+)'],
+    'serial': [r'Processor board ID (\S+)', r'[Ss]erial [Nn]umber\s*:\s*(\S+)', r'System serial number\s*:\s*(\S+)'],
+}
+VERSION_PATTERNS = {
+    key: [re.compile(pattern, re.MULTILINE) for pattern in patterns] for key, patterns in VERSION_PATTERNS.items()
+}
+
+# netmiko 4 takes a per-command deadline; netmiko 3 polls the channel every 0.2s up to max_loops times
+READ_TIMEOUT_SUPPORTED = 'read_timeout' in inspect.signature(BaseConnection.send_command).parameters
+
+
+class SSHError(Exception):
+    """
+    Raised when no SSH credential could log in or a command failed.
+    """
+    pass
+
+
+class SessionPool:
+    """
+    Per-worker pool of open netmiko sessions keyed by host and credential.
+
+    A session is used by one caller at a time and returned to the pool afterwards,
+    so the next discovery of the host skips the SSH handshake and login. The
+    semaphore caps the sessions in use at once; idle sessions are closed after
+    `idle_timeout` seconds or when more than `max_idle` are kept.
+    """
+
+    def __init__(self, max_sessions=8, max_idle=16, idle_timeout=60):
+        self.max_idle = max_idle
+        self.idle_timeout = idle_timeout
+        self._semaphore = threading.BoundedSemaphore(max_sessions)
+        self._idle = OrderedDict()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def session(self, host, credential, device_type):
+        key = (host, credential.port, credential.pk, device_type)
+        with self._semaphore:
+            connection = self._checkout(key) or self._connect(host, credential, device_type)
+            try:
+                yield connection
+            except Exception:
+                # The session may be stuck mid-command; don't hand it out again
+                self._disconnect(connection)
+                raise
+            self._checkin(key, connection)
+
+    def _connect(self, host, credential, device_type):
+        started = time.monotonic()
+        connection = ConnectHandler(**connection_params(host, credential, device_type))
+        if credential.secret:
+            connection.enable()
+        PHASE_DURATION.labels('ssh_connect').observe(time.monotonic() - started)
+        return connection
+
+    def _checkout(self, key):
+        with self._lock:
+            entry = self._idle.pop(key, None)
+        if entry is None:
+            return None
+        connection, released = entry
+        if time.monotonic() - released > self.idle_timeout or not connection.is_alive():
+            self._disconnect(connection)
+            return None
+        return connection
+
+    def _checkin(self, key, connection):
+        now = time.monotonic()
+        closing = []
+        with self._lock:
+            self._idle[key] = (connection, now)
+            for idle_key, (idle_connection, released) in list(self._idle.items()):
+                if len(self._idle) > self.max_idle or now - released > self.idle_timeout:
+                    del self._idle[idle_key]
+                    closing.append(idle_connection)
+        for idle_connection in closing:
+            self._disconnect(idle_connection)
+
+    def _disconnect(self, connection):
+        try:
+            connection.disconnect()
+        except Exception as e:
+            logger.debug(f"Error closing SSH session: {str(e)}")
+
+    def close_all(self):
+        with self._lock:
+            connections = [connection for connection, _ in self._idle.values()]
+            self._idle.clear()
+        for connection in connections:
+            self._disconnect(connection)
+
+
+pool = SessionPool(
+    max_sessions=get_plugin_setting('ssh_max_sessions', 8),
+    max_idle=get_plugin_setting('ssh_pool_size', 16),
+    idle_timeout=get_plugin_setting('ssh_idle_timeout', 60)
+)
+atexit.register(pool.close_all)
+
+# Parsed command output, detected device types and the last working credential per host
+output_cache = LookupCache(
+    maxsize=get_plugin_setting('ssh_cache_size', 1024),
+    ttl=get_plugin_setting('ssh_cache_ttl', 300)
+)
+
+
+def get_credentials(db_config=None):
+    """
+    Return the enabled SSH credentials in priority order.
+    """
+    credentials = getattr(db_config, 'ssh_credentials', None)
+    if credentials is None:
+        credentials = list(SSHCredential.objects.filter(enabled=True))
+    return credentials
+
+
+def connection_params(host, credential, device_type):
+    timeout = get_plugin_setting('ssh_timeout', 10)
+    return {
+        'device_type': device_type,
+        'host': host,
+        'port': credential.port,
+        'username': credential.username,
+        'password': credential.password,
+        'secret': credential.secret,
+        'conn_timeout': timeout,
+        'timeout': timeout,
+        'fast_cli': True,
+    }
+
+
+def send_command(connection, command, deadline):
+    """
+    Run a command, giving up after `deadline` seconds.
+    """
+    if READ_TIMEOUT_SUPPORTED:
+        kwargs = {'read_timeout': deadline}
+    else:
+        kwargs = {'delay_factor': 1, 'max_loops': max(1, int(deadline / 0.2))}
+    try:
+        return connection.send_command(command, **kwargs)
+    except Exception as e:
+        raise SSHError(f"'{command}' failed: {str(e)}")
+
+
+class FactCollector:
+    """
+    Collects device facts from one host over SSH.
+
+    The parsed outputs of a host are cached for `ssh_cache_ttl` seconds; while they
+    are, no session is opened at all.
+    """
+
+    def __init__(self, host, credentials):
+        self.host = host
+        self.credentials = list(credentials)
+        self.deadline = get_plugin_setting('ssh_command_timeout', 30)
+
+    def collect(self):
+        """
+        Return a device_info dict, or raise SSHError.
+        """
+        device_type, outputs = self.cached_outputs()
+        if outputs is not None:
+            return self.build_device_info(device_type, outputs)
+
+        error = None
+        for credential in self.ordered_credentials():
+            try:
+                device_type = self.get_device_type(credential)
+                with pool.session(self.host, credential, device_type) as connection:
+                    outputs = {
+                        name: self.run(connection, device_type, command)
+                        for name, command in COMMANDS.get(device_type, DEFAULT_COMMANDS).items()
+                    }
+                    # netmiko derives the prompt from the hostname
+                    outputs['prompt'] = connection.base_prompt
+                if 'interfaces' in outputs:
+                    # Only the parsed form is used; the raw text of a large chassis is big
+                    outputs['interfaces'] = (None, outputs['interfaces'][1])
+            except NetmikoAuthenticationException as e:
+                logger.debug(f"SSH login to {self.host} as '{credential.username}' failed: {str(e)}")
+                error = e
+                continue
+            except NetmikoTimeoutException as e:
+                # The host is unreachable; other credentials won't fare better
+                raise SSHError(str(e))
+            except SSHError:
+                raise
+            except Exception as e:
+                raise SSHError(str(e))
+
+            output_cache.set('credential', self.host, credential.pk)
+            output_cache.set('outputs', self.host, (device_type, outputs))
+            return self.build_device_info(device_type, outputs)
+
+        raise SSHError(f"No SSH credential was accepted ({str(error) if error else 'none configured'})")
+
+    def cached_outputs(self):
+        return output_cache.get('outputs', self.host) or (None, None)
+
+    def ordered_credentials(self):
+        last_good = output_cache.get('credential', self.host)
+        return sorted(self.credentials, key=lambda credential: credential.pk != last_good)
+
+    def get_device_type(self, credential):
+        if credential.device_type != 'autodetect':
+            return credential.device_type
+        device_type = output_cache.get('device_type', (self.host, credential.pk))
+        if device_type is None:
+            params = connection_params(self.host, credential, 'autodetect')
+            device_type = SSHDetect(**params).autodetect() or 'generic'
+            output_cache.set('device_type', (self.host, credential.pk), device_type)
+        return device_type
+
+    def run(self, connection, device_type, command):
+        raw = send_command(connection, command, self.deadline)
+        parsed = get_structured_data(raw, platform=device_type, command=command)
+        # Without a template, get_structured_data returns the raw text unchanged
+        return raw, parsed if isinstance(parsed, list) else None
+
+    def build_device_info(self, device_type, outputs):
+        raw, parsed = outputs['version']
+        facts = parse_version(raw, parsed)
+        hostname = facts['hostname'] or outputs['prompt'].split('@')[-1]
+
+        if device_type in OS_NAMES:
+            descr = ', '.join(
+                part for part in (f"{OS_NAMES[device_type]} Version {facts['version'] or 'unknown'}", facts['model'])
+                if part
+            )
+        else:
+            descr = next((line.strip() for line in raw.splitlines() if line.strip()), '')
+
+        device_info = {
+            'sysName': hostname,
+            'sysDescr': descr[:255],
+            'model': facts['model'],
+            'serial': facts['serial'],
+        }
+        if 'interfaces' in outputs:
+            device_info['interfaces'] = parse_interfaces(outputs['interfaces'][1])
+        return {key: value for key, value in device_info.items() if value is not None}
+
+
+def first_value(record, *keys):
+    """
+    Return the first non-empty value of `keys` in a TextFSM record; list values give their first item.
+    """
+    for key in keys:
+        value = record.get(key)
+        if isinstance(value, list):
+            value = value[0] if value else None
+        if value:
+            return str(value).strip()
+    return None
+
+
+def parse_version(raw, parsed):
+    """
+    Extract hostname, version, model and serial from `show version`.
+    """
+    # ntc-templates used upper-case field names before 2.0
+    record = {key.lower(): value for key, value in parsed[0].items()} if parsed else {}
+    facts = {
+        'hostname': first_value(record, 'hostname'),
+        'version': first_value(record, 'version', 'os', 'junos_version', 'image'),
+        'model': first_value(record, 'hardware', 'platform', 'model'),
+        'serial': first_value(record, 'serial', 'serial_number'),
+    }
+    for key, patterns in VERSION_PATTERNS.items():
+        if facts[key]:
+            continue
+        for pattern in patterns:
+            match = pattern.search(raw)
+            if match:
+                facts[key] = match.group(1)
+                break
+    return facts
+
+
+def parse_speed(value):
+    """
+    Convert bandwidth strings like '1000000 Kbit' or '10Gbps' to Mbps.
+    """
+    match = re.search(r'(\d+)\s*([KMG])', value or '', re.IGNORECASE)
+    if not match:
+        return None
+    number, unit = int(match.group(1)), match.group(2).upper()
+    return {'K': number // 1000, 'M': number, 'G': number * 1000}[unit] or None
+
+
+def parse_mac(value):
+    """
+    Normalise MAC addresses like 0011.2233.4455 to the format of snmp.format_mac.
+    """
+    digits = re.sub(r'[^0-9a-fA-F]', '', value or '')
+    if len(digits) != 12 or not int(digits, 16):
+        return None
+    return ':'.join(digits[i:i + 2] for i in range(0, 12, 2)).upper()
+
+
+def parse_interfaces(parsed):
+    """
+    Turn TextFSM-parsed interface output into interface dicts like snmp.build_interfaces.
+
+    Without a template there is nothing reliable to parse, and no interfaces are returned.
+    """
+    interfaces = []
+    for position, record in enumerate(parsed or [], start=1):
+        record = {key.lower(): value for key, value in record.items()}
+        name = first_value(record, 'interface')
+        if not name:
+            continue
+        status = (first_value(record, 'admin_state', 'link_status') or '').lower()
+        interfaces.append({
+            # The CLI has no ifIndex; the position keeps the order stable
+            'index': str(position),
+            'name': name[:64],
+            'description': (first_value(record, 'description') or '')[:200],
+            'type': None,
+            'speed': parse_speed(first_value(record, 'bandwidth', 'speed')),
+            'mac_address': parse_mac(first_value(record, 'mac_address', 'address', 'hardware_address', 'mac')),
+            'enabled': 'administratively' not in status and status != 'disabled',
+            'last_change': None,
+        })
+    return interfaces
+
+
+def collect_facts(host, credentials):
+    """
+    Return the device_info of one host, or raise SSHError.
+    """
+    return FactCollector(host, credentials).collect()
+
+
+def collect_many(hosts, credentials):
+    """
+    Collect facts from many hosts in threads, at most `ssh_max_sessions` at a time.
+
+    Returns a dict of host -> device_info (empty for hosts that failed).
+    """
+    hosts = list(hosts)
+    if not hosts or not credentials:
+        return {}
+
+    def collect(host):
+        try:
+            return host, collect_facts(host, credentials)
+        except SSHError as e:
+            logger.debug(f"SSH discovery of {host} failed: {str(e)}")
+            return host, {}
+
+    with ThreadPoolExecutor(max_workers=get_plugin_setting('ssh_max_sessions', 8)) as executor:
+        return dict(executor.map(collect, hosts))
@@ -0,0 +1,165 @@
+from django.utils import timezone
+from ipam.models import IPAddress
+from .async_discovery import get_engine_for_config
+from .discovery import DeviceDiscovery
+from .models import AutoDiscoveryConfig, PrefixSweep
+from .scheduler import PRIORITY_SWEEP
+from .utils import discovery_suppressed, get_plugin_setting
+import ipaddress
+import logging
+import time
+
+logger = logging.getLogger('netbox.plugins.device_autodiscovery')
+
+
+def iter_hosts(network, start_after=None):
+    """
+    Yield the host addresses of a network in order, without materialising the list.
+
+    If `start_after` is given, iteration starts at the address following it.
+    """
+    address_class = type(network.network_address)
+    first = int(network.network_address)
+    last = int(network.broadcast_address)
+
+    # Mirror ipaddress.hosts(): skip network (and IPv4 broadcast) except on point-to-point prefixes
+    if network.num_addresses > 2:
+        first += 1
+        if network.version == 4:
+            last -= 1
+
+    if start_after:
+        first = max(first, int(address_class(start_after)) + 1)
+
+    for value in range(first, last + 1):
+        yield address_class(value)
+
+
+def count_hosts(network):
+    if network.num_addresses <= 2:
+        return network.num_addresses
+    return network.num_addresses - (2 if network.version == 4 else 1)
+
+
+def start_sweep(prefix, vrf=None, restart=False):
+    """
+    Return the unfinished sweep of a prefix to resume, or a new one.
+    """
+    network = ipaddress.ip_network(prefix)
+
+    if not restart:
+        sweep = PrefixSweep.objects.filter(prefix=str(network), vrf=vrf).exclude(
+            status=PrefixSweep.STATUS_COMPLETED
+        ).first()
+        if sweep:
+            return sweep
+
+    return PrefixSweep.objects.create(
+        prefix=str(network),
+        vrf=vrf,
+        hosts_total=count_hosts(network)
+    )
+
+
+class PrefixSweeper:
+    """
+    Probes every host address of a prefix and materialises the responders.
+
+    Hosts are probed concurrently in chunks; after each chunk the sweep's
+    counters and checkpoint are saved.
+    """
+
+    def __init__(self, sweep, concurrency=None, chunk_size=256, progress=None):
+        self.sweep = sweep
+        self.chunk_size = chunk_size
+        self.progress = progress
+        self.db_config = AutoDiscoveryConfig.get_cached_config()
+
+        options = {'priority': PRIORITY_SWEEP}
+        if concurrency:
+            options['concurrency'] = concurrency
+        self.engine = get_engine_for_config(self.db_config, **options)
+
+    def run(self):
+        sweep = self.sweep
+        network = ipaddress.ip_network(sweep.prefix)
+
+        max_hosts = get_plugin_setting('sweep_max_hosts', 262144)
+        if count_hosts(network) > max_hosts:
+            raise ValueError(f"{network} has more than {max_hosts} host addresses (sweep_max_hosts)")
+        if not self.db_config.enabled or not self.db_config.snmp_enabled:
+            raise ValueError("Auto-discovery or SNMP is disabled in configuration")
+
+        sweep.status = PrefixSweep.STATUS_RUNNING
+        sweep.error = ''
+        sweep.save(update_fields=['status', 'error', 'updated'])
+
+        if sweep.last_address:
+            logger.info(f"🔁 Resuming sweep of {network} after {sweep.last_address}")
+        else:
+            logger.info(f"🔍 Starting sweep of {network} ({sweep.hosts_total} hosts)")
+
+        try:
+            chunk = []
+            for host in iter_hosts(network, sweep.last_address or None):
+                chunk.append(host)
+                if len(chunk) >= self.chunk_size:
+                    self.process_chunk(chunk, network)
+                    chunk = []
+            if chunk:
+                self.process_chunk(chunk, network)
+        except BaseException as e:
+            # Also covers job timeouts, which older rq versions raise as BaseException,
+            # so the sweep never stays running after its job is gone
+            sweep.status = PrefixSweep.STATUS_FAILED
+            sweep.error = str(e) or e.__class__.__name__
+            sweep.save(update_fields=['status', 'error', 'updated'])
+            raise
+
+        sweep.status = PrefixSweep.STATUS_COMPLETED
+        sweep.completed = timezone.now()
+        sweep.save(update_fields=['status', 'completed', 'updated'])
+        logger.info(
+            f"✅ Sweep of {network} complete: {sweep.responders} responders, {sweep.devices} devices"
+        )
+        return sweep
+
+    def process_chunk(self, chunk, network):
+        sweep = self.sweep
+        started = time.monotonic()
+        results = self.engine.run_cached([str(host) for host in chunk])
+
+        for host in chunk:
+            device_info = results.get(str(host))
+            if not device_info:
+                continue
+            sweep.responders += 1
+            if self.materialise(host, network, device_info):
+                sweep.devices += 1
+
+        sweep.hosts_scanned += len(chunk)
+        sweep.last_address = str(chunk[-1])
+        sweep.save(update_fields=['hosts_scanned', 'responders', 'devices', 'last_address', 'updated'])
+
+        if self.progress:
+            self.progress(sweep, len(chunk) / max(time.monotonic() - started, 0.001))
+
+    def materialise(self, host, network, device_info):
+        """
+        Create the IP address (if missing) and device for a responding host.
+        """
+        ip_address = IPAddress.objects.filter(vrf=self.sweep.vrf, address__net_host=str(host)).first()
+
+        if ip_address is None:
+            with discovery_suppressed():
+                ip_address = IPAddress.objects.create(
+                    address=f'{host}/{network.prefixlen}',
+                    vrf=self.sweep.vrf,
+                    description='Created by auto-discovery prefix sweep'
+                )
+        elif ip_address.assigned_object:
+            logger.debug(f"{host} is already assigned, skipping")
+            return None
+
+        timings = {'snmp': self.engine.timings[str(host)]} if str(host) in self.engine.timings else None
+        return DeviceDiscovery(ip_address, device_info=device_info, timings=timings).discover_and_create_device()
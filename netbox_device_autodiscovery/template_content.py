@@ -0,0 +1,24 @@
+from netbox.plugins import PluginTemplateExtension
+
+
+class PrefixSweepButton(PluginTemplateExtension):
+    """
+    Adds an "Auto-Discover" button to the prefix view.
+    """
+    model = 'ipam.prefix'
+
+    def buttons(self):
+        return self.render('netbox_device_autodiscovery/inc/prefix_sweep_button.html')
+
+
+class DeviceCrawlButton(PluginTemplateExtension):
+    """
+    Adds a "Crawl Neighbours" button to the device view.
+    """
+    model = 'dcim.device'
+
+    def buttons(self):
+        return self.render('netbox_device_autodiscovery/inc/device_crawl_button.html')
+
+
+template_extensions = [PrefixSweepButton, DeviceCrawlButton]
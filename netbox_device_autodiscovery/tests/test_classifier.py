@@ -0,0 +1,55 @@
+from django.test import SimpleTestCase
+from netbox_device_autodiscovery.classifier import DEFAULT_DATABASE, VendorClassifier
+
+IOS = (
+    'Cisco IOS Software, C2960X Software (C2960X-UNIVERSALK9-M), Version 15.2(7)E4, RELEASE SOFTWARE (fc2)'
+)
+IOS_XE = (
+    'Cisco IOS Software [Gibraltar], Catalyst L3 Switch Software (CAT9K_IOSXE), Version 16.12.4, '
+    'RELEASE SOFTWARE (fc5)'
+)
+IOS_XE_ASR = (
+    'Cisco IOS XE Software, Version 17.03.04a - Standard Support Release\r\n'
+    'Cisco IOS Software [Amsterdam], ASR1000 Software (X86_64_LINUX_IOSD-UNIVERSALK9-M), Version 17.3.4a'
+)
+IOS_XR = (
+    'Cisco IOS XR Software (Cisco ASR9K Series),  Version 6.5.3[Default]\r\n'
+    'Copyright (c) 2019 by Cisco Systems, Inc.'
+)
+NX_OS = 'Cisco NX-OS(tm) n9000, Software (n9000-dk9), Version 9.3(5), RELEASE SOFTWARE Copyright (c) 2002-2020 by Cisco'
+
+
+class VendorClassifierTestCase(SimpleTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.classifier = VendorClassifier()
+        cls.classifier.load(DEFAULT_DATABASE)
+
+    def test_cisco_platforms_from_sysdescr(self):
+        for sys_descr, platform in (
+            (IOS, 'Cisco IOS'),
+            (IOS_XE, 'Cisco IOS-XE'),
+            (IOS_XE_ASR, 'Cisco IOS-XE'),
+            (IOS_XR, 'Cisco IOS-XR'),
+            (NX_OS, 'Cisco NX-OS'),
+        ):
+            with self.subTest(platform=platform):
+                self.assertEqual(self.classifier.classify(None, sys_descr), ('Cisco', platform))
+
+    def test_cisco_products_oid_leaves_platform_to_sysdescr(self):
+        self.assertEqual(self.classifier.classify('1.3.6.1.4.1.9.1.2494', IOS_XE), ('Cisco', 'Cisco IOS-XE'))
+        self.assertEqual(self.classifier.classify('1.3.6.1.4.1.9.1.1639', IOS_XR), ('Cisco', 'Cisco IOS-XR'))
+
+    def test_earlier_patterns_take_precedence(self):
+        classifier = VendorClassifier()
+        classifier.add_descr_pattern(r'\bspecific\b', platform='Specific')
+        classifier.add_descr_pattern(r'\bgeneric\b', manufacturer='Vendor', platform='Generic')
+        self.assertEqual(classifier.classify(None, 'generic text, specific build'), ('Vendor', 'Specific'))
+
+    def test_oid_platform_wins_over_sysdescr(self):
+        self.assertEqual(
+            self.classifier.classify('1.3.6.1.4.1.2636.1.1.1.2.29', 'Cisco IOS Software'),
+            ('Juniper', 'Juniper Junos')
+        )
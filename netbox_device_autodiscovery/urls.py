@@ -0,0 +1,9 @@
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    path('prefixes/<int:pk>/sweep/', views.PrefixSweepView.as_view(), name='prefix_sweep'),
+    path('devices/<int:pk>/crawl/', views.DeviceCrawlView.as_view(), name='device_crawl'),
+    path('results/', views.DiscoveryResultListView.as_view(), name='discoveryresult_list'),
+    path('metrics/', views.MetricsView.as_view(), name='metrics'),
+]
@@ -0,0 +1,63 @@
+from contextlib import contextmanager
+from django.conf import settings
+from django.db.models.signals import post_save
+import threading
+
+
+PLUGIN_NAME = 'netbox_device_autodiscovery'
+
+
+def get_plugin_setting(name, default=None):
+    """
+    Return a setting from PLUGINS_CONFIG, falling back to the given default.
+    """
+    return settings.PLUGINS_CONFIG.get(PLUGIN_NAME, {}).get(name, default)
+
+
+_state = threading.local()
+
+
+@contextmanager
+def discovery_suppressed():
+    """
+    Disable the IPAddress post_save discovery signal for IPs created inside the block.
+
+    Used by bulk operations that run discovery themselves.
+    """
+    previous = getattr(_state, 'suppressed', False)
+    _state.suppressed = True
+    try:
+        yield
+    finally:
+        _state.suppressed = previous
+
+
+def is_discovery_suppressed():
+    return getattr(_state, 'suppressed', False)
+
+
+def send_bulk_create_signals(objects):
+    """
+    Send post_save for objects inserted with bulk_create.
+
+    bulk_create bypasses the signals NetBox relies on for change logging, webhooks
+    and the search cache, so emit them for each row the way NetBox does when it
+    instantiates device components.
+    """
+    for obj in objects:
+        post_save.send(
+            sender=type(obj), instance=obj, created=True, raw=False, using=obj._state.db, update_fields=None
+        )
+
+
+def send_bulk_update_signals(objects, fields):
+    """
+    Like send_bulk_create_signals, for objects saved with bulk_update. Call snapshot()
+    on the objects before changing them so the change log records the previous state.
+    """
+    update_fields = frozenset(fields)
+    for obj in objects:
+        post_save.send(
+            sender=type(obj), instance=obj, created=False, raw=False, using=obj._state.db,
+            update_fields=update_fields
+        )
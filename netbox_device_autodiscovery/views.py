@@ -0,0 +1,97 @@
+from django.contrib import messages
+from django.contrib.auth.mixins import PermissionRequiredMixin
+from django.http import Http404, HttpResponse
+from django.shortcuts import get_object_or_404, redirect
+from django.views.generic import ListView, View
+from dcim.models import Device
+from ipam.models import Prefix
+from . import metrics
+from .crawl import start_crawl
+from .jobs import enqueue_crawl, enqueue_sweep, is_job_active
+from .models import DiscoveryResult, PrefixSweep, TopologyCrawl
+from .sweep import start_sweep
+
+
+class PrefixSweepView(PermissionRequiredMixin, View):
+    """
+    Queue (or resume) an auto-discovery sweep of a prefix.
+    """
+    permission_required = 'netbox_device_autodiscovery.add_prefixsweep'
+
+    def post(self, request, pk):
+        prefix = get_object_or_404(Prefix, pk=pk)
+        sweep = start_sweep(str(prefix.prefix), vrf=prefix.vrf)
+
+        # A sweep whose job was lost (e.g. its worker was killed) is queued again
+        if sweep.status in (PrefixSweep.STATUS_PENDING, PrefixSweep.STATUS_RUNNING) and is_job_active(sweep.job_id):
+            messages.info(request, f"An auto-discovery sweep of {prefix.prefix} is already in progress")
+        else:
+            enqueue_sweep(sweep)
+            messages.success(request, f"Queued auto-discovery sweep of {prefix.prefix}")
+
+        return redirect(prefix.get_absolute_url())
+
+
+class DeviceCrawlView(PermissionRequiredMixin, View):
+    """
+    Queue a topology crawl from the primary IP of a device.
+    """
+    permission_required = 'netbox_device_autodiscovery.add_topologycrawl'
+
+    def post(self, request, pk):
+        device = get_object_or_404(Device, pk=pk)
+        primary_ip = device.primary_ip4 or device.primary_ip6
+        if primary_ip is None:
+            messages.error(request, f"{device} has no primary IP to crawl from")
+            return redirect(device.get_absolute_url())
+
+        seed = str(primary_ip.address.ip)
+        job_ids = TopologyCrawl.objects.filter(
+            seed=seed, status__in=(TopologyCrawl.STATUS_PENDING, TopologyCrawl.STATUS_RUNNING)
+        ).exclude(job_id='').values_list('job_id', flat=True)
+        if any(is_job_active(job_id) for job_id in job_ids):
+            messages.info(request, f"A topology crawl from {seed} is already in progress")
+        else:
+            enqueue_crawl(start_crawl(seed))
+            messages.success(request, f"Queued topology crawl from {device}")
+
+        return redirect(device.get_absolute_url())
+
+
+class DiscoveryResultListView(PermissionRequiredMixin, ListView):
+    """
+    List stored discovery results, optionally filtered by address, status or protocol.
+    """
+    permission_required = 'netbox_device_autodiscovery.view_discoveryresult'
+    template_name = 'netbox_device_autodiscovery/discoveryresult_list.html'
+    paginate_by = 50
+
+    def get_queryset(self):
+        queryset = DiscoveryResult.objects.select_related('device').defer('data')
+        if self.request.GET.get('q'):
+            queryset = queryset.filter(address__istartswith=self.request.GET['q'])
+        for field in ('status', 'protocol'):
+            if self.request.GET.get(field):
+                queryset = queryset.filter(**{field: self.request.GET[field]})
+        return queryset
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['status_choices'] = DiscoveryResult.STATUS_CHOICES
+        context['protocol_choices'] = DiscoveryResult.PROTOCOL_CHOICES
+        return context
+
+
+class MetricsView(View):
+    """
+    Export NetBox's and the plugin's Prometheus metrics, queue gauges included.
+
+    NetBox's /metrics view builds its own registry per scrape in multiprocess
+    mode, which the queue collector cannot be added to.
+    """
+
+    def get(self, request):
+        if not metrics.ENABLED:
+            raise Http404("Metrics are disabled")
+        body, content_type = metrics.export()
+        return HttpResponse(body, content_type=content_type)